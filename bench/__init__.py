@@ -0,0 +1,20 @@
+import timeit
+from typing import Callable, Dict
+
+# name -> seconds of every report() since the start, written by bench/__main__
+results: Dict[str, float] = {}
+
+
+def measure(
+    func: Callable[[], object], *, number: int = 100, repeat: int = 5
+) -> float:
+    """
+    Return the best time of one call of func, in seconds
+    """
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(name: str, seconds: float) -> None:
+    results[name] = seconds
+    print(f"{name:<40} {seconds * 1e6:10.1f} us")
@@ -0,0 +1,61 @@
+"""
+Run every benchmark and write the results as JSON.
+python -m bench [--output bench.json] [--baseline old.json] [--threshold 1.25]
+Exits with 1 if any result is slower than threshold times the baseline.
+"""
+
+import argparse
+import json
+import platform
+import sys
+from typing import Dict
+
+from . import results
+from . import bench_ansibreak, bench_pyte, bench_screen, bench_tui, bench_winconsole
+
+BENCHMARKS = [bench_ansibreak, bench_winconsole, bench_pyte, bench_tui, bench_screen]
+
+
+def compare(baseline: Dict[str, float], threshold: float) -> int:
+    """
+    Print the results slower than threshold times the baseline, return their count
+    """
+    regressions = 0
+    for name, seconds in results.items():
+        old = baseline.get(name)
+        if old is None or old <= 0:
+            continue
+        ratio = seconds / old
+        if ratio > threshold:
+            regressions += 1
+            print(f"REGRESSION {name}: {old * 1e6:.1f} us -> {seconds * 1e6:.1f} us")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    parser.add_argument("--output", default="bench.json", help="results file")
+    parser.add_argument("--baseline", help="results file to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+    for benchmark in BENCHMARKS:
+        benchmark.main()
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        if compare(baseline, args.threshold) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
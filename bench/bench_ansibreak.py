@@ -0,0 +1,33 @@
+"""
+AnsiBreak.decode over a large burst of keys.
+python -m bench.bench_ansibreak
+"""
+
+import random
+
+from . import measure, report
+from tggw_autotravel.getch.ansibreak import AnsiBreak
+
+KEYS = ["h", "j", "k", "l", ".", "\r", "\x1b[A", "\x1b[B", "\x1b[1;5C", "\x1bx"]
+
+
+def make_burst(count: int = 10000) -> str:
+    rand = random.Random(0)
+    return "".join(rand.choice(KEYS) for _ in range(count))
+
+
+def main() -> None:
+    burst = make_burst()
+    report(
+        "AnsiBreak.decode 10000 keys",
+        measure(lambda: AnsiBreak().decode(burst, timestamp=0.0), number=5),
+    )
+    text = "x" * 10000
+    report(
+        "AnsiBreak.decode 10000 chars",
+        measure(lambda: AnsiBreak().decode(text, timestamp=0.0), number=5),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Parsing program output into Screen, as RunWinPTY.read_screen does, with
+pyte (PyteAdapter) and with VTParser. winpty is not needed.
+python -m bench.bench_pyte [raw output file, as read by RunReplay]
+"""
+
+import random
+import sys
+from typing import Optional
+
+from . import measure, report
+from tggw_autotravel.run.doublebuffer import DoubleBuffer
+from tggw_autotravel.run.pyteadapter import PyteAdapter
+from tggw_autotravel.run.vt import VTParser
+from tggw_autotravel.screen import Screen
+
+LINES = 38
+COLUMNS = 92
+
+
+def make_output(lines: int = LINES, columns: int = COLUMNS) -> str:
+    # a full redraw with a color change every few cells
+    rand = random.Random(0)
+    parts = ["\x1b[H"]
+    for y in range(lines):
+        parts.append(f"\x1b[{y + 1};1H")
+        for _ in range(columns):
+            if rand.random() < 0.2:
+                parts.append(f"\x1b[{rand.choice((31, 32, 33, 37, 90, 97))}m")
+            parts.append(rand.choice(" .#@$"))
+    return "".join(parts)
+
+
+def make_log(lines: int = 200, columns: int = COLUMNS) -> str:
+    # message log style output that scrolls the screen
+    rand = random.Random(1)
+    parts = []
+    for _ in range(lines):
+        color = rand.choice((31, 32, 33, 37))
+        words = " ".join(rand.choice(("you", "hit", "the", "rat")) for _ in range(8))
+        parts.append(f"\x1b[{color}m{words[:columns]}\x1b[0m\r\n")
+    return "".join(parts)
+
+
+def compare(name: str, output: str, number: int) -> None:
+    """
+    Feed output and update the screen with both parsers
+    """
+    pyte_adapter = PyteAdapter(Screen(LINES, COLUMNS))
+    vt_parser = VTParser(Screen(LINES, COLUMNS))
+
+    def pyte_run() -> None:
+        pyte_adapter.feed(output)
+        pyte_adapter.update()
+
+    def vt_run() -> None:
+        vt_parser.feed(output)
+        vt_parser.update()
+
+    report(f"pyte {name}", measure(pyte_run, number=number))
+    report(f"VTParser {name}", measure(vt_run, number=number))
+
+
+def main(path: Optional[str] = None) -> None:
+    compare("full redraw", make_output(), 10)
+    compare("scrolling log", make_log(), 10)
+    if path is not None:
+        with open(path, "r", encoding="utf-8", errors="replace", newline="") as file:
+            compare("recorded output", file.read(), 1)
+
+    buffers = DoubleBuffer(LINES, COLUMNS)
+    buffers.feed(make_output())
+
+    def swap() -> None:
+        # the main thread's part of read_screen(), without the reader's sync
+        buffers.stale = False
+        buffers.back.generation += 1
+        buffers.swap()
+
+    report("DoubleBuffer.swap", measure(swap, number=1000))
+
+    output = make_output()
+    adapter = PyteAdapter(Screen(LINES, COLUMNS))
+    report("pyte feed full redraw", measure(lambda: adapter.feed(output), number=10))
+
+    def update_all() -> None:
+        adapter.pyte_screen.dirty.update(range(LINES))
+        adapter.update()
+
+    report("PyteAdapter.update all rows", measure(update_all, number=100))
+
+    def update_one() -> None:
+        adapter.pyte_screen.dirty.add(5)
+        adapter.update()
+
+    report("PyteAdapter.update one row", measure(update_one, number=1000))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,50 @@
+"""
+Screen serialization and color lookup.
+python -m bench.bench_screen
+"""
+
+import random
+
+from . import measure, report
+from tggw_autotravel.history import FrameHistory
+from tggw_autotravel.screen import Screen, Char, Color, color16, color_table
+
+LINES = 38
+COLUMNS = 92
+
+
+def make_screen(lines: int = LINES, columns: int = COLUMNS) -> Screen:
+    rand = random.Random(0)
+    screen = Screen(lines, columns)
+    for y in range(lines):
+        for x in range(columns):
+            screen.buffer[y][x] = Char(
+                rand.choice(" .#@$"), Color(rand.randrange(16)), Color.BLACK
+            )
+    return screen
+
+
+def main() -> None:
+    screen = make_screen()
+    json_str = screen.to_json()
+    data = screen.to_bytes()
+    report("Screen.to_json", measure(screen.to_json, number=5))
+    report("Screen.from_json", measure(lambda: Screen.from_json(json_str), number=5))
+    report("Screen.to_bytes", measure(screen.to_bytes, number=1000))
+    report("Screen.from_bytes", measure(lambda: Screen.from_bytes(data), number=1000))
+    history = FrameHistory(3000)
+
+    def push() -> None:
+        screen.mark_dirty(0)
+        history.push(screen)
+
+    report("FrameHistory.push one row", measure(push, number=1000))
+    names = list(color_table) + ["default"]
+    report(
+        f"color16 x{len(names)}",
+        measure(lambda: [color16(name) for name in names], number=1000),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+TUIColorama.refresh for full and partial redraws, writing to a null stream.
+python -m bench.bench_tui
+"""
+
+import contextlib
+import os
+
+from . import measure, report
+from .bench_screen import make_screen, LINES, COLUMNS
+from tggw_autotravel.screen import Char, Color
+from tggw_autotravel.tui import TUIColorama, RenderStats
+
+
+class NullStream:
+    def write(self, text: str) -> int:
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+class TUIColoramaStandIn(TUIColorama):
+    """
+    TUIColorama without a console: no alternate buffer, fixed terminal size
+    """
+
+    def __init__(self, lines: int = LINES, columns: int = COLUMNS) -> None:
+        self.lines = lines
+        self.columns = columns
+        self.screen = make_screen(lines, columns)
+        self.drawn_screen = None
+        self.drawn_source = None
+        self.drawn_generation = 0
+        self.stats = RenderStats()
+        self.scr_size = self.terminal_size()
+
+    def terminal_size(self) -> os.terminal_size:
+        return os.terminal_size((self.columns, self.lines))
+
+
+def main() -> None:
+    tui = TUIColoramaStandIn()
+    count = 0
+
+    def full() -> None:
+        tui.drawn_screen = None
+        tui.refresh()
+
+    def partial() -> None:
+        nonlocal count
+        count += 1
+        tui.screen.buffer[count % LINES][count % COLUMNS] = Char(
+            "@", Color(count % 16), Color.BLACK
+        )
+        tui.refresh()
+
+    # refresh() writes to sys.stdout, report() after the redirect
+    with contextlib.redirect_stdout(NullStream()):  # type: ignore[type-var]
+        timings = [
+            ("TUIColorama.refresh full", measure(full, number=20)),
+            ("TUIColorama.refresh one cell", measure(partial, number=1000)),
+            ("TUIColorama.refresh idle", measure(tui.refresh, number=1000)),
+        ]
+    for name, seconds in timings:
+        report(name, seconds)
+
+
+if __name__ == "__main__":
+    main()
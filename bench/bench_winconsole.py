@@ -0,0 +1,101 @@
+"""
+Decode time of one QUERY_SCREEN reply (38x92).
+python -m bench.bench_winconsole
+"""
+
+import random
+import struct
+from typing import List
+
+from . import measure, report
+from tggw_autotravel.run.winconsole import (
+    RunWinConsole,
+    REPLY_SCREEN,
+    REPLY_SCREEN_DIFF,
+    SCREEN_DIFF_HEADER,
+    SCREEN_RUN,
+)
+from tggw_autotravel.screen import Screen, Char, Color, Cursor
+
+LINES = 38
+COLUMNS = 92
+
+
+def make_reply(lines: int = LINES, columns: int = COLUMNS) -> bytes:
+    rand = random.Random(0)
+    reply = struct.pack("<BHHHHB", REPLY_SCREEN, lines, columns, 3, 4, 1)
+    for _ in range(lines * columns):
+        reply += struct.pack("<HB", rand.choice(b" .#@$"), rand.randrange(256))
+    return reply
+
+
+def make_diff_reply(lines: int = LINES, columns: int = COLUMNS) -> bytes:
+    # the player glyph moved: two runs of one cell, plus the status line
+    reply = bytes((REPLY_SCREEN_DIFF,))
+    reply += SCREEN_DIFF_HEADER.pack(lines, columns, 3, 4, 1, 1, 1, 3)
+    reply += SCREEN_RUN.pack(5 * columns + 10, 1) + struct.pack("<HB", ord("."), 7)
+    reply += SCREEN_RUN.pack(5 * columns + 11, 1) + struct.pack("<HB", ord("@"), 15)
+    reply += SCREEN_RUN.pack((lines - 1) * columns, 20)
+    reply += struct.pack("<HB", ord("-"), 7) * 20
+    return reply
+
+
+class RunWinConsoleStandIn(RunWinConsole):
+    """
+    RunWinConsole that answers every query with a canned reply, no winconsole.exe
+    """
+
+    def __init__(self, reply: bytes, screen_diff: bool = False) -> None:
+        self.reply = reply
+        self.screen = Screen(LINES, COLUMNS)
+        self.screen_diff = screen_diff
+        self.screen_seq = 1
+
+    def query(self, querybuf: bytes) -> bytes:
+        return self.reply
+
+
+def legacy_read_screen(reply: bytes, screen: Screen) -> List[List[Char]]:
+    # per-cell decoder used before the bulk decoder
+    format_str = "<BHHHHB"
+    header_length = struct.calcsize(format_str)
+    _, lines, columns, x, y, visibility = struct.unpack(
+        format_str, reply[:header_length]
+    )
+    screen.cursor = Cursor(x, y, visibility)
+    char_format_str = "<HB"
+    char_length = struct.calcsize(char_format_str)
+    char_offset = header_length
+    buffer: List[List[Char]] = []
+    for y in range(lines):
+        bufferline: List[Char] = []
+        for x in range(columns):
+            charbytes = reply[char_offset : char_offset + char_length]
+            charcode, color = struct.unpack(char_format_str, charbytes)
+            ch = chr(charcode) if charcode != 0 else ""
+            fg = Color(color % 16)
+            bg = Color(color // 16)
+            char = Char(ch, fg, bg)
+            bufferline.append(char)
+            char_offset += char_length
+        buffer.append(bufferline)
+    return buffer
+
+
+def main() -> None:
+    reply = make_reply()
+    legacy_screen = Screen(LINES, COLUMNS)
+    report(
+        "read_screen legacy per-cell",
+        measure(lambda: legacy_read_screen(reply, legacy_screen)),
+    )
+    standin = RunWinConsoleStandIn(reply)
+    report("read_screen bulk decode", measure(standin.read_screen, number=1000))
+    diff_reply = make_diff_reply()
+    standin = RunWinConsoleStandIn(diff_reply, screen_diff=True)
+    report("read_screen diff (22 cells)", measure(standin.read_screen, number=1000))
+    print(f"reply size: full {len(reply)} bytes, diff {len(diff_reply)} bytes")
+
+
+if __name__ == "__main__":
+    main()
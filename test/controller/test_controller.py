@@ -0,0 +1,178 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+from threading import Event
+
+from tggw_autotravel.controller import Controller, game_runner
+from tggw_autotravel.export import ScreenExport
+from tggw_autotravel.getch import GetchScript
+from tggw_autotravel.main import parse_args, split_keys
+from tggw_autotravel.record import Recorder, RecordInput, iter_records
+from tggw_autotravel.run import RunBase, RunReplay
+
+# 回显每一行输入，输入 q 时退出
+PROGRAM = (
+    "import sys\n"
+    "for line in sys.stdin:\n"
+    "    if line.strip() == 'q':\n"
+    "        break\n"
+    "    sys.stdout.write('got ' + line.strip() + '\\r\\n')\n"
+    "    sys.stdout.flush()\n"
+)
+
+
+def echo_runner(lines: int, columns: int) -> RunBase:
+    from tggw_autotravel.run import RunPosixPTY
+
+    return RunPosixPTY(sys.executable, "-c", PROGRAM, lines=lines, columns=columns)
+
+
+class TestSplitKeys(unittest.TestCase):
+    def test_split_keys(self) -> None:
+        """测试按键脚本拆分"""
+        self.assertEqual(split_keys("a\x1b[Ab\x1b"), ["a", "\x1b[A", "b", "\x1b"])
+
+    def test_keys_need_headless(self) -> None:
+        """测试 --keys 只能与 --headless 一起使用"""
+        self.assertEqual(parse_args(["--headless", "--keys", "abc"]).keys, "abc")
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                parse_args(["--keys", "abc"])
+
+
+class FailingGetch(GetchScript):
+    """set_wakeup() fails, like a console setup error after raw mode"""
+
+    closed = False
+
+    def set_wakeup(self, wakeup: Event) -> None:
+        raise RuntimeError("console setup failed")
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class TestControllerCleanup(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def test_init_error(self) -> None:
+        """测试初始化失败时关闭输入、录像与导出"""
+        getcher = FailingGetch()
+        recorder = Recorder(os.path.join(self.tempdir.name, "session.rec"))
+        exporter = ScreenExport(os.path.join(self.tempdir.name, "screen.bin"))
+        with self.assertRaises(RuntimeError):
+            Controller(
+                5,
+                20,
+                getcher=getcher,
+                headless=True,
+                recorder=recorder,
+                exporter=exporter,
+            )
+        self.assertTrue(getcher.closed)
+        self.assertFalse(recorder.writer_thread.is_alive())
+
+    def test_run_error(self) -> None:
+        """测试游戏没能启动时 stop() 仍关闭录像与导出"""
+
+        def runner(lines: int, columns: int) -> RunBase:
+            raise FileNotFoundError("game")
+
+        recorder = Recorder(os.path.join(self.tempdir.name, "session.rec"))
+        ctrl = Controller(
+            5,
+            20,
+            runner=runner,
+            headless=True,
+            recorder=recorder,
+            exporter=ScreenExport(os.path.join(self.tempdir.name, "screen.bin")),
+        )
+        with self.assertRaises(FileNotFoundError):
+            ctrl.run()
+        ctrl.close()
+        self.assertIsNone(ctrl.recorder)
+        self.assertIsNone(ctrl.exporter)
+        self.assertFalse(recorder.writer_thread.is_alive())
+
+
+class TestControllerRecord(unittest.TestCase):
+    def test_write_many_tokens(self) -> None:
+        """测试批量写入按每个按键分别录制"""
+        with tempfile.TemporaryDirectory() as tempdir:
+            output = os.path.join(tempdir, "output.txt")
+            with open(output, "w", encoding="utf-8") as file:
+                file.write("hello")
+
+            def runner(lines: int, columns: int) -> RunBase:
+                return RunReplay(output, lines=lines, columns=columns)
+
+            recording = os.path.join(tempdir, "session.rec")
+            ctrl = Controller(
+                5, 20, runner=runner, headless=True, recorder=Recorder(recording)
+            )
+            ctrl.run()
+            ctrl.write_many(["\x1b", "[A", "\x1b[B"])
+            ctrl.stop()
+            inputs = [
+                record.text
+                for record in iter_records(recording)
+                if isinstance(record, RecordInput)
+            ]
+        self.assertEqual(inputs, ["\x1b", "[A", "\x1b[B"])
+
+
+class TestGameRunner(unittest.TestCase):
+    def test_unknown_backend(self) -> None:
+        """测试未知后端报出可用的名字"""
+        with self.assertRaisesRegex(ValueError, "RunPosixPTY"):
+            game_runner("RunReplay")
+
+
+@unittest.skipIf(sys.platform == "win32", "uses RunPosixPTY")
+class TestHeadlessController(unittest.TestCase):
+    def test_headless_run(self) -> None:
+        """测试无界面模式运行到游戏退出"""
+        getcher = GetchScript(["a", "\r"])
+        ctrl = Controller(5, 20, getcher=getcher, runner=echo_runner, headless=True)
+        ctrl.run()
+        deadline = time.monotonic() + 10
+        fed = False
+        while ctrl.is_running() and time.monotonic() < deadline:
+            chars = ctrl.getch_many()
+            if len(chars) > 0:
+                ctrl.write_many(chars)
+            ctrl.nextframe()
+            text = [
+                "".join(char.char for char in line).rstrip()
+                for line in ctrl.screen.buffer
+            ]
+            if "got a" in text and not fed:
+                getcher.feed(["q", "\r"])
+                fed = True
+            ctrl.wait()
+        self.assertTrue(fed)
+        self.assertFalse(ctrl.is_running())
+        self.assertGreater(ctrl.frames, 0)
+        ctrl.stop()
+
+    def test_close_wakeup(self) -> None:
+        """测试 close() 关闭唤醒管道"""
+        ctrl = Controller(5, 20, runner=echo_runner, headless=True)
+        fds = [ctrl.wakeup.read_fd, ctrl.wakeup.write_fd]  # type: ignore
+        ctrl.close()
+        for fd in fds:
+            with self.assertRaises(OSError):
+                os.fstat(fd)
+        # 迟到的唤醒不会出错
+        ctrl.wakeup.set()
+        ctrl.wakeup.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
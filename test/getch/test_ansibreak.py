@@ -78,5 +78,54 @@ class TestAnsiBreakDecode(unittest.TestCase):
         self.assertEqual(result, expected)
 
 
+class TestAnsiBreakChunks(unittest.TestCase):
+    TEXT = "ab\x1b[1;5Ac\x1bOP\x1b]0;t\x07\x1b[3\x18d\x1bP1$q\x1b\\e\x1b"
+
+    def test_split_anywhere(self):
+        """测试在任意位置切开输入结果相同"""
+        expected = AnsiBreak().decode(self.TEXT, timestamp=0.0)
+        for cut in range(len(self.TEXT) + 1):
+            parser = AnsiBreak()
+            result = parser.decode(self.TEXT[:cut], timestamp=0.0)
+            result += parser.decode(self.TEXT[cut:], timestamp=0.0)
+            self.assertEqual(result, expected, cut)
+
+    def test_readchar_matches_decode(self):
+        """测试逐字符 readchar 与 decode 状态一致"""
+        decoder = AnsiBreak()
+        stepper = AnsiBreak()
+        for ch in self.TEXT:
+            decoder.decode(ch, timestamp=0.0)
+            stepper.readchar(ch, 0.0)
+            self.assertEqual(decoder.state, stepper.state)
+
+    def test_cancel(self):
+        """测试CAN字符中断转义序列"""
+        self.assertEqual(
+            AnsiBreak().decode("\x1b[3\x18x", timestamp=0.0),
+            ["\x1b[3", "\x18", "x"],
+        )
+
+
+class TestAnsiBreakDeadline(unittest.TestCase):
+    def setUp(self):
+        self.parser = AnsiBreak(escape_timeout=0.05)
+
+    def test_no_deadline(self):
+        """测试没有未完成的转义序列时没有截止时间"""
+        self.assertIsNone(self.parser.next_deadline())
+        self.parser.decode("abc\x1b[1m", timestamp=1.0)
+        self.assertIsNone(self.parser.next_deadline())
+
+    def test_escape_timeout(self):
+        """测试单独的ESC在截止时间后输出"""
+        self.assertEqual(self.parser.decode("\x1b", timestamp=1.0), [])
+        self.assertEqual(self.parser.next_deadline(), 1.05)
+        self.assertEqual(self.parser.decode("", timestamp=1.01), [])
+        self.assertEqual(self.parser.decode("", timestamp=1.06), ["\x1b"])
+        self.assertIsNone(self.parser.next_deadline())
+        self.assertEqual(self.parser.decode("a", timestamp=1.07), ["a"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,65 @@
+import os
+import select
+import sys
+import unittest
+
+if sys.platform != "win32":
+    import termios
+
+    from tggw_autotravel.getch import GetchPosix
+
+
+@unittest.skipIf(sys.platform == "win32", "POSIX only")
+class TestGetchPosix(unittest.TestCase):
+    def setUp(self):
+        # 用伪终端代替键盘
+        self.master, self.slave = os.openpty()
+        self.attrs = termios.tcgetattr(self.slave)
+        self.getcher = GetchPosix(escape_timeout=0.05, fd=self.slave)
+
+    def tearDown(self):
+        self.getcher.close()
+        self.assertEqual(termios.tcgetattr(self.slave), self.attrs)
+        os.close(self.master)
+        os.close(self.slave)
+
+    def write(self, data):
+        self.assertEqual(os.write(self.master, data), len(data))
+        # 终端驱动可能稍后才把数据交给从端
+        select.select([self.slave], [], [], 1)
+
+    def test_no_input(self):
+        """测试没有输入时返回空"""
+        self.assertEqual(self.getcher.getch(), "")
+        self.assertEqual(self.getcher.getch_many(), [])
+
+    def test_burst(self):
+        """测试一次读取全部输入"""
+        # 不超过终端的输入缓冲区
+        data = ("ab\x1b[A中" * 200).encode()
+        self.write(data)
+        tokens = self.getcher.getch_many()
+        self.assertEqual(len(tokens), 800)
+        self.assertEqual(tokens[:4], ["a", "b", "\x1b[A", "中"])
+        self.assertEqual(self.getcher.getch_many(), [])
+
+    def test_getch(self):
+        """测试逐个读取"""
+        self.write(b"x\x1b[1;5Py")
+        self.assertEqual(self.getcher.getch(), "x")
+        self.assertEqual(self.getcher.getch(), "\x1b[1;5P")
+        self.assertEqual(self.getcher.getch(), "y")
+        self.assertEqual(self.getcher.getch(), "")
+
+    def test_escape_deadline(self):
+        """测试单独的ESC超时后输出"""
+        self.assertIsNone(self.getcher.deadline())
+        self.write(b"\x1b")
+        self.assertEqual(self.getcher.getch_many(), [])
+        deadline = self.getcher.deadline()
+        self.assertIsNotNone(deadline)
+        self.assertEqual(self.getcher.fileno(), self.slave)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,8 @@
+from tggw_autotravel.screen import Screen
+
+
+def line_text(screen: Screen, y: int) -> str:
+    """
+    Text of row y without the trailing spaces
+    """
+    return "".join(char.char for char in screen.buffer[y]).rstrip()
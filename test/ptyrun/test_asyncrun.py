@@ -0,0 +1,104 @@
+import asyncio
+import os
+import unittest
+from typing import Iterable, Optional
+
+from tggw_autotravel.run import AsyncRun, RunBase, RunWinConsole
+from tggw_autotravel.screen import Char, Color, Screen
+
+from .test_winconsole import STUB
+
+
+class PipeRun(RunBase):
+    """
+    程序输出写入管道，屏幕第一行显示读到的内容
+    """
+
+    def __init__(self, *args: str, **kwargs: object) -> None:
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        self.screen = Screen(1, 8)
+        self.text = ""
+
+    def fileno(self) -> Optional[int]:
+        return self.read_fd
+
+    def deadline(self) -> Optional[float]:
+        return None
+
+    def alive(self) -> bool:
+        return self.write_fd != -1
+
+    def read_screen(self) -> None:
+        try:
+            self.text += os.read(self.read_fd, 1024).decode()
+        except BlockingIOError:
+            pass
+        for x, ch in enumerate(self.text[-8:]):
+            self.screen.buffer[0][x] = Char(ch, Color.WHITE, Color.BLACK)
+
+    def write(self, text: str) -> None:
+        os.write(self.write_fd, text.encode())
+
+    def write_many(self, texts: Iterable[str]) -> None:
+        self.write("".join(texts))
+
+    def kill(self) -> None:
+        os.close(self.write_fd)
+        self.write_fd = -1
+
+    def close(self) -> None:
+        os.close(self.read_fd)
+        if self.write_fd != -1:
+            self.kill()
+
+
+def first_line(screen: Screen) -> str:
+    return "".join(char.char for char in screen.buffer[0])
+
+
+class TestAsyncRunReader(unittest.IsolatedAsyncioTestCase):
+    async def test_add_reader(self) -> None:
+        """测试有 fileno 的后端用 add_reader 唤醒"""
+        game = AsyncRun(PipeRun())
+        waiter = asyncio.ensure_future(game.wait())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+        await game.write_many(["ab", "c"])
+        await asyncio.wait_for(waiter, 1)
+        self.assertTrue(await game.read_frame())
+        self.assertEqual(first_line(game.screen)[:3], "abc")
+        await game.close()
+
+
+class TestAsyncRunExecutor(unittest.IsolatedAsyncioTestCase):
+    async def test_winconsole(self) -> None:
+        """测试阻塞后端在线程池中运行"""
+        game = AsyncRun(RunWinConsole("game.exe", lines=5, columns=12, server=STUB))
+        await game.wait()
+        self.assertTrue(await game.read_frame())
+        self.assertEqual(first_line(game.screen), "game.exe    ")
+        await game.write("@")
+        await game.wait()
+        await game.read_frame()
+        self.assertEqual(game.screen.buffer[0][8].char, "@")
+        await game.kill()
+        self.assertFalse(await game.alive())
+        await game.close()
+
+    async def test_concurrent_games(self) -> None:
+        """测试多个游戏共用一个事件循环"""
+        games = [
+            AsyncRun(RunWinConsole(f"game{i}.exe", lines=5, columns=12, server=STUB))
+            for i in range(3)
+        ]
+        await asyncio.gather(*(game.read_frame() for game in games))
+        self.assertEqual(
+            [first_line(game.screen)[:9] for game in games],
+            ["game0.exe", "game1.exe", "game2.exe"],
+        )
+        await asyncio.gather(*(game.close() for game in games))
+
+
+if __name__ == "__main__":
+    unittest.main()
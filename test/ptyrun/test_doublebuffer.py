@@ -0,0 +1,68 @@
+import threading
+import unittest
+
+from tggw_autotravel.run.doublebuffer import DoubleBuffer
+from tggw_autotravel.run.vt import VTParser
+from tggw_autotravel.screen import Cursor, Screen
+
+from .helpers import line_text
+
+
+class TestDoubleBuffer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.buffers = DoubleBuffer(5, 12)
+        self.front = self.buffers.front
+
+    def test_swap(self) -> None:
+        """测试交换后前台显示新内容，且对象不变"""
+        self.buffers.feed("a")
+        self.assertEqual(line_text(self.front, 0), "")
+        self.assertTrue(self.buffers.swap())
+        self.assertIs(self.buffers.front, self.front)
+        self.assertEqual(line_text(self.front, 0), "a")
+        self.assertEqual(self.front.cursor, Cursor(1, 0, 1))
+        # 没有新输出时不交换
+        self.assertFalse(self.buffers.swap())
+
+    def test_sync(self) -> None:
+        """测试交换后后台补上前台的修改"""
+        self.buffers.feed("a")
+        self.buffers.swap()
+        generation = self.front.generation
+        self.buffers.feed("\x1b[3;1Hb")
+        self.buffers.swap()
+        self.assertEqual(line_text(self.front, 0), "a")
+        self.assertEqual(line_text(self.front, 2), "b")
+        self.assertEqual(self.front.rows_changed_since(generation), [2])
+        self.buffers.feed("c")
+        self.buffers.swap()
+        self.assertEqual(
+            [line_text(self.front, y) for y in range(3)], ["a", "", "bc"]
+        )
+
+    def test_busy(self) -> None:
+        """测试读取线程正在解析时不等待"""
+        self.buffers.feed("a")
+        with self.buffers.lock:
+            self.assertFalse(self.buffers.swap())
+        self.assertTrue(self.buffers.swap())
+
+    def test_threads(self) -> None:
+        """测试读取线程解析时主线程不断交换"""
+        chunks = [f"\x1b[{i % 5 + 1};1H\x1b[3{i % 8}mline {i}" for i in range(2000)]
+
+        def reader() -> None:
+            for chunk in chunks:
+                self.buffers.feed(chunk)
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        while thread.is_alive():
+            self.buffers.swap()
+        thread.join()
+        self.buffers.swap()
+        expected = Screen(5, 12)
+        parser = VTParser(expected)
+        parser.feed("".join(chunks))
+        parser.update()
+        self.assertEqual(self.front, expected)
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+from tggw_autotravel.run import AsyncRun
+from tggw_autotravel.screen import Color
+
+from .helpers import line_text
+
+if sys.platform != "win32":
+    from tggw_autotravel.run import RunPosixPTY
+
+# 输出一行彩色文字，然后回显输入的一行
+PROGRAM = (
+    "import sys\n"
+    "sys.stdout.write('\\x1b[31mhello\\x1b[0m\\r\\n')\n"
+    "sys.stdout.flush()\n"
+    "line = sys.stdin.readline()\n"
+    "sys.stdout.write('got ' + line.strip() + '\\r\\n')\n"
+    "sys.stdout.flush()\n"
+)
+
+
+@unittest.skipIf(sys.platform == "win32", "POSIX only")
+class TestRunPosixPTY(unittest.TestCase):
+    def setUp(self) -> None:
+        self.game = RunPosixPTY(sys.executable, "-c", PROGRAM, lines=5, columns=20)
+
+    def tearDown(self) -> None:
+        self.game.close()
+
+    def wait_for(self, y: int, text: str) -> None:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            self.game.read_screen()
+            if line_text(self.game.screen, y) == text:
+                return
+            time.sleep(0.01)
+        self.fail(f"{line_text(self.game.screen, y)!r} != {text!r}")
+
+    def test_read_write(self) -> None:
+        """测试读取屏幕和写入"""
+        self.wait_for(0, "hello")
+        self.assertEqual(self.game.screen.buffer[0][0].fg, Color.RED)
+        self.game.write_many(["a", "b", "\r"])
+        # 终端回显输入，程序输出在下一行
+        self.wait_for(2, "got ab")
+        self.game.process.wait(10)
+        self.assertFalse(self.game.alive())
+        self.game.read_screen()
+
+    def test_kill(self) -> None:
+        """测试结束程序"""
+        self.assertTrue(self.game.alive())
+        self.game.kill()
+        self.game.process.wait(10)
+        self.assertFalse(self.game.alive())
+
+    def test_close_twice(self) -> None:
+        """测试重复关闭不会再次关闭文件描述符"""
+        self.game.close()
+        # 新打开的文件通常复用刚关闭的编号
+        fd = os.open(os.devnull, os.O_RDONLY)
+        try:
+            self.game.close()
+            os.fstat(fd)
+        finally:
+            os.close(fd)
+
+
+@unittest.skipIf(sys.platform == "win32", "POSIX only")
+class TestAsyncRunPosixPTY(unittest.IsolatedAsyncioTestCase):
+    async def test_add_reader(self) -> None:
+        """测试 AsyncRun 直接监视 pty"""
+        game = AsyncRun(RunPosixPTY(sys.executable, "-c", PROGRAM, lines=5, columns=20))
+        self.assertIsNotNone(game.run.fileno())
+        while "hello" not in line_text(game.run.screen, 0):
+            await asyncio.wait_for(game.wait(), 10)
+            await game.read_frame()
+        self.assertIsNotNone(game.fd)
+        await game.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+import unittest
+
+from tggw_autotravel.controller import Controller
+from tggw_autotravel.record import Recorder
+from tggw_autotravel.run import RunBase, RunReplay
+from tggw_autotravel.screen import Char, Color, Cursor, Screen
+
+
+class TestRunReplay(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "session.rec")
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def record(self, frames: int) -> Screen:
+        recorder = Recorder(self.path, keyframe_interval=4)
+        screen = Screen(5, 12)
+        for i in range(frames):
+            screen.buffer[i % 5][i] = Char(str(i % 10), Color.GREEN, Color.BLACK)
+            screen.cursor = Cursor(i, i % 5, 1)
+            recorder.frame(screen)
+            recorder.input("x")
+        recorder.close()
+        return screen
+
+    def test_controller(self) -> None:
+        """测试作为 Controller 的后端回放录像"""
+        screen = self.record(10)
+
+        def runner(lines: int, columns: int) -> RunBase:
+            return RunReplay(self.path, lines=lines, columns=columns)
+
+        ctrl = Controller(5, 12, runner=runner, headless=True)
+        ctrl.run()
+        while ctrl.is_running():
+            ctrl.write("a")
+            ctrl.nextframe()
+            ctrl.wait()
+        self.assertEqual(ctrl.frames, 10)
+        self.assertEqual(ctrl.screen, screen)
+        ctrl.stop()
+
+    def test_realtime(self) -> None:
+        """测试按录制时的节奏回放"""
+        recorder = Recorder(self.path)
+        screen = Screen(2, 2)
+        recorder.frame(screen)
+        time.sleep(0.05)
+        screen.buffer[1][1] = Char("!", Color.WHITE, Color.BLACK)
+        recorder.frame(screen)
+        recorder.close()
+        game = RunReplay(self.path, lines=2, columns=2, realtime=True)
+
+        def sleep_until_deadline() -> None:
+            deadline = game.deadline()
+            assert deadline is not None
+            time.sleep(max(0.0, deadline - time.monotonic()))
+
+        sleep_until_deadline()
+        game.read_screen()
+        self.assertEqual(game.screen.buffer[1][1].char, " ")
+        self.assertGreater(game.deadline() or 0.0, time.monotonic())
+        sleep_until_deadline()
+        game.read_screen()
+        self.assertEqual(game.screen.buffer[1][1].char, "!")
+        self.assertFalse(game.alive())
+
+    def test_raw_output(self) -> None:
+        """测试回放原始输出"""
+        with open(self.path, "w", encoding="utf-8", newline="") as file:
+            # 超过一个 RAW_CHUNK
+            file.write("\x1b[Hy" * 1500 + "\x1b[2J\x1b[H\x1b[31mhello\x1b[0m\r\n")
+        game = RunReplay(self.path, lines=5, columns=12)
+        while game.alive():
+            game.read_screen()
+        self.assertEqual("".join(c.char for c in game.screen.buffer[0]), "hello       ")
+        self.assertEqual(game.screen.buffer[0][0].fg, Color.RED)
+        game.close()
+        # 原始输出没有时间戳
+        with self.assertRaises(ValueError):
+            RunReplay(self.path, realtime=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from tggw_autotravel.controller import Controller
+from tggw_autotravel.record import Recorder, RecordFrame, iter_records
+from tggw_autotravel.run import RunBase, RunSharedMemory
+from tggw_autotravel.run.sharedmemory import (
+    ALIVE_OFFSET,
+    FRAME_NUMBER,
+    PUBLISHED_OFFSET,
+)
+from tggw_autotravel.run.vt import VTParser
+from tggw_autotravel.screen import Color, Screen
+
+from .helpers import line_text
+
+# 输出一行彩色文字，然后回显输入的一行
+PROGRAM = (
+    "import sys\n"
+    "sys.stdout.write('\\x1b[31mhello\\x1b[0m\\r\\n')\n"
+    "sys.stdout.flush()\n"
+    "line = sys.stdin.readline()\n"
+    "sys.stdout.write('got ' + line.strip() + '\\r\\n')\n"
+    "sys.stdout.flush()\n"
+)
+
+
+class TestRunSharedMemory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "output.txt")
+        self.output = "".join(
+            f"\x1b[{i % 5 + 1};1H\x1b[3{i % 8}mline {i}" for i in range(3000)
+        )
+        with open(self.path, "w", encoding="utf-8", newline="") as file:
+            file.write(self.output)
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def test_replay(self) -> None:
+        """测试在子进程中回放并共享屏幕"""
+        game = RunSharedMemory(self.path, lines=5, columns=12, backend="RunReplay")
+        deadline = time.monotonic() + 30
+        while game.alive() and time.monotonic() < deadline:
+            game.read_screen()
+        game.read_screen()
+        self.assertFalse(game.alive())
+        # 屏幕直接指向共享内存
+        self.assertIsInstance(game.screen.cells, memoryview)
+        expected = Screen(5, 12)
+        parser = VTParser(expected)
+        parser.feed(self.output)
+        parser.update()
+        self.assertEqual(game.screen, expected)
+        game.close()
+        # 关闭后保留最后一帧的副本
+        self.assertEqual(game.screen, expected)
+
+    def test_exit_frame(self) -> None:
+        """测试退出帧发布后、读取前 alive() 仍为真"""
+        game = RunSharedMemory(self.path, lines=5, columns=12, backend="RunReplay")
+        self.addCleanup(game.close)
+        buf = game.shm.buf
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            (published,) = FRAME_NUMBER.unpack_from(buf, PUBLISHED_OFFSET)
+            if published == game.frame:
+                time.sleep(0.001)
+                continue
+            if not buf[ALIVE_OFFSET]:
+                break
+            # 子进程在确认之前不会发布下一帧，这里正好读到 published
+            game.read_screen()
+        else:
+            self.fail("no exit frame")
+        # 退出帧已经发布但还没读
+        self.assertTrue(game.alive())
+        game.read_screen()
+        self.assertFalse(game.alive())
+        self.assertEqual(line_text(game.screen, 4), "line 2999")
+
+    def test_controller(self) -> None:
+        """测试作为 Controller 的后端"""
+
+        def runner(lines: int, columns: int) -> RunBase:
+            return RunSharedMemory(
+                self.path, lines=lines, columns=columns, backend="RunReplay"
+            )
+
+        recording = os.path.join(self.tempdir.name, "session.rec")
+        ctrl = Controller(
+            5, 12, runner=runner, headless=True, recorder=Recorder(recording)
+        )
+        ctrl.run()
+        deadline = time.monotonic() + 30
+        while ctrl.is_running() and time.monotonic() < deadline:
+            ctrl.nextframe()
+            ctrl.wait()
+        self.assertFalse(ctrl.is_running())
+        self.assertEqual(line_text(ctrl.screen, 4), "line 2999")
+        screen = ctrl.screen.copy()
+        ctrl.stop()
+        # 录像的最后一帧与共享的屏幕相同
+        frames = [r for r in iter_records(recording) if isinstance(r, RecordFrame)]
+        self.assertEqual(frames[-1].screen, screen)
+
+    def test_error(self) -> None:
+        """测试子进程中后端启动失败"""
+        with self.assertRaises(FileNotFoundError):
+            RunSharedMemory(
+                os.path.join(self.tempdir.name, "missing"), backend="RunReplay"
+            )
+
+    @unittest.skipIf(sys.platform == "win32", "POSIX only")
+    def test_posixpty(self) -> None:
+        """测试在子进程中运行 pty 并写入"""
+        game = RunSharedMemory(sys.executable, "-c", PROGRAM, lines=5, columns=20)
+
+        def wait_for(y: int, text: str) -> None:
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                game.read_screen()
+                if line_text(game.screen, y) == text:
+                    return
+                time.sleep(0.01)
+            self.fail(f"{line_text(game.screen, y)!r} != {text!r}")
+
+        try:
+            wait_for(0, "hello")
+            self.assertEqual(game.screen.buffer[0][0].fg, Color.RED)
+            game.write_many(["a", "b", "\r"])
+            wait_for(2, "got ab")
+        finally:
+            game.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
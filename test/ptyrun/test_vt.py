@@ -0,0 +1,174 @@
+import random
+import re
+import unittest
+
+from tggw_autotravel.run.pyteadapter import PyteAdapter
+from tggw_autotravel.run.vt import VTParser, make_parser
+from tggw_autotravel.screen import Char, Color, Cursor, Screen
+
+from .helpers import line_text
+
+
+# 随机输出的片段，只用 pyte 0.8 行为正确的序列
+# （L/M/@ 和 DECOM 在 pyte 中有缺陷，单独测试）
+PIECES = [
+    lambda r: "".join(r.choice("abc .#@XYZ") for _ in range(r.randint(1, 30))),
+    lambda r: r.choice(["中", "文字", "é", "é", "ｱ"]),
+    lambda r: f"\x1b[{r.randint(0, 12)};{r.randint(0, 25)}H",
+    lambda r: f"\x1b[{r.randint(0, 12)}{r.choice('ABCDEFGdXPa')}",
+    lambda r: r.choice([f"\x1b[{r.randint(0, 3)}J", f"\x1b[{r.randint(0, 2)}K"]),
+    lambda r: "\x1b["
+    + ";".join(
+        str(r.choice([0, 1, 7, 27, 31, 33, 37, 39, 40, 44, 47, 49, 90, 97, 104]))
+        for _ in range(r.randint(0, 3))
+    )
+    + "m",
+    lambda r: f"\x1b[{r.choice((38, 48))};5;{r.choice(range(0, 256, 5))}m",
+    lambda r: f"\x1b[38;2;{r.choice((0, 255))};{r.choice((0, 255))};0m",
+    lambda r: r.choice(["\r", "\n", "\b", "\t", "\x07", "\r\n", "\x0b"]),
+    lambda r: r.choice(
+        [
+            "\x1b[?25l",
+            "\x1b[?25h",
+            "\x1b[?7l",
+            "\x1b[?7h",
+            "\x1b7",
+            "\x1b8",
+            "\x1bM",
+            "\x1bD",
+            "\x1bE",
+            "\x1bH",
+            "\x1b[g",
+            "\x1b[3g",
+            "\x1b(B",
+            "\x1b]0;title\x07",
+            "\x1b[r",
+        ]
+    ),
+    lambda r: f"\x1b[{r.randint(0, 6)};{r.randint(4, 12)}r",
+]
+
+
+def random_output(seed: int) -> str:
+    rand = random.Random(seed)
+    text = "".join(rand.choice(PIECES)(rand) for _ in range(rand.randint(1, 60)))
+    # pyte 0.8 清除整行时只改写过的格子，颜色复位后两者一致
+    return re.sub(r"\x1b\[\d*[JK]", lambda m: "\x1b[0m" + m.group(), text)
+
+
+class TestVTParser(unittest.TestCase):
+    def setUp(self) -> None:
+        self.screen = Screen(5, 12)
+        self.parser = VTParser(self.screen)
+
+    def feed(self, text: str) -> None:
+        self.parser.feed(text)
+        self.parser.update()
+
+    def test_draw(self) -> None:
+        """测试写入文字、颜色和光标"""
+        self.feed("ab\x1b[31;44mc\x1b[0m\x1b[2;3Hxy")
+        self.assertEqual(line_text(self.screen, 0), "abc")
+        self.assertEqual(self.screen.buffer[0][2], Char("c", Color.RED, Color.BLUE))
+        self.assertEqual(self.screen.buffer[0][1], Char("b", Color.WHITE, Color.BLACK))
+        self.assertEqual(line_text(self.screen, 1), "  xy")
+        self.assertEqual(self.screen.cursor, Cursor(4, 1, 1))
+        self.feed("\x1b[?25l")
+        self.assertEqual(self.screen.cursor, Cursor(4, 1, 0))
+
+    def test_wrap_and_scroll(self) -> None:
+        """测试自动换行和滚屏"""
+        self.feed("\x1b[5;1H" + "0123456789ABCD")
+        self.assertEqual(line_text(self.screen, 3), "0123456789AB")
+        self.assertEqual(line_text(self.screen, 4), "CD")
+        self.feed("\x1b[?7l\x1b[5;11Hxyz")
+        self.assertEqual(line_text(self.screen, 4), "CD        xz")
+
+    def test_wide(self) -> None:
+        """测试宽字符和组合字符"""
+        self.feed("中é")
+        self.assertEqual(self.screen.buffer[0][0].char, "中")
+        self.assertEqual(self.screen.buffer[0][1].char, "")
+        self.assertEqual(self.screen.buffer[0][2].char, "é")
+        self.assertEqual(self.screen.cursor.x, 3)
+
+    def test_erase(self) -> None:
+        """测试清除使用当前背景色"""
+        self.feed("abcdef\x1b[1;3H\x1b[42m\x1b[K")
+        self.assertEqual(line_text(self.screen, 0), "ab")
+        self.assertEqual(self.screen.buffer[0][5], Char(" ", Color.WHITE, Color.GREEN))
+        self.feed("\x1b[2J")
+        self.assertEqual(self.screen.buffer[4][0], Char(" ", Color.WHITE, Color.GREEN))
+
+    def test_edit_lines(self) -> None:
+        """测试插入、删除行和字符"""
+        self.feed("a\r\nb\r\nc\x1b[1;1H\x1b[L")
+        self.assertEqual(
+            [line_text(self.screen, y) for y in range(4)], ["", "a", "b", "c"]
+        )
+        self.feed("\x1b[2M")
+        self.assertEqual(
+            [line_text(self.screen, y) for y in range(4)], ["b", "c", "", ""]
+        )
+        self.feed("xyz\x1b[1;2H\x1b[2@")
+        self.assertEqual(line_text(self.screen, 0), "x  yz")
+        self.feed("\x1b[3P")
+        self.assertEqual(line_text(self.screen, 0), "xz")
+
+    def test_column(self) -> None:
+        """测试 CHA 和 HPA 移到指定列"""
+        self.feed("\x1b[2;1H\x1b[5Ga\x1b[9`b")
+        self.assertEqual(line_text(self.screen, 1), "    a   b")
+        self.feed("\x1b[99`")
+        self.assertEqual(self.screen.cursor.x, 11)
+
+    def test_split_sequence(self) -> None:
+        """测试被切开的控制序列"""
+        for chunk in ["\x1b", "[3", "1", "m", "a\x1b]0;t", "itle\x1b", "\\b"]:
+            self.parser.feed(chunk)
+        self.parser.update()
+        self.assertEqual(line_text(self.screen, 0), "ab")
+        self.assertEqual(self.screen.buffer[0][0].fg, Color.RED)
+
+    def test_dirty_rows(self) -> None:
+        """测试只标记修改过的行"""
+        self.feed("")
+        generation = self.screen.generation
+        self.feed("\x1b[3;1Hx")
+        self.assertEqual(self.screen.rows_changed_since(generation), [2])
+        generation = self.screen.generation
+        self.feed("\x1b[1;1H")
+        self.assertEqual(self.screen.rows_changed_since(generation), [])
+
+    def test_unknown(self) -> None:
+        """测试忽略未知序列"""
+        with self.assertLogs("tggw_autotravel.run.vt", "DEBUG"):
+            self.feed("\x1b[5z\x1bPa")
+        self.assertEqual(line_text(self.screen, 0), "a")
+
+    def test_make_parser(self) -> None:
+        """测试选择解析器"""
+        self.assertIsInstance(make_parser(self.screen), VTParser)
+        self.assertIsInstance(make_parser(self.screen, "pyte"), PyteAdapter)
+        with self.assertRaises(ValueError):
+            make_parser(self.screen, "xterm")
+
+    def test_same_as_pyte(self) -> None:
+        """测试随机输出的结果与 pyte 相同"""
+        for seed in range(300):
+            text = random_output(seed)
+            vt_screen = Screen(10, 24)
+            pyte_screen = Screen(10, 24)
+            vt = VTParser(vt_screen)
+            adapter = PyteAdapter(pyte_screen)
+            # 在随机位置切开，覆盖不完整的序列
+            rand = random.Random(seed)
+            cuts = sorted(rand.sample(range(len(text) + 1), min(3, len(text) + 1)))
+            for start, stop in zip([0, *cuts], [*cuts, len(text)]):
+                vt.feed(text[start:stop])
+            adapter.feed(text)
+            vt.update()
+            adapter.pyte_screen.dirty.update(range(10))
+            adapter.update()
+            with self.subTest(seed=seed, text=text):
+                self.assertEqual(vt_screen, pyte_screen)
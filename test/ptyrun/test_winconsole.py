@@ -1,5 +1,20 @@
+import os
+import struct
+import sys
 import unittest
-from tggw_autotravel.run.winconsole import paramvine
+from tggw_autotravel.run.winconsole import (
+    KEYS_PER_QUERY,
+    RunWinConsole,
+    paramvine,
+    decode_cells,
+    encode_keys,
+    M_ALT,
+    M_CTRL,
+    M_SHIFT,
+)
+from tggw_autotravel.screen import Char, Color, unpack_char
+
+STUB = (sys.executable, os.path.join(os.path.dirname(__file__), "winconsole_stub.py"))
 
 
 class TestParamVine(unittest.TestCase):
@@ -67,5 +82,189 @@ class TestParamVine(unittest.TestCase):
         )
 
 
+class TestDecodeCells(unittest.TestCase):
+    def test_decode_cells(self) -> None:
+        """测试批量解码 ReplyScreenChar"""
+        chars = [(ord("@"), 0x0E), (0x4E2D, 0x1F), (0, 0x07), (0xFFFF, 0xF0)]
+        data = b"".join(struct.pack("<HB", code, color) for code, color in chars)
+        cells = decode_cells(data)
+        self.assertEqual(len(cells), len(chars))
+        self.assertEqual(
+            unpack_char(cells[0]), Char("@", Color.LIGHT_YELLOW, Color.BLACK)
+        )
+        self.assertEqual(
+            unpack_char(cells[1]), Char("中", Color.LIGHT_WHITE, Color.BLUE)
+        )
+        self.assertEqual(unpack_char(cells[2]), Char("", Color.WHITE, Color.BLACK))
+        self.assertEqual(
+            unpack_char(cells[3]), Char("\uffff", Color.BLACK, Color.LIGHT_WHITE)
+        )
+
+    def test_decode_memoryview(self) -> None:
+        """测试从 memoryview 解码"""
+        data = struct.pack("<HBHB", ord("a"), 0x21, ord("b"), 0x12)
+        cells = decode_cells(memoryview(b"\x00" + data)[1:])
+        self.assertEqual([unpack_char(cell).char for cell in cells], ["a", "b"])
+
+
+class TestEncodeKeys(unittest.TestCase):
+    def test_chars(self) -> None:
+        """测试普通字符"""
+        self.assertEqual(encode_keys("a"), [(ord("a"), 0, 0)])
+        self.assertEqual(encode_keys("\x08"), [(0x7F, 0, 0)])
+        self.assertEqual(encode_keys("\U0001f600"), [(0xD83D, 0, 0), (0xDE00, 0, 0)])
+
+    def test_escape_sequences(self) -> None:
+        """测试转义序列"""
+        self.assertEqual(encode_keys("\x1b"), [(0x1B, 0x1B, 0)])
+        self.assertEqual(encode_keys("\x1b[A"), [(0, 0x26, 0)])
+        self.assertEqual(encode_keys("\x1bOD"), [(0, 0x25, 0)])
+        self.assertEqual(encode_keys("\x1b[1;5C"), [(0, 0x27, M_CTRL)])
+        self.assertEqual(encode_keys("\x1b[6;2~"), [(0, 0x22, M_SHIFT)])
+        self.assertEqual(encode_keys("\x1b[15~"), [(0, 0x74, 0)])
+        self.assertEqual(encode_keys("\x1bx"), [(ord("x"), 0, M_ALT)])
+        self.assertEqual(encode_keys("\x1b[?25h"), [])
+
+    def test_msvcrt_keys(self) -> None:
+        """测试 msvcrt 扩展键"""
+        self.assertEqual(encode_keys("\xe0H"), [(0, 0x26, 0)])
+        self.assertEqual(encode_keys("\x00;"), [(0, 0x70, 0)])
+
+
+class TestRunWinConsoleProtocol(unittest.TestCase):
+    binary = False
+    screen_diff = False
+
+    def setUp(self) -> None:
+        self.game = RunWinConsole(
+            "game.exe",
+            lines=5,
+            columns=12,
+            binary=self.binary,
+            screen_diff=self.screen_diff,
+            server=STUB,
+        )
+
+    def tearDown(self) -> None:
+        self.game.close()
+
+    def test_screen(self) -> None:
+        """测试读取屏幕"""
+        self.game.read_screen()
+        screen = self.game.screen
+        self.assertEqual((screen.lines, screen.columns), (5, 12))
+        self.assertEqual("".join(c.char for c in screen.buffer[0]), "game.exe    ")
+        self.assertEqual(screen.buffer[0][0].fg, Color.LIGHT_WHITE)
+        self.assertEqual((screen.cursor.x, screen.cursor.y), (8, 0))
+
+    def test_write(self) -> None:
+        """测试写入按键"""
+        self.game.write("@")
+        self.game.read_screen()
+        self.assertEqual(self.game.screen.buffer[0][8].char, "@")
+
+    def test_write_many(self) -> None:
+        """测试批量写入只需一次往返"""
+        read_reply = self.game.read_reply
+        replies = []
+
+        def count_reply() -> memoryview:
+            replies.append(None)
+            return read_reply()
+
+        self.game.read_reply = count_reply  # type: ignore
+        self.game.write_many(["a", "\x1b[A", "\x1bx"] * 3)
+        self.assertEqual(len(replies), 1)
+        self.game.read_screen()
+        line = self.game.screen.buffer[0]
+        self.assertEqual("".join(line[x].char for x in range(8, 11)), "a&x")
+        self.assertEqual(line[10].bg, Color(M_ALT))
+
+    def test_write_many_error(self) -> None:
+        """测试批量写入中第一批失败时仍读完所有回复"""
+        keys = ["\uffff"] + ["a"] * (KEYS_PER_QUERY - 1) + ["b"]
+        with self.assertRaisesRegex(RuntimeError, "WriteConsoleInputW failed"):
+            self.game.write_many(keys)
+        # 协议没有错位：下一次查询读到的是自己的回复
+        self.assertTrue(self.game.alive())
+        self.game.read_screen()
+        self.assertEqual(self.game.screen.buffer[0][8].char, "b")
+
+    def test_alive_kill(self) -> None:
+        """测试存活状态与日志通道"""
+        self.assertTrue(self.game.alive())
+        with self.assertLogs("tggw_autotravel.run.winconsole", "INFO") as logs:
+            self.game.kill()
+        self.assertIn("Killed.", "".join(logs.output))
+        self.assertFalse(self.game.alive())
+
+    def test_error(self) -> None:
+        """测试错误通道"""
+        with self.assertRaises(RuntimeError):
+            self.game.query(bytes((99,)))
+        self.assertTrue(self.game.alive())
+
+
+class TestRunWinConsoleBinaryProtocol(TestRunWinConsoleProtocol):
+    binary = True
+
+
+class TestRunWinConsoleScreenDiff(TestRunWinConsoleProtocol):
+    binary = True
+    screen_diff = True
+
+    def test_diff_size(self) -> None:
+        """测试增量屏幕只发送变化的格子"""
+        reply_sizes = []
+        query = self.game.query
+
+        def query_and_measure(querybuf: bytes) -> memoryview:
+            reply = query(querybuf)
+            reply_sizes.append(len(reply))
+            return reply
+
+        self.game.query = query_and_measure  # type: ignore
+        self.game.read_screen()
+        self.game.read_screen()
+        self.game.write_many(["a", "b"])
+        self.game.read_screen()
+        full, unchanged, changed = reply_sizes
+        self.assertEqual(full, 22 + 8 + 5 * 12 * 3)
+        self.assertEqual(unchanged, 22)
+        self.assertEqual(changed, 22 + 8 + 2 * 3)
+        self.assertEqual(self.game.screen.buffer[0][8].char, "a")
+        self.assertEqual(self.game.screen.buffer[0][9].char, "b")
+
+    def test_diff_matches_full(self) -> None:
+        """测试增量屏幕与完整屏幕一致"""
+        self.game.read_screen()
+        for ch in "hello, world":
+            self.game.write(ch)
+            self.game.read_screen()
+        self.game.screen_diff = False
+        expected = self.game.screen.copy()
+        self.game.read_screen()
+        self.assertEqual(self.game.screen, expected)
+
+    def test_read_frame(self) -> None:
+        """测试一次往返同时读取屏幕与存活状态"""
+        self.assertTrue(self.game.read_frame())
+        self.assertIsNone(self.game.exit_code)
+        self.game.write("z")
+        self.assertTrue(self.game.read_frame())
+        self.assertEqual(self.game.screen.buffer[0][8].char, "z")
+        self.game.kill()
+        self.assertFalse(self.game.read_frame())
+        self.assertEqual(self.game.exit_code, 0)
+
+    def test_lost_frame(self) -> None:
+        """测试客户端帧号不符时回到完整屏幕"""
+        self.game.read_screen()
+        self.game.write("x")
+        self.game.screen_seq = 12345
+        self.game.read_screen()
+        self.assertEqual(self.game.screen.buffer[0][8].char, "x")
+
+
 if __name__ == "__main__":
     unittest.main()
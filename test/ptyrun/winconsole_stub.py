@@ -0,0 +1,210 @@
+"""
+Stand-in for winconsole.exe, speaking the same stdin/stdout protocol
+(hex lines, or binary frames with -B) over a fake console.
+"""
+
+import struct
+import sys
+from typing import List
+
+QUERY_SCREEN = 1
+QUERY_WRITE = 2
+QUERY_ALIVE = 3
+QUERY_KILL = 4
+QUERY_SCREEN_DIFF = 5
+QUERY_WRITE_KEYS = 6
+QUERY_FRAME = 7
+QUERY_QUIT = 0
+REPLY_NONE = 0
+REPLY_SCREEN = 3
+REPLY_ALIVE = 4
+REPLY_SCREEN_DIFF = 5
+REPLY_FRAME = 6
+RUN_MERGE_GAP = 2
+# a key with this charcode makes QUERY_WRITE_KEYS fail like WriteConsoleInputW
+FAIL_CHARCODE = 0xFFFF
+
+
+class Console:
+    def __init__(self, lines: int, columns: int, text: str) -> None:
+        self.lines = lines
+        self.columns = columns
+        self.chars: List[int] = [ord(" ")] * (lines * columns)
+        self.colors: List[int] = [0x07] * (lines * columns)
+        self.x = 0
+        self.y = 0
+        self.alive = True
+        self.exit_code = 0
+        self.seq = 0
+        self.sent: List[bytes] = []
+        for ch in text:
+            self.put(ord(ch), 0x0F)
+
+    def put(self, charcode: int, color: int) -> None:
+        index = self.y * self.columns + self.x
+        self.chars[index] = charcode
+        self.colors[index] = color
+        self.x += 1
+        if self.x == self.columns:
+            self.x = 0
+            self.y = (self.y + 1) % self.lines
+
+    def screen(self) -> bytes:
+        reply = struct.pack(
+            "<BHHHHB", REPLY_SCREEN, self.lines, self.columns, self.x, self.y, 1
+        )
+        return reply + b"".join(
+            struct.pack("<HB", charcode, color)
+            for charcode, color in zip(self.chars, self.colors)
+        )
+
+    def screen_diff(self, base_seq: int, mode: int = REPLY_SCREEN_DIFF) -> bytes:
+        cells = [
+            struct.pack("<HB", charcode, color)
+            for charcode, color in zip(self.chars, self.colors)
+        ]
+        runs = []
+        if base_seq != 0 and base_seq == self.seq:
+            pos = 0
+            while pos < len(cells):
+                if cells[pos] == self.sent[pos]:
+                    pos += 1
+                    continue
+                start = end = pos
+                for i in range(start, len(cells)):
+                    if i - end > RUN_MERGE_GAP:
+                        break
+                    if cells[i] != self.sent[i]:
+                        end = i + 1
+                runs.append((start, end))
+                pos = end
+        else:
+            base_seq = 0
+            runs.append((0, len(cells)))
+        self.seq += 1
+        self.sent = cells
+        reply = bytes((mode,))
+        if mode == REPLY_FRAME:
+            reply += struct.pack("<BI", 1 if self.alive else 0, self.exit_code)
+        reply += struct.pack(
+            "<HHHHBIII",
+            self.lines,
+            self.columns,
+            self.x,
+            self.y,
+            1,
+            self.seq,
+            base_seq,
+            len(runs),
+        )
+        for start, end in runs:
+            reply += struct.pack("<II", start, end - start) + b"".join(cells[start:end])
+        return reply
+
+
+class Output:
+    def __init__(self, binary: bool) -> None:
+        self.binary = binary
+        self.stdout = sys.stdout.buffer
+
+    def frame(self, kind: bytes, payload: bytes) -> None:
+        if self.binary:
+            self.stdout.write(struct.pack("<cI", kind, len(payload)) + payload)
+        elif kind == b"D":
+            self.stdout.write(payload.hex().encode() + b"\n")
+        else:
+            self.stdout.write(kind + b" " + payload + b"\n")
+        self.stdout.flush()
+
+    def data(self, payload: bytes) -> None:
+        self.frame(b"D", payload)
+
+    def log(self, text: str) -> None:
+        self.frame(b"L", text.encode())
+
+    def error(self, text: str) -> None:
+        self.frame(b"X", text.encode())
+
+
+def read_query(binary: bool) -> bytes:
+    stdin = sys.stdin.buffer
+    if binary:
+        header = stdin.read(4)
+        if len(header) < 4:
+            raise EOFError
+        (length,) = struct.unpack("<I", header)
+        return stdin.read(length)
+    line = stdin.readline()
+    if line == b"":
+        raise EOFError
+    return bytes.fromhex(line.decode())
+
+
+def main(argv: List[str]) -> None:
+    lines = 24
+    columns = 80
+    cmdline = "cmd.exe"
+    binary = False
+    args = iter(argv)
+    for arg in args:
+        if arg == "-L":
+            lines = int(next(args))
+        elif arg == "-C":
+            columns = int(next(args))
+        elif arg == "-c":
+            cmdline = next(args)
+        elif arg == "-B":
+            binary = True
+    console = Console(lines, columns, cmdline)
+    output = Output(binary)
+    output.log("Pipe has been connected.")
+    output.data(bytes((REPLY_NONE,)))
+    while True:
+        try:
+            query = read_query(binary)
+        except EOFError:
+            return
+        mode = query[0]
+        if mode == QUERY_SCREEN:
+            output.data(console.screen())
+        elif mode == QUERY_SCREEN_DIFF:
+            (base_seq,) = struct.unpack("<I", query[1:])
+            output.data(console.screen_diff(base_seq))
+        elif mode == QUERY_FRAME:
+            (base_seq,) = struct.unpack("<I", query[1:])
+            output.data(console.screen_diff(base_seq, REPLY_FRAME))
+        elif mode == QUERY_WRITE:
+            charcode, modifiers = struct.unpack("<HB", query[1:])
+            console.put(charcode, 0x07 | modifiers << 4)
+            output.data(bytes((REPLY_NONE,)))
+        elif mode == QUERY_WRITE_KEYS:
+            (count,) = struct.unpack("<H", query[1:3])
+            if len(query) != 3 + count * 5:
+                output.error("Incorrect query size")
+                continue
+            keys = list(struct.iter_unpack("<HHB", query[3:]))
+            if any(charcode == FAIL_CHARCODE for charcode, _, _ in keys):
+                output.error("WriteConsoleInputW failed (5).")
+                continue
+            for charcode, keycode, modifiers in keys:
+                # show virtual keys by their code
+                console.put(charcode or keycode, 0x07 | modifiers << 4)
+            output.data(bytes((REPLY_NONE,)))
+        elif mode == QUERY_ALIVE:
+            output.data(bytes((REPLY_ALIVE, 1 if console.alive else 0)))
+        elif mode == QUERY_KILL:
+            console.alive = False
+            # TerminateProcess(pi.hProcess, 0) like the real server,
+            # 0x127 is only used when quitting with the game still running
+            console.exit_code = 0
+            output.log("Killed.")
+            output.data(bytes((REPLY_NONE,)))
+        elif mode == QUERY_QUIT:
+            output.data(bytes((REPLY_NONE,)))
+            return
+        else:
+            output.error(f"Wrong query mode {mode}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
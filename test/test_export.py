@@ -0,0 +1,159 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from tggw_autotravel.controller import Controller
+from tggw_autotravel.export import EXPORT_SEQUENCE, ScreenExport, ScreenExportReader
+from tggw_autotravel.run import RunBase, RunReplay
+from tggw_autotravel.screen import Char, Color, Cursor, Screen
+
+# 另一个进程中读取，每一帧的所有格子应当相同
+READER = (
+    "import sys\n"
+    "from tggw_autotravel.export import ScreenExportReader\n"
+    "reader = ScreenExportReader(sys.argv[1])\n"
+    "frames = 0\n"
+    "while frames < 300:\n"
+    "    screen = reader.read(timeout=10)\n"
+    "    if screen is None:\n"
+    "        continue\n"
+    "    assert len(set(screen.cells)) == 1, set(screen.cells)\n"
+    "    frames += 1\n"
+    "reader.close()\n"
+    "print('ok')\n"
+)
+
+
+class TestScreenExport(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        # 清理函数后进先出：下面注册的 close() 先于删除目录执行，
+        # Windows 上不能删除仍被映射的文件
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = os.path.join(self.tempdir.name, "screen.bin")
+
+    def export(self) -> ScreenExport:
+        export = ScreenExport(self.path)
+        self.addCleanup(export.close)
+        return export
+
+    def reader(self) -> ScreenExportReader:
+        reader = ScreenExportReader(self.path)
+        self.addCleanup(reader.close)
+        return reader
+
+    def test_round_trip(self) -> None:
+        """测试发布后读回每一帧"""
+        reader = self.reader()
+        self.assertIsNone(reader.read())
+        self.assertEqual(reader.sequence(), 0)
+        export = self.export()
+        screen = Screen(10, 20)
+        for i in range(8):
+            screen.buffer[i % 10][i] = Char(chr(ord("a") + i), Color.RED, Color.BLACK)
+            screen.cursor = Cursor(i, i % 10, 1)
+            export.frame(screen)
+            self.assertEqual(reader.read(), screen)
+        # 只有光标移动
+        sequence = reader.sequence()
+        screen.cursor = Cursor(0, 0, 0)
+        export.frame(screen)
+        self.assertGreater(reader.sequence(), sequence)
+        self.assertEqual(reader.read(), screen)
+        # 另一个 Screen 对象
+        other = screen.copy()
+        other.buffer[9][19] = Char("z", Color.GREEN, Color.BLUE)
+        export.frame(other)
+        self.assertEqual(reader.read(), other)
+        export.close()
+        # 关闭后文件保留最后一帧
+        self.assertEqual(self.reader().read(), other)
+
+    def test_resize(self) -> None:
+        """测试屏幕大小改变时原地写入，读者按需重新映射"""
+        export = self.export()
+        reader = self.reader()
+        export.frame(Screen(5, 10))
+        self.assertEqual(reader.read(), Screen(5, 10))
+        export.frame(Screen(8, 12))
+        self.assertEqual(reader.read(), Screen(8, 12))
+        # 变小时文件不缩小
+        small = Screen(3, 4)
+        small.buffer[2][3] = Char("x", Color.RED, Color.BLACK)
+        export.frame(small)
+        self.assertEqual(reader.read(), small)
+        self.assertGreater(os.path.getsize(self.path), 8 + small.nbytes())
+
+    def test_reuse_file(self) -> None:
+        """测试新的写者沿用已有文件的序号"""
+        export = self.export()
+        export.frame(Screen(5, 10))
+        export.frame(Screen(5, 10))
+        export.close()
+        reader = self.reader()
+        sequence = reader.sequence()
+        export = self.export()
+        screen = Screen(4, 6)
+        export.frame(screen)
+        self.assertGreater(reader.sequence(), sequence)
+        self.assertEqual(reader.read(), screen)
+
+    def test_timeout(self) -> None:
+        """测试写者停在一帧中间时 read() 超时"""
+        export = self.export()
+        export.frame(Screen(5, 10))
+        assert export.map is not None
+        EXPORT_SEQUENCE.pack_into(export.map, 0, export.sequence + 1)
+        with self.assertRaises(TimeoutError):
+            self.reader().read(timeout=0.05)
+
+    def test_controller(self) -> None:
+        """测试 Controller 发布每一帧"""
+        output = os.path.join(self.tempdir.name, "output.txt")
+        with open(output, "w", encoding="utf-8", newline="") as file:
+            file.write("".join(f"\x1b[{i % 5 + 1};1Hline {i}" for i in range(300)))
+
+        def runner(lines: int, columns: int) -> RunBase:
+            return RunReplay(output, lines=lines, columns=columns)
+
+        reader = self.reader()
+        ctrl = Controller(5, 12, runner=runner, headless=True, exporter=self.export())
+        ctrl.run()
+        while ctrl.is_running():
+            ctrl.nextframe()
+            self.assertEqual(reader.read(), ctrl.screen)
+            ctrl.wait()
+        screen = ctrl.screen.copy()
+        ctrl.stop()
+        self.assertIsNone(ctrl.exporter)
+        self.assertEqual(reader.read(), screen)
+
+    def test_other_process(self) -> None:
+        """测试另一个进程读到的都是完整的帧"""
+        export = self.export()
+        screen = Screen(38, 92)
+        export.frame(screen)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        process = subprocess.Popen(
+            [sys.executable, "-c", READER, self.path],
+            cwd=root,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        i = 0
+        while process.poll() is None:
+            i += 1
+            char = Char(chr(ord("a") + i % 26), Color(i % 16), Color.BLACK)
+            for y in range(screen.lines):
+                for x in range(screen.columns):
+                    screen.buffer[y][x] = char
+            export.frame(screen)
+        stdout, _ = process.communicate()
+        self.assertEqual(process.returncode, 0)
+        self.assertEqual(stdout.strip(), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from tggw_autotravel.farm import SessionSpec, backend_class, run_farm, run_session
+from tggw_autotravel.run import RunReplay
+
+# 显示当前目录名，回显每一行输入，输入 q 时退出
+PROGRAM = (
+    "import os, sys\n"
+    "sys.stdout.write(os.path.basename(os.getcwd()) + '\\r\\n')\n"
+    "sys.stdout.flush()\n"
+    "for line in sys.stdin:\n"
+    "    if line.strip() == 'q':\n"
+    "        break\n"
+    "    sys.stdout.write('got ' + line.strip() + '\\r\\n')\n"
+    "    sys.stdout.flush()\n"
+)
+
+
+@unittest.skipIf(sys.platform == "win32", "uses RunPosixPTY")
+class TestFarm(unittest.TestCase):
+    def test_run_farm(self) -> None:
+        """测试多个会话并行运行并按顺序返回结果"""
+        with tempfile.TemporaryDirectory() as root:
+            specs = []
+            for i in range(3):
+                cwd = os.path.join(root, f"profile{i}")
+                os.mkdir(cwd)
+                specs.append(
+                    SessionSpec(
+                        sys.executable,
+                        ("-c", PROGRAM),
+                        name=f"s{i}",
+                        cwd=cwd,
+                        lines=6,
+                        columns=20,
+                        script=((str(i), "\r"), ("q", "\r")),
+                        timeout=20,
+                    )
+                )
+            results = run_farm(specs, workers=2)
+        self.assertEqual([result.name for result in results], ["s0", "s1", "s2"])
+        for i, result in enumerate(results):
+            self.assertIsNone(result.error)
+            self.assertTrue(result.exited)
+            self.assertFalse(result.timed_out)
+            self.assertEqual(result.writes, 2)
+            assert result.screen is not None
+            text = [
+                "".join(char.char for char in line).rstrip()
+                for line in result.screen.buffer
+            ]
+            self.assertEqual(text[0], f"profile{i}")
+            self.assertIn(f"got {i}", text)
+
+    def test_error(self) -> None:
+        """测试会话出错时返回错误信息"""
+        result = run_session(SessionSpec("true", backend="RunNothing"))
+        self.assertIsNotNone(result.error)
+        self.assertIn("RunNothing", result.error or "")
+
+    def test_backend_class(self) -> None:
+        """测试只接受 RunBase 的具体子类作为后端"""
+        self.assertIs(backend_class("RunReplay"), RunReplay)
+        for name in ["RunNothing", "run_context", "AsyncRun", "RunBase"]:
+            with self.assertRaisesRegex(ValueError, "RunReplay"):
+                backend_class(name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+from tggw_autotravel.controller import Controller
+from tggw_autotravel.history import FrameHistory
+from tggw_autotravel.run import RunBase, RunReplay
+from tggw_autotravel.screen import Char, Color, Cursor, Screen
+
+
+class TestFrameHistory(unittest.TestCase):
+    def test_snapshots(self) -> None:
+        """测试每一帧都是独立的快照"""
+        history = FrameHistory(10)
+        screen = Screen(4, 6)
+        expected = []
+        for i in range(5):
+            screen.buffer[i % 4][i] = Char(str(i), Color.RED, Color.BLACK)
+            screen.cursor = Cursor(i, i % 4, 1)
+            history.push(screen)
+            expected.append(screen.copy())
+        self.assertEqual([frame.screen() for frame in history], expected)
+        self.assertEqual(history[-1].row(0), screen.cells[:6])
+        self.assertEqual([frame.number for frame in history], list(range(5)))
+
+    def test_sharing(self) -> None:
+        """测试没有变化的行在帧之间共享"""
+        history = FrameHistory(10)
+        screen = Screen(4, 6)
+        history.push(screen)
+        screen.buffer[1][0] = Char("a", Color.WHITE, Color.BLACK)
+        history.push(screen)
+        # 标记为已修改但内容不变
+        screen.buffer[2][0] = Char(" ", Color.WHITE, Color.BLACK)
+        history.push(screen.copy())
+        first, second, third = history
+        self.assertIsNot(first.rows[1], second.rows[1])
+        for y in (0, 2, 3):
+            self.assertIs(first.rows[y], second.rows[y])
+        for y in range(4):
+            self.assertIs(second.rows[y], third.rows[y])
+
+    def test_ring(self) -> None:
+        """测试只保留最后 capacity 帧"""
+        history = FrameHistory(3)
+        screen = Screen(2, 4)
+        for i in range(7):
+            screen.cursor = Cursor(i, 0, 1)
+            history.push(screen)
+        self.assertEqual(len(history), 3)
+        self.assertEqual([frame.number for frame in history], [4, 5, 6])
+        self.assertEqual(history[0].cursor.x, 4)
+        self.assertEqual(history[-1].cursor.x, 6)
+        with self.assertRaises(IndexError):
+            history[3]
+        with self.assertRaises(IndexError):
+            history[-4]
+        history.clear()
+        self.assertEqual(len(history), 0)
+
+    def test_resize(self) -> None:
+        """测试屏幕大小改变"""
+        history = FrameHistory(3)
+        history.push(Screen(2, 4))
+        screen = Screen(3, 5)
+        history.push(screen)
+        self.assertEqual(history[-1].screen(), screen)
+
+    def test_memory(self) -> None:
+        """测试每帧改一行时几千帧只占几 MB"""
+        history = FrameHistory(3000)
+        screen = Screen(38, 92)
+        for i in range(3000):
+            char = Char(chr(ord("a") + i % 26), Color(i % 16), Color.BLACK)
+            screen.buffer[i % 38][i % 92] = char
+            history.push(screen)
+        self.assertLess(history.nbytes(), 4 * 1024 * 1024)
+        self.assertEqual(history[-1].screen(), screen)
+
+    def test_controller(self) -> None:
+        """测试 Controller 记录每一帧"""
+        with tempfile.TemporaryDirectory() as tempdir:
+            output = os.path.join(tempdir, "output.txt")
+            with open(output, "w", encoding="utf-8", newline="") as file:
+                file.write("".join(f"\x1b[{i % 5 + 1};1Hline {i}" for i in range(300)))
+
+            def runner(lines: int, columns: int) -> RunBase:
+                return RunReplay(output, lines=lines, columns=columns)
+
+            history = FrameHistory(1000)
+            ctrl = Controller(5, 12, runner=runner, headless=True, history=history)
+            ctrl.run()
+            screens = []
+            while ctrl.is_running():
+                ctrl.nextframe()
+                screens.append(ctrl.screen.copy())
+                ctrl.wait()
+            ctrl.stop()
+        self.assertEqual([frame.screen() for frame in history], screens)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import errno
+import os
+import tempfile
+import unittest
+from typing import BinaryIO
+
+from tggw_autotravel.record import Recorder, RecordFrame, RecordInput, iter_records
+from tggw_autotravel.screen import Char, Color, Cursor, Screen
+
+
+class FullDisk:
+    """Wraps the recording file, every write fails like a full disk"""
+
+    def __init__(self, file: BinaryIO) -> None:
+        self.file = file
+
+    def write(self, data: bytes) -> int:
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class TestRecorder(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "session.rec")
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def test_round_trip(self) -> None:
+        """测试录制后读回每一帧与输入"""
+        recorder = Recorder(self.path, keyframe_interval=3)
+        screen = Screen(10, 20)
+        expected = []
+        for i in range(8):
+            screen.buffer[i % 10][i] = Char(chr(ord("a") + i), Color.RED, Color.BLACK)
+            screen.cursor = Cursor(i, i % 10, 1)
+            recorder.frame(screen)
+            expected.append(screen.copy())
+            recorder.input(f"key{i}")
+        # 没有变化的帧不写入
+        recorder.frame(screen)
+        recorder.close()
+        frames = []
+        inputs = []
+        for record in iter_records(self.path):
+            if isinstance(record, RecordFrame):
+                frames.append(record.screen.copy())
+            else:
+                self.assertIsInstance(record, RecordInput)
+                inputs.append(record.text)
+        self.assertEqual(frames, expected)
+        self.assertEqual(inputs, [f"key{i}" for i in range(8)])
+
+    def test_other_screen_object(self) -> None:
+        """测试换了 Screen 对象时比较所有行"""
+        recorder = Recorder(self.path)
+        screen = Screen(4, 4)
+        recorder.frame(screen)
+        other = Screen(4, 4)
+        other.buffer[3][3] = Char("z", Color.WHITE, Color.BLACK)
+        other.generation = 0
+        other.row_generation[3] = 0
+        recorder.frame(other)
+        recorder.close()
+        frames = [record.screen.copy() for record in iter_records(self.path)]
+        self.assertEqual(frames[-1].buffer[3][3].char, "z")
+
+    def test_write_error(self) -> None:
+        """测试写入失败后不会阻塞调用者"""
+        recorder = Recorder(self.path, queue_size=4)
+        recorder.file = FullDisk(recorder.file)  # type: ignore[assignment]
+        screen = Screen(4, 4)
+        with self.assertLogs("tggw_autotravel.record", "ERROR"):
+            # 远多于队列长度
+            for i in range(100):
+                screen.buffer[0][0] = Char(str(i % 10), Color.WHITE, Color.BLACK)
+                recorder.frame(screen)
+                recorder.input(f"key{i}")
+            recorder.close()
+        self.assertTrue(recorder.failed)
+        self.assertFalse(recorder.writer_thread.is_alive())
+
+    def test_small_file(self) -> None:
+        """测试增量帧远小于完整帧"""
+        recorder = Recorder(self.path, keyframe_interval=1000)
+        screen = Screen(38, 92)
+        for i in range(200):
+            screen.buffer[i % 38][i % 92] = Char("#", Color.GREEN, Color.BLACK)
+            recorder.frame(screen)
+        recorder.close()
+        self.assertLess(os.path.getsize(self.path), 200 * screen.nbytes() // 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,15 @@
 import unittest
-from tggw_autotravel.screen import Screen, Char, Color, Cursor
+from array import array
+from tggw_autotravel.screen import (
+    Screen,
+    Char,
+    Color,
+    Cursor,
+    color16,
+    pack_char,
+    pack_color16,
+    unpack_char,
+)
 
 
 class TestScreenConversion(unittest.TestCase):
@@ -45,5 +55,152 @@ class TestScreenConversion(unittest.TestCase):
                 )
 
 
+class TestScreenBuffer(unittest.TestCase):
+    def test_pack_unpack(self) -> None:
+        """测试格子打包与还原"""
+        for char in (" ", "@", "中", "\U0001f600", ""):
+            for fg, bg in (
+                (Color.WHITE, Color.BLACK),
+                (Color.LIGHT_WHITE, Color.LIGHT_WHITE),
+            ):
+                cell = pack_char(char, fg, bg)
+                self.assertEqual(unpack_char(cell), Char(char, fg, bg))
+
+    def test_buffer_view(self) -> None:
+        """测试 buffer[y][x] 读写打包数组"""
+        screen = Screen(3, 4)
+        self.assertEqual(len(screen.buffer), 3)
+        self.assertEqual(len(screen.buffer[0]), 4)
+        self.assertEqual(screen.buffer[2][3], Char(" ", Color.WHITE, Color.BLACK))
+        screen.buffer[1][2] = Char("@", Color.YELLOW, Color.BLUE)
+        self.assertEqual(screen.buffer[1][2], Char("@", Color.YELLOW, Color.BLUE))
+        self.assertEqual(
+            screen.cells[1 * 4 + 2], pack_char("@", Color.YELLOW, Color.BLUE)
+        )
+        self.assertEqual([c.char for c in screen.buffer[1]], [" ", " ", "@", " "])
+        with self.assertRaises(IndexError):
+            screen.buffer[0][4]
+
+    def test_copy_and_compare(self) -> None:
+        """测试整屏复制与比较"""
+        screen = Screen(3, 4)
+        screen.buffer[0][0] = Char("#", Color.RED, Color.BLACK)
+        screen.cursor = Cursor(1, 2, 1)
+        copied = screen.copy()
+        self.assertEqual(screen, copied)
+        copied.buffer[2][3] = Char("x", Color.WHITE, Color.BLACK)
+        self.assertNotEqual(screen, copied)
+        self.assertEqual(screen.buffer[2][3].char, " ")
+
+    def test_resize(self) -> None:
+        """测试改变大小"""
+        screen = Screen(3, 4)
+        screen.resize(5, 6)
+        self.assertEqual(len(screen.cells), 30)
+        self.assertEqual(len(screen.buffer), 5)
+        self.assertEqual(len(screen.buffer[4]), 6)
+        self.assertEqual(screen.rows_changed_since(0), [0, 1, 2, 3, 4])
+
+
+class TestScreenBytes(unittest.TestCase):
+    def make_screen(self) -> Screen:
+        screen = Screen(38, 92)
+        screen.buffer[0][0] = Char("@", Color.YELLOW, Color.BLUE)
+        screen.buffer[37][91] = Char("中", Color.RED, Color.BLACK)
+        screen.cursor = Cursor(5, 6, 1)
+        return screen
+
+    def test_round_trip(self) -> None:
+        """测试二进制格式往返"""
+        screen = self.make_screen()
+        data = screen.to_bytes()
+        self.assertEqual(len(data), screen.nbytes())
+        self.assertEqual(len(data), 24 + 38 * 92 * 4)
+        loaded = Screen.from_bytes(data)
+        self.assertEqual(loaded, screen)
+        self.assertEqual(loaded.buffer[37][91].char, "中")
+        self.assertEqual(loaded.generation, screen.generation)
+        self.assertEqual(loaded.rows_changed_since(0), list(range(38)))
+
+    def test_zero_copy(self) -> None:
+        """测试从 memoryview 零复制加载"""
+        screen = self.make_screen()
+        data = bytearray(screen.nbytes() + 8)
+        self.assertEqual(screen.pack_into(data, 8), len(data))
+        loaded = Screen.from_bytes(memoryview(data)[8:], copy=False)
+        self.assertEqual(loaded, screen)
+        loaded.buffer[1][1] = Char("x", Color.WHITE, Color.BLACK)
+        self.assertEqual(Screen.from_bytes(memoryview(data)[8:]).buffer[1][1].char, "x")
+        self.assertEqual(loaded.copy(), loaded)
+
+    def test_invalid(self) -> None:
+        """测试错误的数据"""
+        data = self.make_screen().to_bytes()
+        with self.assertRaises(ValueError):
+            Screen.from_bytes(data[:-1])
+        with self.assertRaises(ValueError):
+            Screen.from_bytes(b"JSON" + data[4:])
+
+
+class TestCharCache(unittest.TestCase):
+    def test_unpack_interned(self) -> None:
+        """测试相同格子返回同一个 Char"""
+        cell = pack_char("@", Color.YELLOW, Color.BLUE)
+        self.assertIs(unpack_char(cell), unpack_char(cell))
+        screen = Screen(1, 2)
+        screen.cells[0] = screen.cells[1] = cell
+        self.assertIs(screen.buffer[0][0], screen.buffer[0][1])
+
+    def test_pack_color16(self) -> None:
+        """测试 pyte 颜色名打包"""
+        self.assertEqual(
+            pack_color16("a", "default", "default"),
+            pack_char("a", Color.WHITE, Color.BLACK),
+        )
+        self.assertEqual(
+            pack_color16("b", "brightred", "0000ee"),
+            pack_char("b", Color.LIGHT_RED, Color.BLUE),
+        )
+        self.assertEqual(color16("default", default=Color.BLACK), Color.BLACK)
+
+
+class TestScreenDirtyRows(unittest.TestCase):
+    def test_buffer_write(self) -> None:
+        """测试通过 buffer 写入时标记行"""
+        screen = Screen(3, 4)
+        self.assertEqual(screen.rows_changed_since(0), [])
+        screen.buffer[1][0] = Char("a", Color.WHITE, Color.BLACK)
+        generation = screen.generation
+        screen.buffer[2][3] = Char("b", Color.WHITE, Color.BLACK)
+        self.assertEqual(screen.rows_changed_since(0), [1, 2])
+        self.assertEqual(screen.rows_changed_since(generation), [2])
+        self.assertEqual(screen.rows_changed_since(screen.generation), [])
+
+    def test_set_cells(self) -> None:
+        """测试 set_cells 只标记内容变化的行"""
+        screen = Screen(3, 4)
+        cells = array("I", screen.cells)
+        cells[5] = pack_char("x", Color.RED, Color.BLACK)
+        screen.set_cells(0, cells)
+        self.assertEqual(screen.rows_changed_since(0), [1])
+        self.assertEqual(screen.buffer[1][1].char, "x")
+        # 跨行的一段
+        generation = screen.generation
+        screen.set_cells(3, array("I", [pack_char("y", Color.RED, Color.BLACK)] * 6))
+        self.assertEqual(screen.rows_changed_since(generation), [0, 1, 2])
+        generation = screen.generation
+        screen.set_cells(3, array("I", [pack_char("y", Color.RED, Color.BLACK)] * 6))
+        self.assertEqual(screen.rows_changed_since(generation), [])
+
+    def test_copy_keeps_generation(self) -> None:
+        """测试复制后保留修改记录"""
+        screen = Screen(3, 4)
+        screen.buffer[2][0] = Char("z", Color.WHITE, Color.BLACK)
+        copied = screen.copy()
+        self.assertEqual(copied.rows_changed_since(0), [2])
+        copied.buffer[0][0] = Char("z", Color.WHITE, Color.BLACK)
+        self.assertEqual(screen.rows_changed_since(0), [2])
+
+
 if __name__ == "__main__":
     unittest.main()
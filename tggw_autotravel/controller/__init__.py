@@ -1,4 +1,11 @@
 from .base import ControllerBase
-from .controller import Controller
+from .controller import GAME_COMMANDS, Controller, game_runner
+from .asynccontroller import AsyncController
 
-__all__ = ["ControllerBase", "Controller"]
+__all__ = [
+    "ControllerBase",
+    "Controller",
+    "GAME_COMMANDS",
+    "game_runner",
+    "AsyncController",
+]
@@ -0,0 +1,76 @@
+import logging
+from typing import AsyncIterator, Iterable, Optional, Union
+
+from ..run import RunBase, AsyncRun, AsyncRunBase
+from ..screen import Screen
+
+log = logging.getLogger(__name__)
+
+
+class AsyncController:
+    """
+    asyncio controller for one game, without user input or TUI.
+    Several of them can share one event loop, e.g. to drive many games
+    or to plan the next move while waiting for output.
+    ```
+    ctrl = AsyncController(RunWinConsole(...))
+    async for screen in ctrl.frames():
+        await ctrl.write(plan(screen))
+    ```
+    """
+
+    def __init__(self, game: Union[RunBase, AsyncRunBase]) -> None:
+        self.game: Optional[AsyncRunBase] = (
+            AsyncRun(game) if isinstance(game, RunBase) else game
+        )
+        self.screen: Screen = game.screen
+        self.game_alive = True
+
+    def is_running(self) -> bool:
+        """
+        Check if the game program is running, as of the last frame
+        """
+        return self.game is not None and self.game_alive
+
+    async def next_frame(self) -> Screen:
+        """
+        Wait for game output and return the updated screen
+        """
+        if self.game is None:
+            raise RuntimeError("Game not running")
+        await self.game.wait()
+        self.game_alive = await self.game.read_frame()
+        self.screen = self.game.screen
+        return self.screen
+
+    async def frames(self) -> AsyncIterator[Screen]:
+        """
+        Yield the screen after each frame until the game exits
+        """
+        while self.is_running():
+            yield await self.next_frame()
+
+    async def write(self, text: str) -> None:
+        """
+        Write text to the game program
+        """
+        if self.game is None:
+            raise RuntimeError("Game not running")
+        await self.game.write(text)
+
+    async def write_many(self, texts: Iterable[str]) -> None:
+        """
+        Write several texts to the game program at once
+        """
+        if self.game is None:
+            raise RuntimeError("Game not running")
+        await self.game.write_many(texts)
+
+    async def stop(self) -> None:
+        """
+        Stop the game program
+        """
+        if self.game is None:
+            return
+        await self.game.close()
+        self.game = None
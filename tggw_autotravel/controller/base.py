@@ -1,4 +1,8 @@
 from abc import abstractmethod
+from typing import Iterable, List
+import time
+
+from ..polling import POLL_INTERVAL
 from ..screen import Screen
 
 
@@ -33,6 +37,13 @@ class ControllerBase:
         """
         ...
 
+    def wait(self) -> None:
+        """
+        Sleep until there may be game output or user input to handle.
+        Controllers that can be woken up override this.
+        """
+        time.sleep(POLL_INTERVAL)
+
     @abstractmethod
     def write(self, text: str) -> None:
         """
@@ -40,9 +51,27 @@ class ControllerBase:
         """
         ...
 
+    def write_many(self, texts: Iterable[str]) -> None:
+        """
+        Write several texts to the game program at once
+        """
+        for text in texts:
+            self.write(text)
+
     @abstractmethod
     def getch(self) -> str:
         """
         Get user input
         """
         ...
+
+    def getch_many(self) -> List[str]:
+        """
+        Get all pending user input
+        """
+        ret: List[str] = []
+        while True:
+            char = self.getch()
+            if char == "":
+                return ret
+            ret.append(char)
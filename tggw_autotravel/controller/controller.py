@@ -1,24 +1,183 @@
 import logging
-from typing import Optional
+import os
+import select
+import sys
+import time
+from threading import Event
+from typing import Callable, Iterable, List, Optional, Union
 
 from .base import ControllerBase
+from ..export import ScreenExport
+from ..history import FrameHistory
 from ..screen import Screen
-
-from ..getch import GetchMSVCRT
-from ..run import RunBase, RunWinPTY
-from ..tui import TUIColorama
+from ..getch import GetchBase
+from ..record import Recorder
+from ..run import RunBase
+from ..tui import TUIBase
 
 log = logging.getLogger(__name__)
 
-CYCLE_TIME = 0.01
+GAME_EXE = "The Ground Gives Way.exe"
+GAME_DIR = "tggw_game"  # profile-directory
+
+# backend class name -> command line of the game
+GAME_COMMANDS = {
+    "RunWinPTY": ("cmd.exe", "/c", GAME_EXE),
+    "RunWinConsole": (GAME_EXE,),
+    "RunPosixPTY": ("wine", GAME_EXE),
+}
+
+Runner = Callable[[int, int], RunBase]
+
+
+def game_runner(
+    backend: Optional[str] = None,
+    cwd: str = GAME_DIR,
+    child_process: bool = False,
+) -> Runner:
+    """
+    Return a function (lines, columns) -> RunBase starting the game with the
+    named tggw_autotravel.run backend, RunWinPTY or RunPosixPTY by default.
+    child_process=True runs the backend in a child process with
+    RunSharedMemory, the screen is shared instead of parsed here.
+    """
+    if backend is None:
+        backend = "RunWinPTY" if sys.platform == "win32" else "RunPosixPTY"
+    if backend not in GAME_COMMANDS:
+        raise ValueError(
+            f"Unknown game backend {backend!r}, expected one of"
+            f" {', '.join(GAME_COMMANDS)}"
+        )
+    cmd, *args = GAME_COMMANDS[backend]
+
+    def runner(lines: int, columns: int) -> RunBase:
+        from .. import run
+
+        if child_process:
+            return run.RunSharedMemory(
+                cmd, *args, lines=lines, columns=columns, cwd=cwd, backend=backend
+            )
+        backend_class = getattr(run, backend)
+        return backend_class(cmd, *args, lines=lines, columns=columns, cwd=cwd)
+
+    return runner
+
+
+class _PipeWakeup(Event):
+    """
+    threading.Event that also makes a pipe readable, so wait() can select
+    on it together with the backend file descriptors
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        os.set_blocking(self.write_fd, False)
+
+    def set(self) -> None:
+        super().set()
+        if self.write_fd < 0:
+            return
+        try:
+            os.write(self.write_fd, b"\0")
+        except BlockingIOError:
+            pass
+
+    def clear(self) -> None:
+        super().clear()
+        if self.read_fd < 0:
+            return
+        try:
+            while os.read(self.read_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        """
+        Close the pipe, set() and clear() only change the event afterwards
+        """
+        read_fd, write_fd = self.read_fd, self.write_fd
+        if read_fd < 0:
+            return
+        # a late set() from another thread must not write to a reused fd
+        self.read_fd = self.write_fd = -1
+        os.close(read_fd)
+        os.close(write_fd)
 
 
 class Controller(ControllerBase):
-    def __init__(self, lines: int, columns: int) -> None:
+    def __init__(
+        self,
+        lines: int,
+        columns: int,
+        *,
+        getcher: Optional[GetchBase] = None,
+        tui: Optional[TUIBase] = None,
+        runner: Optional[Runner] = None,
+        headless: bool = False,
+        recorder: Optional[Recorder] = None,
+        exporter: Optional[ScreenExport] = None,
+        history: Optional[FrameHistory] = None,
+    ) -> None:
+        """
+        getcher and tui default to the console ones, or to
+        GetchNull and TUINull when headless. runner starts the game, see
+        game_runner(). recorder records every frame and write, exporter
+        publishes every frame for other processes, both are closed by stop().
+        history keeps snapshots of the last frames, self.screen is the
+        game's screen and changes with every frame.
+        If the console setup fails, the getcher, recorder and exporter are
+        closed before the error propagates, so the terminal is restored.
+        """
         self.screen = Screen(lines, columns)
         self.game: Optional[RunBase] = None
-        self.getcher = GetchMSVCRT()
-        self.tui = TUIColorama(lines=lines, columns=columns)
+        # liveness from the last frame, so is_running() needs no round trip
+        self.game_alive = False
+        self.frames = 0
+        self.recorder = recorder
+        self.exporter = exporter
+        self.history = history
+        self.runner = runner if runner is not None else game_runner()
+        # set by the input and game backends when there is something to do
+        self.wakeup = Event() if sys.platform == "win32" else _PipeWakeup()
+        try:
+            if getcher is None:
+                if headless:
+                    from ..getch import GetchNull
+
+                    getcher = GetchNull()
+                elif sys.platform == "win32":
+                    # platform specific, imported here so the package can be
+                    # imported anywhere
+                    from ..getch import GetchMSVCRT
+
+                    getcher = GetchMSVCRT()
+                else:
+                    from ..getch import GetchPosix
+
+                    getcher = GetchPosix()
+            if tui is None:
+                if headless:
+                    from ..tui import TUINull
+
+                    tui = TUINull(lines=lines, columns=columns)
+                else:
+                    from ..tui import TUIColorama
+
+                    tui = TUIColorama(lines=lines, columns=columns)
+            getcher.set_wakeup(self.wakeup)
+        except BaseException:
+            # GetchPosix switched the terminal to raw mode already
+            if getcher is not None:
+                getcher.close()
+            self.stop()
+            if isinstance(self.wakeup, _PipeWakeup):
+                self.wakeup.close()
+            raise
+        self.getcher = getcher
+        self.tui = tui
 
     def run(self) -> None:
         """
@@ -26,29 +185,40 @@ class Controller(ControllerBase):
         """
         if self.game is not None:
             raise RuntimeError("Game already running")
-        self.game = RunWinPTY(
-            "cmd.exe",
-            "/c",
-            "The Ground Gives Way.exe",
-            lines=self.screen.lines,
-            columns=self.screen.columns,
-            cwd="tggw_game",  # profile-directory
-        )
+        self.game = self.runner(self.screen.lines, self.screen.columns)
+        self.game.set_wakeup(self.wakeup)
+        self.game_alive = True
 
     def is_running(self) -> bool:
         """
         Check if the game program is running
         """
-        return self.game is not None and self.game.alive()
+        return self.game is not None and self.game_alive
 
     def stop(self) -> None:
         """
-        Stop the game program
+        Stop the game program, and close the recorder and exporter even if
+        the game never started
         """
-        if self.game is None:
-            return
-        self.game.close()
-        self.game = None
+        if self.game is not None:
+            self.game.close()
+            self.game = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.exporter is not None:
+            self.exporter.close()
+            self.exporter = None
+
+    def close(self) -> None:
+        """
+        Stop the game and restore the terminal
+        """
+        self.stop()
+        self.getcher.close()
+        self.tui.close()
+        if isinstance(self.wakeup, _PipeWakeup):
+            self.wakeup.close()
 
     def nextframe(self) -> None:
         """
@@ -58,22 +228,83 @@ class Controller(ControllerBase):
             #
             self.screen = Screen.from_json("")
             return
-        self.game.read_screen()
+        self.game_alive = self.game.read_frame()
+        self.frames += 1
         self.screen = self.game.screen
+        if self.recorder is not None:
+            self.recorder.frame(self.screen)
+        if self.exporter is not None:
+            self.exporter.frame(self.screen)
+        if self.history is not None:
+            self.history.push(self.screen)
         self.tui.screen = self.screen
         self.tui.refresh()
 
+    def wait(self) -> None:
+        """
+        Sleep until there is game output or user input, or until the input
+        escape timeout or a polled backend needs attention
+        """
+        sources: List[Union[GetchBase, RunBase]] = [self.getcher]
+        if self.game is not None:
+            sources.append(self.game)
+        # on POSIX the wakeup is a pipe and file descriptors are selected
+        # directly, other sources are woken by the event or their deadline
+        selectable = isinstance(self.wakeup, _PipeWakeup)
+        fds: List[int] = []
+        pending: List[float] = []
+        for source in sources:
+            fd = source.fileno()
+            if fd is not None and selectable:
+                fds.append(fd)
+                continue
+            deadline = source.deadline()
+            if deadline is not None:
+                pending.append(deadline)
+        timeout: Optional[float] = None
+        if len(pending) > 0:
+            timeout = max(0.0, min(pending) - time.monotonic())
+        if len(fds) > 0 and isinstance(self.wakeup, _PipeWakeup):
+            if not self.wakeup.is_set():
+                select.select([self.wakeup.read_fd, *fds], [], [], timeout)
+        else:
+            self.wakeup.wait(timeout)
+        # cleared before the caller drains input and output, so anything
+        # arriving after this point wakes the next wait() at once
+        self.wakeup.clear()
+
     def write(self, text: str) -> None:
         """
         Write text to the game program
         """
         if self.game is None:
             raise RuntimeError("Game not running")
+        if self.recorder is not None:
+            self.recorder.input(text)
         self.game.write(text)
 
+    def write_many(self, texts: Iterable[str]) -> None:
+        """
+        Write several texts to the game program at once
+        """
+        if self.game is None:
+            raise RuntimeError("Game not running")
+        if self.recorder is not None:
+            texts = list(texts)
+            # one record per token, "\x1b" + "[A" is not "\x1b[A"
+            for text in texts:
+                self.recorder.input(text)
+        self.game.write_many(texts)
+
     def getch(self) -> str:
         """
         Get user input
         """
 
         return self.getcher.getch()
+
+    def getch_many(self) -> List[str]:
+        """
+        Get all pending user input
+        """
+        return self.getcher.getch_many()
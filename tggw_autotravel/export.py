@@ -0,0 +1,207 @@
+"""
+Publish every frame to a memory-mapped file, so other local processes
+(dashboards, loggers, bots) can watch the game screen.
+
+File layout: EXPORT_SEQUENCE (uint64) followed by the Screen.to_bytes()
+layout (header with size, cursor and generation, then the cells). The
+sequence is odd while a frame is being written, a reader copies the frame
+and retries if the sequence was odd or changed meanwhile. The file is
+always written in place, never renamed or shrunk, because Windows refuses
+both while another process has the file mapped. When the screen grows the
+file is extended, and readers whose map is too short for the size in the
+header map it again.
+```
+reader = ScreenExportReader("screen.bin")
+screen = reader.read()
+```
+"""
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import List, Optional
+
+from .screen import SCREEN_HEADER, Screen
+
+log = logging.getLogger(__name__)
+
+EXPORT_SEQUENCE = struct.Struct("<Q")
+
+
+class ScreenExport:
+    """
+    Write frames to path. Only the rows changed since the last frame are
+    copied. The file is created by the first frame, an existing file is
+    reused and its sequence continues.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.map: Optional[mmap.mmap] = None
+        self.sequence = 0
+        # size of the frame in the file, 0 before the first frame
+        self.frame_size = 0
+        # screen and screen.generation at the last frame, to skip rows
+        self.last_source: Optional[Screen] = None
+        self.last_generation = 0
+        self.frames = 0
+
+    def _map(self, size: int) -> mmap.mmap:
+        """
+        Map the file, extending it to at least size bytes. When a frame
+        needs a bigger file the sequence in it is odd meanwhile, so readers
+        wait.
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+        if self.frames == 0:
+            # continue after the frames of an earlier writer
+            (sequence,) = EXPORT_SEQUENCE.unpack_from(self.map)
+            self.sequence = max(self.sequence, sequence + sequence % 2)
+        return self.map
+
+    def frame(self, screen: Screen) -> None:
+        """
+        Publish the screen
+        """
+        size = EXPORT_SEQUENCE.size + screen.nbytes()
+        buffer = self.map
+        if buffer is None:
+            buffer = self._map(size)
+        if screen is not self.last_source or size != self.frame_size:
+            rows = list(range(screen.lines))
+        else:
+            # empty when only the cursor moved
+            rows = screen.rows_changed_since(self.last_generation)
+        self.sequence += 1
+        EXPORT_SEQUENCE.pack_into(buffer, 0, self.sequence)
+        if len(buffer) < size:
+            buffer = self._map(size)
+        if len(rows) == screen.lines:
+            screen.pack_into(buffer, EXPORT_SEQUENCE.size)
+        else:
+            self._write_header(buffer, screen)
+            self._write_rows(buffer, screen, rows)
+        self.sequence += 1
+        EXPORT_SEQUENCE.pack_into(buffer, 0, self.sequence)
+        self.frame_size = size
+        self.last_source = screen
+        self.last_generation = screen.generation
+        self.frames += 1
+
+    def _write_header(self, buffer: mmap.mmap, screen: Screen) -> None:
+        # magic, version and size stay, cursor and generation change
+        magic, version, lines, columns = SCREEN_HEADER.unpack_from(
+            buffer, EXPORT_SEQUENCE.size
+        )[:4]
+        SCREEN_HEADER.pack_into(
+            buffer,
+            EXPORT_SEQUENCE.size,
+            magic,
+            version,
+            lines,
+            columns,
+            screen.cursor.x,
+            screen.cursor.y,
+            screen.cursor.visibility,
+            screen.generation,
+        )
+
+    def _write_rows(self, buffer: mmap.mmap, screen: Screen, rows: List[int]) -> None:
+        columns = screen.columns
+        start = EXPORT_SEQUENCE.size + SCREEN_HEADER.size
+        for y in rows:
+            row = screen.cells[y * columns : (y + 1) * columns]
+            if sys.byteorder == "big":
+                row = array("I", row)
+                row.byteswap()
+            offset = start + y * columns * 4
+            buffer[offset : offset + columns * 4] = memoryview(row).cast("B")
+
+    def close(self) -> None:
+        """
+        Stop publishing, the file keeps the last frame for the readers
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
+class ScreenExportReader:
+    """
+    Read the frames a ScreenExport publishes to path
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.map: Optional[mmap.mmap] = None
+
+    def _open(self) -> Optional[mmap.mmap]:
+        if self.map is None:
+            try:
+                with open(self.path, "rb") as file:
+                    self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                return None
+            except ValueError:
+                # the writer just created the file, it is still empty
+                return None
+        return self.map
+
+    def sequence(self) -> int:
+        """
+        Changes whenever a frame is published, cheap to poll.
+        0 if there is no frame yet.
+        """
+        buffer = self._open()
+        if buffer is None:
+            return 0
+        (sequence,) = EXPORT_SEQUENCE.unpack_from(buffer)
+        return sequence
+
+    def read(self, timeout: float = 1.0) -> Optional[Screen]:
+        """
+        Return a copy of the latest frame, or None if there is none yet.
+        Raises TimeoutError if the writer never finishes a frame.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            buffer = self._open()
+            if buffer is None:
+                return None
+            (before,) = EXPORT_SEQUENCE.unpack_from(buffer)
+            if before == 0:
+                return None
+            if before % 2 == 0:
+                _, _, lines, columns = SCREEN_HEADER.unpack_from(
+                    buffer, EXPORT_SEQUENCE.size
+                )[:4]
+                end = EXPORT_SEQUENCE.size + SCREEN_HEADER.size + lines * columns * 4
+                if end > len(buffer):
+                    # the file grew since it was mapped, map it again
+                    self.close()
+                else:
+                    data = buffer[EXPORT_SEQUENCE.size : end]
+                    (after,) = EXPORT_SEQUENCE.unpack_from(buffer)
+                    if before == after:
+                        return Screen.from_bytes(data)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No complete frame in {self.path}")
+            time.sleep(0)
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
@@ -0,0 +1,176 @@
+"""
+Run many headless game sessions in worker processes and collect the results.
+```
+specs = [SessionSpec("wine", ("game.exe",), cwd=f"profiles/{i}") for i in range(32)]
+for result in run_farm(specs):
+    print(result.name, result.frames, result.exited)
+```
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Type
+
+from . import run
+from .controller import AsyncController
+from .screen import Screen
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "RunWinConsole" if sys.platform == "win32" else "RunPosixPTY"
+
+
+@dataclass(slots=True, frozen=True)
+class SessionSpec:
+    """
+    One game session. backend is the name of a RunBase class in
+    tggw_autotravel.run, options are extra keyword arguments for it.
+    script is written one entry per frame, each entry is a list of getch
+    tokens written together.
+    """
+
+    cmd: str
+    args: Tuple[str, ...] = ()
+    name: str = ""
+    cwd: Optional[str] = None  # profile directory
+    env: Optional[Dict[str, str]] = None
+    lines: int = 38
+    columns: int = 92
+    backend: str = DEFAULT_BACKEND
+    options: Mapping[str, object] = field(default_factory=dict)
+    script: Tuple[Tuple[str, ...], ...] = ()
+    max_frames: Optional[int] = None
+    timeout: float = 60.0
+
+
+@dataclass(slots=True, frozen=True)
+class SessionResult:
+    name: str
+    exited: bool  # the game exited by itself
+    timed_out: bool
+    frames: int
+    writes: int  # script entries written
+    seconds: float
+    screen: Optional[Screen] = None  # last screen
+    error: Optional[str] = None  # traceback if the session failed
+
+
+def backend_class(name: str) -> Type[run.RunBase]:
+    """
+    The tggw_autotravel.run backend class called name
+    """
+    backend = getattr(run, name, None) if name in run.__all__ else None
+    if (
+        not isinstance(backend, type)
+        or not issubclass(backend, run.RunBase)
+        or inspect.isabstract(backend)
+    ):
+        backends = [
+            other
+            for other in run.__all__
+            if isinstance(getattr(run, other), type)
+            and issubclass(getattr(run, other), run.RunBase)
+            and not inspect.isabstract(getattr(run, other))
+        ]
+        raise ValueError(
+            f"Unknown backend {name!r}, expected one of {', '.join(backends)}"
+        )
+    return backend
+
+
+async def play_session(spec: SessionSpec) -> SessionResult:
+    """
+    Run one session in the current event loop
+    """
+    start_time = time.perf_counter()
+    backend = backend_class(spec.backend)
+    game = backend(
+        spec.cmd,
+        *spec.args,
+        cwd=spec.cwd,
+        env=spec.env,
+        lines=spec.lines,
+        columns=spec.columns,
+        **spec.options,
+    )
+    ctrl = AsyncController(game)
+    frames = 0
+    writes = 0
+    timed_out = False
+
+    async def play() -> None:
+        nonlocal frames, writes
+        async for _ in ctrl.frames():
+            frames += 1
+            if spec.max_frames is not None and frames >= spec.max_frames:
+                break
+            if writes < len(spec.script) and ctrl.is_running():
+                await ctrl.write_many(spec.script[writes])
+                writes += 1
+
+    try:
+        await asyncio.wait_for(play(), spec.timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+    finally:
+        exited = not ctrl.is_running()
+        await ctrl.stop()
+    return SessionResult(
+        name=spec.name,
+        exited=exited,
+        timed_out=timed_out,
+        frames=frames,
+        writes=writes,
+        seconds=time.perf_counter() - start_time,
+        screen=ctrl.screen,
+    )
+
+
+def run_session(spec: SessionSpec) -> SessionResult:
+    """
+    Worker process entry, never raises
+    """
+    try:
+        return asyncio.run(play_session(spec))
+    except Exception:
+        log.error(f"Session {spec.name} failed")
+        return SessionResult(
+            name=spec.name,
+            exited=False,
+            timed_out=False,
+            frames=0,
+            writes=0,
+            seconds=0.0,
+            error=traceback.format_exc(),
+        )
+
+
+def iter_farm(
+    specs: Sequence[SessionSpec], workers: Optional[int] = None
+) -> Iterator[SessionResult]:
+    """
+    Run the sessions on a process pool of workers (default: one per core),
+    yield the results as sessions finish
+    """
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(run_session, spec) for spec in specs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_farm(
+    specs: Sequence[SessionSpec], workers: Optional[int] = None
+) -> List[SessionResult]:
+    """
+    Run the sessions and return the results in the order of specs
+    """
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(run_session, spec) for spec in specs]
+        return [future.result() for future in futures]
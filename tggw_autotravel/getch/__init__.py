@@ -1,8 +1,20 @@
+import sys
+
 from .base import GetchBase, getch_context
-from .msvcrt import GetchMSVCRT
+from .null import GetchNull, GetchScript
 
 __all__ = [
     "GetchBase",
     "getch_context",
-    "GetchMSVCRT",
+    "GetchNull",
+    "GetchScript",
 ]
+
+if sys.platform == "win32":
+    from .msvcrt import GetchMSVCRT
+
+    __all__ += ["GetchMSVCRT"]
+else:
+    from .posix import GetchPosix
+
+    __all__ += ["GetchPosix"]
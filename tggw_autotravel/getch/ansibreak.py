@@ -1,5 +1,6 @@
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from enum import Enum
+import time
 
 
 class State(Enum):
@@ -39,6 +40,108 @@ class CutMode(Enum):
     BOTH = 3
 
 
+# what a character does to escape_start_time
+TIME_KEEP = 0
+TIME_SET = 1
+TIME_CLEAR = 2
+
+# character classes: code points 0-127, and 128 for anything above (7-bit only,
+# so every character >= 0x80 behaves the same)
+CLASSES = 129
+C0 = [*range(0x00, 0x20), 0x7F]
+
+Transition = Tuple[State, CutMode, int]
+
+
+def _rules(
+    transitions: Dict[int, Transition], chars: Iterable[int], transition: Transition
+) -> None:
+    # earlier rules win, like the if-chain in the state diagram
+    for c in chars:
+        transitions.setdefault(c, transition)
+
+
+def _build_table() -> Dict[State, Tuple[Transition, ...]]:
+    """
+    Transition table (state, character class) -> (next state, cut, time)
+    https://vt100.net/emu/dec_ansi_parser
+    """
+    table: Dict[State, Tuple[Transition, ...]] = {}
+    to_ground = (State.GROUND, CutMode.RIGHT, TIME_CLEAR)
+    to_passthrough = (State.DCS_PASSTHROUGH, CutMode.RIGHT, TIME_KEEP)
+    for state in State:
+        stay = (state, CutMode.NONE, TIME_KEEP)
+        rules: Dict[int, Transition] = {}
+        # anywhere
+        _rules(rules, (0x18, 0x1A), (state, CutMode.BOTH, TIME_KEEP))
+        _rules(rules, (0x1B,), (State.ESCAPE, CutMode.LEFT, TIME_SET))
+        if state == State.GROUND:
+            default = (state, CutMode.BOTH, TIME_KEEP)
+        elif state == State.ESCAPE:
+            _rules(
+                rules,
+                range(0x20, 0x30),
+                (State.ESCAPE_INTERMEDIATE, CutMode.NONE, TIME_KEEP),
+            )
+            _rules(rules, (0x5B,), (State.CSI_ENTRY, CutMode.NONE, TIME_KEEP))
+            _rules(rules, (0x5D,), (State.OSC_STRING, CutMode.NONE, TIME_KEEP))
+            _rules(rules, (0x50,), (State.DCS_ENTRY, CutMode.NONE, TIME_KEEP))
+            _rules(
+                rules,
+                (0x58, 0x5E, 0x5F),
+                (State.SOS_PM_APC_STRING, CutMode.NONE, TIME_KEEP),
+            )
+            _rules(rules, range(0x30, 0x7F), to_ground)
+            _rules(rules, C0, stay)
+            default = to_ground
+        elif state == State.ESCAPE_INTERMEDIATE:
+            _rules(rules, range(0x30, 0x7F), to_ground)
+            _rules(rules, C0, stay)
+            default = to_ground
+        elif state in (State.CSI_ENTRY, State.DCS_ENTRY):
+            csi = state == State.CSI_ENTRY
+            ignore = State.CSI_IGNORE if csi else State.DCS_IGNORE
+            param = State.CSI_PARAM if csi else State.DCS_PARAM
+            intermediate = State.CSI_INTERMEDIATE if csi else State.DCS_INTERMEDIATE
+            _rules(rules, (0x3A,), (ignore, CutMode.NONE, TIME_KEEP))
+            _rules(rules, range(0x30, 0x40), (param, CutMode.NONE, TIME_KEEP))
+            _rules(rules, range(0x20, 0x30), (intermediate, CutMode.NONE, TIME_KEEP))
+            _rules(rules, C0, stay)
+            default = to_ground if csi else to_passthrough
+        elif state in (State.CSI_PARAM, State.DCS_PARAM):
+            csi = state == State.CSI_PARAM
+            ignore = State.CSI_IGNORE if csi else State.DCS_IGNORE
+            intermediate = State.CSI_INTERMEDIATE if csi else State.DCS_INTERMEDIATE
+            _rules(rules, (0x3A, *range(0x3C, 0x40)), (ignore, CutMode.NONE, TIME_KEEP))
+            _rules(rules, range(0x20, 0x30), (intermediate, CutMode.NONE, TIME_KEEP))
+            _rules(rules, range(0x30, 0x40), stay)
+            _rules(rules, C0, stay)
+            default = to_ground if csi else to_passthrough
+        elif state in (State.CSI_INTERMEDIATE, State.DCS_INTERMEDIATE):
+            csi = state == State.CSI_INTERMEDIATE
+            ignore = State.CSI_IGNORE if csi else State.DCS_IGNORE
+            _rules(rules, range(0x30, 0x40), (ignore, CutMode.NONE, TIME_KEEP))
+            _rules(rules, range(0x20, 0x30), stay)
+            _rules(rules, C0, stay)
+            default = to_ground if csi else to_passthrough
+        elif state == State.CSI_IGNORE:
+            _rules(rules, range(0x20, 0x40), stay)
+            _rules(rules, C0, stay)
+            default = to_ground
+        elif state == State.OSC_STRING:
+            # for xterm
+            _rules(rules, (0x07,), (state, CutMode.RIGHT, TIME_KEEP))
+            default = stay
+        else:
+            # DCS_IGNORE, DCS_PASSTHROUGH, SOS_PM_APC_STRING
+            default = stay
+        table[state] = tuple(rules.get(c, default) for c in range(CLASSES))
+    return table
+
+
+TRANSITIONS = _build_table()
+
+
 class AnsiBreak:
     def __init__(self, escape_timeout: float = 0.05) -> None:
         self.escape_start_time: Optional[float] = None
@@ -46,184 +149,91 @@ class AnsiBreak:
         self.buffer = ""
         self.state = State.GROUND
 
-    def decode(self, text: str, timestamp: float) -> List[str]:
+    def decode(self, text: str, timestamp: Optional[float] = None) -> List[str]:
         """
         Split a string into a list of characters and escape sequences.
         https://vt100.net/emu/dec_ansi_parser
         7-bit only.
+        timestamp defaults to time.monotonic().
         """
+        if timestamp is None:
+            timestamp = time.monotonic()
         ret: List[str] = []
-        for ch in text:
-            cutmode = self.readchar(ch, timestamp)
-            if cutmode == CutMode.NONE:
-                self.buffer += ch
-            elif cutmode == CutMode.LEFT:
-                if self.buffer != "":
-                    ret.append(self.buffer)
-                self.buffer = ch
-            elif cutmode == CutMode.RIGHT:
-                ret.append(self.buffer + ch)
-                self.buffer = ""
-            elif cutmode == CutMode.BOTH:
-                if self.buffer != "":
-                    ret.append(self.buffer)
+        state = self.state
+        # the unfinished sequence is self.buffer + text[start:i]
+        buffer = self.buffer
+        start = 0
+        i = 0
+        length = len(text)
+        while i < length:
+            if state is State.GROUND:
+                # nothing is pending in GROUND and every character but ESC is
+                # a token of its own, so split the run up to the next ESC at once
+                esc = text.find("\x1b", i)
+                if esc < 0:
+                    esc = length
+                ret.extend(text[i:esc])
+                i = start = esc
+                if i == length:
+                    break
+            ch = text[i]
+            code = ord(ch)
+            state, cutmode, time_action = TRANSITIONS[state][
+                code if code < 0x80 else 0x80
+            ]
+            if time_action == TIME_SET:
+                self.escape_start_time = timestamp
+            elif time_action == TIME_CLEAR:
+                self.escape_start_time = None
+            if cutmode is CutMode.LEFT:
+                if buffer != "" or start != i:
+                    ret.append(buffer + text[start:i])
+                buffer = ""
+                start = i
+            elif cutmode is CutMode.RIGHT:
+                ret.append(buffer + text[start : i + 1])
+                buffer = ""
+                start = i + 1
+            elif cutmode is CutMode.BOTH:
+                if buffer != "" or start != i:
+                    ret.append(buffer + text[start:i])
                 ret.append(ch)
-                self.buffer = ""
+                buffer = ""
+                start = i + 1
+            i += 1
+        self.buffer = buffer + text[start:]
+        self.state = state
         if (
             self.escape_start_time is not None
             and timestamp > self.escape_start_time + self.escape_timeout
         ):
-            ret.append(self.buffer)
+            if self.buffer != "":
+                ret.append(self.buffer)
             self.buffer = ""
+            self.state = State.GROUND
+            self.escape_start_time = None
         return ret
 
+    def next_deadline(self) -> Optional[float]:
+        """
+        Return the timestamp after which an unfinished escape sequence is
+        flushed by decode(), or None if nothing is pending.
+        """
+        if self.escape_start_time is None:
+            return None
+        return self.escape_start_time + self.escape_timeout
+
     def readchar(self, ch: str, timestamp: float) -> CutMode:
         """
+        Advance the state machine by one character and return how to cut.
         7-bit only.
         """
-        # anywhere
-        if ch in {"\x18", "\x1a"}:
-            return CutMode.BOTH
-        if ch == "\x1b":
-            self.state = State.ESCAPE
+        code = ord(ch)
+        self.state, cutmode, time_action = TRANSITIONS[self.state][
+            code if code < 0x80 else 0x80
+        ]
+        if time_action == TIME_SET:
             self.escape_start_time = timestamp
-            return CutMode.LEFT
-        # anywhere END (7-bit only)
-        if self.state == State.GROUND:
-            return CutMode.BOTH
-        if self.state == State.ESCAPE:
-            if "\x20" <= ch <= "\x2f":
-                self.state = State.ESCAPE_INTERMEDIATE
-                return CutMode.NONE
-            if ch == "\x5b":
-                self.state = State.CSI_ENTRY
-                return CutMode.NONE
-            if ch == "\x5d":
-                self.state = State.OSC_STRING
-                return CutMode.NONE
-            if ch == "\x50":
-                self.state = State.DCS_ENTRY
-                return CutMode.NONE
-            if ch in {"\x58", "\x5e", "\x5f"}:
-                self.state = State.SOS_PM_APC_STRING
-                return CutMode.NONE
-            if "\x30" <= ch <= "\x7e":
-                self.state = State.GROUND
-                self.escape_start_time = None
-                return CutMode.RIGHT
-            if "\x00" <= ch <= "\x1f" or ch == "\x7f":
-                return CutMode.NONE
-            self.state = State.GROUND
+        elif time_action == TIME_CLEAR:
             self.escape_start_time = None
-            return CutMode.RIGHT
-        if self.state == State.ESCAPE_INTERMEDIATE:
-            if "\x30" <= ch <= "\x7e":
-                self.state = State.GROUND
-                self.escape_start_time = None
-                return CutMode.RIGHT
-            if "\x00" <= ch <= "\x1f" or ch == "\x7f":
-                return CutMode.NONE
-            self.state = State.GROUND
-            self.escape_start_time = None
-            return CutMode.RIGHT
-        if self.state == State.CSI_ENTRY:
-            if ch == "\x3a":
-                self.state = State.CSI_IGNORE
-                return CutMode.NONE
-            if "\x30" <= ch <= "\x3f":
-                self.state = State.CSI_PARAM
-                return CutMode.NONE
-            if "\x20" <= ch <= "\x2f":
-                self.state = State.CSI_INTERMEDIATE
-                return CutMode.NONE
-            if "\x00" <= ch <= "\x1f" or ch == "\x7f":
-                return CutMode.NONE
-            self.state = State.GROUND
-            self.escape_start_time = None
-            return CutMode.RIGHT
-        if self.state == State.CSI_PARAM:
-            if ch == "\x3a" or "\x3c" <= ch <= "\x3f":
-                self.state = State.CSI_IGNORE
-                return CutMode.NONE
-            if "\x20" <= ch <= "\x2f":
-                self.state = State.CSI_INTERMEDIATE
-                return CutMode.NONE
-            if "\x30" <= ch <= "\x3f":
-                self.state = State.CSI_PARAM
-                return CutMode.NONE
-            if "\x00" <= ch <= "\x1f" or ch == "\x7f":
-                return CutMode.NONE
-            self.state = State.GROUND
-            self.escape_start_time = None
-            return CutMode.RIGHT
-        if self.state == State.CSI_INTERMEDIATE:
-            if "\x30" <= ch <= "\x3f":
-                self.state = State.CSI_IGNORE
-                return CutMode.NONE
-            if "\x20" <= ch <= "\x2f":
-                self.state = State.CSI_INTERMEDIATE
-                return CutMode.NONE
-            if "\x00" <= ch <= "\x1f" or ch == "\x7f":
-                return CutMode.NONE
-            self.state = State.GROUND
-            self.escape_start_time = None
-            return CutMode.RIGHT
-        if self.state == State.CSI_IGNORE:
-            if "\x20" <= ch <= "\x3f":
-                self.state = State.CSI_IGNORE
-                return CutMode.NONE
-            if "\x00" <= ch <= "\x1f" or ch == "\x7f":
-                return CutMode.NONE
-            self.state = State.GROUND
-            self.escape_start_time = None
-            return CutMode.RIGHT
-        if self.state == State.OSC_STRING:
-            # for xterm
-            if ch == "\x07":
-                return CutMode.RIGHT
-            return CutMode.NONE
-        if self.state == State.DCS_ENTRY:
-            if ch == "\x3a":
-                self.state = State.DCS_IGNORE
-                return CutMode.NONE
-            if "\x30" <= ch <= "\x3f":
-                self.state = State.DCS_PARAM
-                return CutMode.NONE
-            if "\x20" <= ch <= "\x2f":
-                self.state = State.DCS_INTERMEDIATE
-                return CutMode.NONE
-            if "\x00" <= ch <= "\x1f" or ch == "\x7f":
-                return CutMode.NONE
-            self.state = State.DCS_PASSTHROUGH
-            return CutMode.RIGHT
-        if self.state == State.DCS_PARAM:
-            if ch == "\x3a" or "\x3c" <= ch <= "\x3f":
-                self.state = State.DCS_IGNORE
-                return CutMode.NONE
-            if "\x20" <= ch <= "\x2f":
-                self.state = State.DCS_INTERMEDIATE
-                return CutMode.NONE
-            if "\x30" <= ch <= "\x3f":
-                self.state = State.DCS_PARAM
-                return CutMode.NONE
-            if "\x00" <= ch <= "\x1f" or ch == "\x7f":
-                return CutMode.NONE
-            self.state = State.DCS_PASSTHROUGH
-            return CutMode.RIGHT
-        if self.state == State.DCS_INTERMEDIATE:
-            if "\x30" <= ch <= "\x3f":
-                self.state = State.DCS_IGNORE
-                return CutMode.NONE
-            if "\x20" <= ch <= "\x2f":
-                self.state = State.DCS_INTERMEDIATE
-                return CutMode.NONE
-            if "\x00" <= ch <= "\x1f" or ch == "\x7f":
-                return CutMode.NONE
-            self.state = State.DCS_PASSTHROUGH
-            return CutMode.RIGHT
-        if self.state == State.DCS_IGNORE:
-            return CutMode.NONE
-        if self.state == State.DCS_PASSTHROUGH:
-            return CutMode.NONE
-        if self.state == State.SOS_PM_APC_STRING:
-            return CutMode.NONE
+        return cutmode
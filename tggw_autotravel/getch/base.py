@@ -1,9 +1,15 @@
 from abc import abstractmethod
 from contextlib import contextmanager
-from typing import Generator
+from threading import Event
+from typing import Generator, List, Optional
+import time
+
+from ..polling import POLL_INTERVAL
 
 
 class GetchBase:
+    wakeup: Optional[Event] = None
+
     @abstractmethod
     def __init__(self) -> None: ...
     @abstractmethod
@@ -11,6 +17,37 @@ class GetchBase:
     @abstractmethod
     def close(self) -> None: ...
 
+    def getch_many(self) -> List[str]:
+        """
+        Get all pending characters and escape sequences
+        """
+        ret: List[str] = []
+        while True:
+            char = self.getch()
+            if char == "":
+                return ret
+            ret.append(char)
+
+    def set_wakeup(self, wakeup: Event) -> None:
+        """
+        Event to set when new input arrives
+        """
+        self.wakeup = wakeup
+
+    def fileno(self) -> Optional[int]:
+        """
+        File descriptor that becomes readable on input, or None
+        """
+        return None
+
+    def deadline(self) -> Optional[float]:
+        """
+        time.monotonic() at which getch() should be called even without a
+        wakeup, or None to wait for the wakeup only.
+        Backends that cannot set the wakeup are polled every POLL_INTERVAL.
+        """
+        return time.monotonic() + POLL_INTERVAL
+
 
 @contextmanager
 def getch_context(self: GetchBase) -> Generator[GetchBase, None, None]:
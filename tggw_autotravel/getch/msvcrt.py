@@ -1,8 +1,10 @@
 import msvcrt
 import logging
-import time
 import pytermgui
-from typing import List
+from collections import deque
+from threading import Thread
+from queue import Queue, Empty
+from typing import Deque, List, Optional
 
 from .base import GetchBase
 from .ansibreak import AnsiBreak
@@ -13,35 +15,69 @@ log = logging.getLogger(__name__)
 class GetchMSVCRT(GetchBase):
     def __init__(self, escape_timeout: float = 0.1) -> None:
         self.ansibreak = AnsiBreak(escape_timeout=escape_timeout)
-        self.buffer: List[str] = []
+        self.tokens: Deque[str] = deque()
         self.virtual_processing_context = (
             pytermgui.win32console.enable_virtual_processing()
         )
         self.virtual_processing_context.__enter__()
+        self.input_queue: Queue[str] = Queue()
+        self.stopped = False
+        self.read_thread = Thread(target=self._read_input, daemon=True)
+        self.read_thread.start()
+
+    def _read_input(self) -> None:
+        # getwch() blocks until a key is pressed, so this thread sleeps
+        # while there is no input
+        while not self.stopped:
+            read = msvcrt.getwch()
+            if read == "\0" or read == "\xe0":  # extended code
+                read += msvcrt.getwch()
+            self.input_queue.put(read)
+            if self.wakeup is not None:
+                self.wakeup.set()
+
+    def _read(self) -> None:
+        reads: List[str] = []
+        while True:
+            try:
+                reads.append(self.input_queue.get_nowait())
+            except Empty:
+                break
+        # decode even without input due to escape time
+        self.tokens.extend(self.ansibreak.decode("".join(reads)))
 
     def getch(self) -> str:
         """
         Get a character or an escape sequence from stdin.
         Return "" if no input
         """
-        if len(self.buffer) > 0:
-            ret = self.buffer[0]
-            self.buffer = self.buffer[1:]
-            return ret
-        read_tot = ""
-        while msvcrt.kbhit():
-            read = msvcrt.getwch()
-            if read == "\0" or read == "\xe0":  # extended code
-                read += msvcrt.getwch()
-            read_tot += read
-        # decode even read_tot == "" due to escape time
-        now = time.monotonic()
-        self.buffer = self.ansibreak.decode(read_tot, timestamp=now)
-        if len(self.buffer) > 0:
-            ret = self.buffer[0]
-            self.buffer = self.buffer[1:]
-            return ret
-        return ""
+        if len(self.tokens) == 0:
+            self._read()
+            if len(self.tokens) == 0:
+                return ""
+        return self.tokens.popleft()
+
+    def getch_many(self) -> List[str]:
+        """
+        Get all pending characters and escape sequences
+        """
+        self._read()
+        tokens = list(self.tokens)
+        self.tokens.clear()
+        return tokens
+
+    def deadline(self) -> Optional[float]:
+        """
+        Only the escape timeout needs a wakeup, keys set it themselves
+        """
+        return self.ansibreak.next_deadline()
 
     def close(self) -> None:
+        """
+        Stop reading input. The reader thread is blocked in getwch() and
+        there is no way to interrupt it, so it still takes the next key
+        pressed, which is lost, then exits. It is a daemon thread and does not
+        keep the process alive.
+        """
+        self.stopped = True
         self.virtual_processing_context.__exit__(None, None, None)
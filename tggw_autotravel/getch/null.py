@@ -0,0 +1,59 @@
+from collections import deque
+from typing import Deque, Iterable, List, Optional
+import time
+
+from .base import GetchBase
+
+
+class GetchNull(GetchBase):
+    """
+    No user input, for headless runs
+    """
+
+    def __init__(self) -> None:
+        pass
+
+    def getch(self) -> str:
+        return ""
+
+    def deadline(self) -> Optional[float]:
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class GetchScript(GetchBase):
+    """
+    Input from a script or from the program itself through feed()
+    """
+
+    def __init__(self, tokens: Iterable[str] = ()) -> None:
+        self.tokens: Deque[str] = deque(tokens)
+
+    def feed(self, tokens: Iterable[str]) -> None:
+        """
+        Queue getch tokens (characters or escape sequences)
+        """
+        self.tokens.extend(tokens)
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def getch(self) -> str:
+        if len(self.tokens) == 0:
+            return ""
+        return self.tokens.popleft()
+
+    def getch_many(self) -> List[str]:
+        tokens = list(self.tokens)
+        self.tokens.clear()
+        return tokens
+
+    def deadline(self) -> Optional[float]:
+        """
+        Due at once while tokens are queued
+        """
+        return time.monotonic() if len(self.tokens) > 0 else None
+
+    def close(self) -> None:
+        self.tokens.clear()
@@ -0,0 +1,80 @@
+import codecs
+import logging
+import os
+import sys
+import termios
+import tty
+from collections import deque
+from typing import Deque, List, Optional
+
+from .base import GetchBase
+from .ansibreak import AnsiBreak
+
+log = logging.getLogger(__name__)
+
+READ_SIZE = 65536
+
+
+class GetchPosix(GetchBase):
+    """
+    Keyboard input from a POSIX terminal in raw mode.
+    Every available byte is read at once and split into tokens by AnsiBreak.
+    """
+
+    def __init__(self, escape_timeout: float = 0.1, fd: Optional[int] = None) -> None:
+        self.fd = sys.stdin.fileno() if fd is None else fd
+        self.ansibreak = AnsiBreak(escape_timeout=escape_timeout)
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.tokens: Deque[str] = deque()
+        self.saved_attrs = termios.tcgetattr(self.fd)
+        self.saved_blocking = os.get_blocking(self.fd)
+        tty.setraw(self.fd)
+        os.set_blocking(self.fd, False)
+
+    def fileno(self) -> Optional[int]:
+        return self.fd
+
+    def deadline(self) -> Optional[float]:
+        """
+        Only the escape timeout needs a wakeup, input is selected on fileno()
+        """
+        return self.ansibreak.next_deadline()
+
+    def _read(self) -> None:
+        chunks: List[str] = []
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            if len(data) == 0:
+                break
+            chunks.append(self.decoder.decode(data))
+            if len(data) < READ_SIZE:
+                break
+        # decode even without input due to escape time
+        self.tokens.extend(self.ansibreak.decode("".join(chunks)))
+
+    def getch(self) -> str:
+        """
+        Get a character or an escape sequence from stdin.
+        Return "" if no input
+        """
+        if len(self.tokens) == 0:
+            self._read()
+            if len(self.tokens) == 0:
+                return ""
+        return self.tokens.popleft()
+
+    def getch_many(self) -> List[str]:
+        """
+        Get all pending characters and escape sequences
+        """
+        self._read()
+        tokens = list(self.tokens)
+        self.tokens.clear()
+        return tokens
+
+    def close(self) -> None:
+        termios.tcsetattr(self.fd, termios.TCSADRAIN, self.saved_attrs)
+        os.set_blocking(self.fd, self.saved_blocking)
@@ -0,0 +1,152 @@
+"""
+Immutable history of the last frames, for bots that look back and for
+debugging.
+
+Each frame keeps its rows as bytes objects in a tuple. A row that did not
+change since the previous frame is the same object as in the previous
+frame, so a frame where one row changed costs one row plus a tuple, and a
+few thousand frames fit in a few megabytes.
+```
+history = FrameHistory(3000)
+ctrl = Controller(38, 92, history=history)
+...
+screen = history[-10].screen()
+```
+"""
+
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Set, Tuple
+
+from .screen import Cursor, Screen
+
+
+@dataclass(slots=True, frozen=True)
+class HistoryFrame:
+    number: int  # counts every frame pushed, including the dropped ones
+    seconds: float  # since the history was created
+    lines: int
+    columns: int
+    cursor: Cursor
+    generation: int
+    rows: Tuple[bytes, ...]  # native uint32 cells, shared between frames
+
+    def row(self, y: int) -> "array[int]":
+        """
+        Return a copy of the cells of row y
+        """
+        cells = array("I")
+        cells.frombytes(self.rows[y])
+        return cells
+
+    def screen(self) -> Screen:
+        """
+        Return a new Screen with the content of this frame
+        """
+        screen = Screen(self.lines, self.columns)
+        screen.cells = array("I")
+        screen.cells.frombytes(b"".join(self.rows))
+        screen.cursor = self.cursor
+        screen.generation = self.generation
+        screen.row_generation = array("Q", [self.generation]) * self.lines
+        return screen
+
+
+class FrameHistory:
+    """
+    Bounded ring of the last capacity frames. history[-1] is the latest
+    frame, history[0] the oldest one still kept.
+    """
+
+    def __init__(self, capacity: int = 3000) -> None:
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive: {capacity}")
+        self.capacity = capacity
+        self.ring: List[Optional[HistoryFrame]] = [None] * capacity
+        self.count = 0  # frames pushed, the next one goes to ring[count % capacity]
+        self.start_time = time.monotonic()
+        # screen and screen.generation at the last push, to skip rows
+        self.last_source: Optional[Screen] = None
+        self.last_generation = 0
+
+    def push(self, screen: Screen) -> HistoryFrame:
+        """
+        Snapshot screen as the latest frame, dropping the oldest one when full
+        """
+        last = self.ring[(self.count - 1) % self.capacity] if self.count else None
+        columns = screen.columns
+        cells = screen.cells
+        if last is None or last.lines != screen.lines or last.columns != columns:
+            rows = [
+                cells[y * columns : (y + 1) * columns].tobytes()
+                for y in range(screen.lines)
+            ]
+        else:
+            rows = list(last.rows)
+            if screen is self.last_source:
+                changed = screen.rows_changed_since(self.last_generation)
+            else:
+                changed = range(screen.lines)
+            for y in changed:
+                row = cells[y * columns : (y + 1) * columns].tobytes()
+                # marked dirty is not always changed, keep the shared row
+                if row != rows[y]:
+                    rows[y] = row
+        frame = HistoryFrame(
+            number=self.count,
+            seconds=time.monotonic() - self.start_time,
+            lines=screen.lines,
+            columns=columns,
+            cursor=screen.cursor,
+            generation=screen.generation,
+            rows=tuple(rows),
+        )
+        self.ring[self.count % self.capacity] = frame
+        self.count += 1
+        self.last_source = screen
+        self.last_generation = screen.generation
+        return frame
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def __getitem__(self, index: int) -> HistoryFrame:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("frame index out of range")
+        frame = self.ring[(self.count - length + index) % self.capacity]
+        assert frame is not None
+        return frame
+
+    def __iter__(self) -> Iterator[HistoryFrame]:
+        """
+        Iterate from the oldest frame to the latest one
+        """
+        for index in range(len(self)):
+            yield self[index]
+
+    def clear(self) -> None:
+        """
+        Drop every frame, numbering starts again
+        """
+        self.ring = [None] * self.capacity
+        self.count = 0
+        self.last_source = None
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by the kept frames, shared rows counted once
+        """
+        seen: Set[int] = set()
+        total = 0
+        for frame in self:
+            total += sys.getsizeof(frame) + sys.getsizeof(frame.rows)
+            for row in frame.rows:
+                if id(row) not in seen:
+                    seen.add(id(row))
+                    total += sys.getsizeof(row)
+        return total
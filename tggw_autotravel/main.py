@@ -1,15 +1,78 @@
+import argparse
+import functools
 import logging
 import time
 import traceback
+from typing import List, Optional
 
-from .controller import Controller
+from .controller import GAME_COMMANDS, Controller, game_runner
+from .export import ScreenExport
+from .getch import GetchScript
+from .getch.ansibreak import AnsiBreak
+from .record import Recorder
+from .run import RunBase, RunReplay
 
 log = logging.getLogger(__name__)
 
-CYCLE_TIME = 0.01
 
+def split_keys(text: str) -> List[str]:
+    """
+    Split a key script into getch tokens (characters and escape sequences)
+    """
+    ansibreak = AnsiBreak()
+    tokens = ansibreak.decode(text, timestamp=0.0)
+    # flush a trailing incomplete escape sequence
+    tokens += ansibreak.decode("", timestamp=float("inf"))
+    return tokens
 
-def main() -> None:
+
+def replay_runner(lines: int, columns: int, path: str, realtime: bool) -> RunBase:
+    return RunReplay(path, lines=lines, columns=columns, realtime=realtime)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="tggw_autotravel")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="no TUI or keyboard, frames advance as fast as the game outputs",
+    )
+    parser.add_argument(
+        "--keys", default="", help="key script to send, with --headless"
+    )
+    parser.add_argument("--frames", type=int, help="stop after this many frames")
+    parser.add_argument(
+        "--backend",
+        choices=list(GAME_COMMANDS),
+        help="tggw_autotravel.run backend class",
+    )
+    parser.add_argument("--cwd", default="tggw_game", help="profile directory")
+    parser.add_argument(
+        "--child-process",
+        action="store_true",
+        help="run the backend in a child process, sharing the screen memory",
+    )
+    parser.add_argument("--record", help="record the session to this file")
+    parser.add_argument(
+        "--export", help="publish every frame to this memory-mapped file"
+    )
+    parser.add_argument(
+        "--replay", help="replay a recording or raw output file instead of the game"
+    )
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="replay a recording at the recorded pace, not raw output",
+    )
+    args = parser.parse_args(argv)
+    if args.keys and not args.headless:
+        # the console getchers read the keyboard only
+        parser.error("--keys needs --headless")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
     try:
         logging.basicConfig(
             level=logging.INFO,
@@ -19,20 +82,49 @@ def main() -> None:
             encoding="utf-8",
         )
         log.info("Start")
-        maingame = Controller(38, 92)
-        maingame.run()
-        while maingame.is_running():
-            while True:
-                char = maingame.getch()
-                if char == "":
+        getcher = GetchScript(split_keys(args.keys)) if args.headless else None
+        if args.replay is not None:
+            runner = functools.partial(
+                replay_runner, path=args.replay, realtime=args.realtime
+            )
+        else:
+            runner = game_runner(args.backend, args.cwd, args.child_process)
+        maingame: Optional[Controller] = None
+        try:
+            # Controller cleans up itself if its console setup fails
+            maingame = Controller(
+                38,
+                92,
+                getcher=getcher,
+                runner=runner,
+                headless=args.headless,
+                recorder=Recorder(args.record) if args.record is not None else None,
+                exporter=(
+                    ScreenExport(args.export) if args.export is not None else None
+                ),
+            )
+            start_time = time.perf_counter()
+            maingame.run()
+            while maingame.is_running():
+                chars = maingame.getch_many()
+                if len(chars) > 0:
+                    log.debug(f"chars: {chars!r}")
+                    # handle
+                    # with errorcatcher(log):
+                    maingame.write_many(chars)
+                maingame.nextframe()
+                if args.frames is not None and maingame.frames >= args.frames:
                     break
-                log.debug(f"char: {char!r}")
-                # handle
-                # with errorcatcher(log):
-                maingame.write(char)
-            maingame.nextframe()
-            time.sleep(CYCLE_TIME)
-        maingame.stop()
+                maingame.wait()
+        finally:
+            # restores the terminal
+            if maingame is not None:
+                maingame.close()
+        seconds = time.perf_counter() - start_time
+        log.info(
+            f"Stop: {maingame.frames} frames in {seconds:.3f}s"
+            f" ({maingame.frames / max(seconds, 1e-9):.1f} fps)"
+        )
     except Exception:
         log.error(traceback.format_exc())
         raise
@@ -0,0 +1,6 @@
+"""
+Shared by the getch and run backends and the controllers
+"""
+
+# how often a source that cannot set the wakeup event is polled, in seconds
+POLL_INTERVAL = 0.01
@@ -0,0 +1,247 @@
+"""
+Session recording: a gzip stream of keyframes, per-frame row deltas and
+timestamped inputs, written by a background thread.
+
+Each record is RECORD_HEADER (kind, seconds since start, payload length)
+followed by the payload:
+- KEYFRAME: Screen.to_bytes()
+- DELTA: DELTA_HEADER (cursor x, y, visibility, rows) then for each row
+  its index as uint16 and the row cells as little-endian uint32
+- INPUT: the written text as UTF-8
+"""
+
+import gzip
+import logging
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from queue import Queue, Full
+from threading import Thread
+from typing import BinaryIO, Iterator, Optional, Union
+
+from .screen import Screen, Cursor
+
+log = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct("<BdI")
+DELTA_HEADER = struct.Struct("<HHBxH")
+DELTA_ROW = struct.Struct("<H")
+KEYFRAME = 1
+DELTA = 2
+INPUT = 3
+
+
+def _cells_bytes(cells: "array[int]") -> bytes:
+    if sys.byteorder == "big":
+        cells = array("I", cells)
+        cells.byteswap()
+    return cells.tobytes()
+
+
+class Recorder:
+    """
+    Record frames and inputs to path.
+    frame() and input() only build the record and queue it, compression
+    and disk writes happen on the writer thread. When the queue is full a
+    frame is dropped rather than stalling the caller, and the next frame is
+    written as a keyframe. If writing fails (e.g. the disk is full) the
+    error is logged, failed is set and the rest of the session is dropped.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        keyframe_interval: int = 300,
+        queue_size: int = 256,
+        compresslevel: int = 6,
+    ) -> None:
+        self.file: BinaryIO = gzip.open(path, "wb", compresslevel=compresslevel)
+        self.keyframe_interval = keyframe_interval
+        self.start_time = time.monotonic()
+        # copy of the last recorded frame, deltas are against it
+        self.last: Optional[Screen] = None
+        # screen and screen.generation at the last frame, to skip rows
+        self.last_source: Optional[Screen] = None
+        self.last_generation = 0
+        self.frames_since_keyframe = 0
+        self.frames = 0
+        self.dropped = 0
+        # set by the writer thread when a write failed
+        self.failed = False
+        self.queue: Queue[Optional[bytes]] = Queue(maxsize=queue_size)
+        self.writer_thread = Thread(target=self._write_records, daemon=True)
+        self.writer_thread.start()
+
+    def _write_records(self) -> None:
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            if self.failed:
+                # keep draining, so input() and close() never block
+                continue
+            try:
+                self.file.write(record)
+            except Exception:
+                log.exception("Recording failed, dropping the rest of the session")
+                self.failed = True
+        try:
+            self.file.close()
+        except Exception:
+            if not self.failed:
+                log.exception("Recording failed when closing the file")
+                self.failed = True
+
+    def _record(self, kind: int, payload: bytes) -> bytes:
+        seconds = time.monotonic() - self.start_time
+        return RECORD_HEADER.pack(kind, seconds, len(payload)) + payload
+
+    def frame(self, screen: Screen) -> None:
+        """
+        Record the screen if it changed since the last frame
+        """
+        if self.failed:
+            return
+        last = self.last
+        if (
+            last is not None
+            and screen is self.last_source
+            and screen.generation == self.last_generation
+            and screen.cursor == last.cursor
+        ):
+            return
+        if (
+            last is None
+            or last.lines != screen.lines
+            or last.columns != screen.columns
+            or self.frames_since_keyframe >= self.keyframe_interval
+        ):
+            record = self._record(KEYFRAME, screen.to_bytes())
+            if not self._put(record):
+                return
+            self.last = screen.copy()
+            self.frames_since_keyframe = 0
+        else:
+            columns = screen.columns
+            parts = []
+            rows = 0
+            if screen is self.last_source:
+                changed = screen.rows_changed_since(self.last_generation)
+            else:
+                changed = list(range(screen.lines))
+            for y in changed:
+                start = y * columns
+                row = screen.cells[start : start + columns]
+                if last.cells[start : start + columns] == row:
+                    continue
+                parts.append(DELTA_ROW.pack(y))
+                parts.append(_cells_bytes(array("I", row)))
+                rows += 1
+            if rows == 0 and last.cursor == screen.cursor:
+                self.last_source = screen
+                self.last_generation = screen.generation
+                return
+            cursor = screen.cursor
+            header = DELTA_HEADER.pack(cursor.x, cursor.y, cursor.visibility, rows)
+            record = self._record(DELTA, header + b"".join(parts))
+            if not self._put(record):
+                # the delta chain is broken, start again with a keyframe
+                self.last = None
+                return
+            last.set_cells(0, screen.cells)
+            last.cursor = cursor
+            self.frames_since_keyframe += 1
+        self.last_source = screen
+        self.last_generation = screen.generation
+        self.frames += 1
+
+    def _put(self, record: bytes) -> bool:
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def input(self, text: str) -> None:
+        """
+        Record text written to the game
+        """
+        if self.failed:
+            return
+        self.queue.put(self._record(INPUT, text.encode("utf-8")))
+
+    def close(self) -> None:
+        """
+        Flush the queue and close the file
+        """
+        if self.writer_thread.is_alive():
+            self.queue.put(None)
+            self.writer_thread.join()
+        if self.dropped > 0:
+            log.warning(f"Recorder dropped {self.dropped} frames")
+
+
+@dataclass(slots=True, frozen=True)
+class RecordFrame:
+    seconds: float
+    screen: Screen  # the same object for every frame, copy() to keep it
+
+
+@dataclass(slots=True, frozen=True)
+class RecordInput:
+    seconds: float
+    text: str
+
+
+Record = Union[RecordFrame, RecordInput]
+
+
+def read_exact(file: BinaryIO, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        raise EOFError(f"Recording truncated: {len(data)} < {size}")
+    return data
+
+
+def iter_records(path: str) -> Iterator[Record]:
+    """
+    Read a recording, applying the deltas to one Screen
+    """
+    screen: Optional[Screen] = None
+    with gzip.open(path, "rb") as file:
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) == 0:
+                return
+            if len(header) != RECORD_HEADER.size:
+                raise EOFError("Recording truncated")
+            kind, seconds, length = RECORD_HEADER.unpack(header)
+            payload = read_exact(file, length)
+            if kind == KEYFRAME:
+                screen = Screen.from_bytes(payload)
+                yield RecordFrame(seconds, screen)
+            elif kind == DELTA:
+                if screen is None:
+                    raise ValueError("Delta before the first keyframe")
+                x, y, visibility, rows = DELTA_HEADER.unpack_from(payload)
+                columns = screen.columns
+                pos = DELTA_HEADER.size
+                for _ in range(rows):
+                    (row,) = DELTA_ROW.unpack_from(payload, pos)
+                    pos += DELTA_ROW.size
+                    cells = array("I")
+                    cells.frombytes(payload[pos : pos + columns * 4])
+                    if sys.byteorder == "big":
+                        cells.byteswap()
+                    pos += columns * 4
+                    screen.set_cells(row * columns, cells)
+                screen.cursor = Cursor(x, y, visibility)
+                yield RecordFrame(seconds, screen)
+            elif kind == INPUT:
+                yield RecordInput(seconds, payload.decode("utf-8"))
+            else:
+                raise ValueError(f"Unknown record kind {kind}")
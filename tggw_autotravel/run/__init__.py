@@ -1,10 +1,26 @@
+import sys
+
 from .base import RunBase, run_context
-from .winpty import RunWinPTY
+from .asyncrun import AsyncRunBase, AsyncRun
+from .replay import RunReplay
+from .sharedmemory import RunSharedMemory
 from .winconsole import RunWinConsole
 
 __all__ = [
     "RunBase",
     "run_context",
-    "RunWinPTY",
+    "AsyncRunBase",
+    "AsyncRun",
+    "RunReplay",
+    "RunSharedMemory",
     "RunWinConsole",
 ]
+
+if sys.platform == "win32":
+    from .winpty import RunWinPTY
+
+    __all__ += ["RunWinPTY"]
+else:
+    from .posixpty import RunPosixPTY
+
+    __all__ += ["RunPosixPTY"]
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from threading import Event
+from typing import Callable, Iterable, Optional, TypeVar
+
+from .base import RunBase
+from ..screen import Screen
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncRunBase(ABC):
+    """
+    asyncio counterpart of RunBase
+    """
+
+    screen: Screen
+
+    @abstractmethod
+    async def wait(self) -> None:
+        """
+        Wait until the program may have written output
+        """
+        ...
+
+    @abstractmethod
+    async def read_frame(self) -> bool:
+        """
+        Read the screen and return True if the program is still alive
+        """
+        ...
+
+    @abstractmethod
+    async def alive(self) -> bool: ...
+
+    @abstractmethod
+    async def write(self, text: str) -> None: ...
+
+    async def write_many(self, texts: Iterable[str]) -> None:
+        for text in texts:
+            await self.write(text)
+
+    @abstractmethod
+    async def kill(self) -> None: ...
+
+    @abstractmethod
+    async def close(self) -> None: ...
+
+
+class _LoopWakeup(Event):
+    """
+    threading.Event that also wakes an asyncio.Event, so backend reader
+    threads can wake a coroutine
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, ready: asyncio.Event) -> None:
+        super().__init__()
+        self.loop = loop
+        self.ready = ready
+
+    def set(self) -> None:
+        super().set()
+        try:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        except RuntimeError:
+            # loop closed
+            pass
+
+
+class AsyncRun(AsyncRunBase):
+    """
+    Run a RunBase backend from asyncio.
+    Backends with a non-blocking fileno() are watched with loop.add_reader and
+    called directly. Other backends are called in an executor, one call at a
+    time, and woken by their wakeup event or polled at their deadline().
+    """
+
+    def __init__(self, run: RunBase, executor: Optional[Executor] = None) -> None:
+        self.run = run
+        self.screen = run.screen
+        self.executor = executor
+        self.ready = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fd: Optional[int] = None
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        if self.loop is not None:
+            return self.loop
+        self.loop = loop = asyncio.get_running_loop()
+        fd = self.run.fileno()
+        if fd is not None:
+            try:
+                loop.add_reader(fd, self.ready.set)
+                self.fd = fd
+            except NotImplementedError:
+                # e.g. ProactorEventLoop
+                log.debug("add_reader not supported, using the executor")
+        if self.fd is None:
+            self.run.set_wakeup(_LoopWakeup(loop, self.ready))
+        return loop
+
+    async def _call(self, func: Callable[..., T], *args: object) -> T:
+        loop = self._start()
+        async with self.lock:
+            if self.fd is not None:
+                return func(*args)
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def wait(self) -> None:
+        self._start()
+        # a watched descriptor needs no polling
+        deadline = None if self.fd is not None else self.run.deadline()
+        if deadline is None:
+            await self.ready.wait()
+        else:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.ready.clear()
+
+    async def read_frame(self) -> bool:
+        alive = await self._call(self.run.read_frame)
+        self.screen = self.run.screen
+        return alive
+
+    async def alive(self) -> bool:
+        return await self._call(self.run.alive)
+
+    async def write(self, text: str) -> None:
+        await self._call(self.run.write, text)
+
+    async def write_many(self, texts: Iterable[str]) -> None:
+        await self._call(self.run.write_many, list(texts))
+
+    async def kill(self) -> None:
+        await self._call(self.run.kill)
+
+    async def close(self) -> None:
+        if self.loop is not None and self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            self.fd = None
+        await self._call(self.run.close)
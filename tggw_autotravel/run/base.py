@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
-from typing import Optional, Dict, Generator
+from threading import Event
+from typing import Optional, Dict, Generator, Iterable
+import time
 
+from ..polling import POLL_INTERVAL
 from ..screen import Screen
 
 
@@ -18,6 +21,28 @@ class RunBase(ABC):
     ) -> None: ...
 
     screen: Screen
+    wakeup: Optional[Event] = None
+
+    def set_wakeup(self, wakeup: Event) -> None:
+        """
+        Event to set when the program writes output or exits
+        """
+        self.wakeup = wakeup
+
+    def fileno(self) -> Optional[int]:
+        """
+        Non-blocking file descriptor that becomes readable when the program
+        writes output, or None. AsyncRun watches it instead of using a thread.
+        """
+        return None
+
+    def deadline(self) -> Optional[float]:
+        """
+        time.monotonic() at which read_screen() should be called even without
+        a wakeup, or None to wait for the wakeup only.
+        Backends that cannot set the wakeup are polled every POLL_INTERVAL.
+        """
+        return time.monotonic() + POLL_INTERVAL
 
     @abstractmethod
     def alive(self) -> bool:
@@ -26,6 +51,14 @@ class RunBase(ABC):
         """
         ...
 
+    def read_frame(self) -> bool:
+        """
+        Read the screen and return True if the program is still alive.
+        Backends that can do both in one round trip override this.
+        """
+        self.read_screen()
+        return self.alive()
+
     @abstractmethod
     def read_screen(self) -> None:
         """
@@ -45,6 +78,13 @@ class RunBase(ABC):
         """
         ...
 
+    def write_many(self, texts: Iterable[str]) -> None:
+        """
+        Write several getch tokens at once, backends override this to batch them
+        """
+        for text in texts:
+            self.write(text)
+
     @abstractmethod
     def kill(self) -> None:
         """
@@ -0,0 +1,72 @@
+from threading import Lock
+
+from .vt import make_parser
+from ..screen import Screen
+
+
+class DoubleBuffer:
+    """
+    Program output parsed on a reader thread into a back Screen, and handed
+    to the main thread by swapping the cell arrays into the front Screen.
+    front keeps its identity so the row generations still work for the TUI
+    and the recorder. swap() never copies or waits, the reader brings the
+    rows that changed since back up to date before it parses again.
+    """
+
+    def __init__(self, lines: int, columns: int, parser: str = "vt") -> None:
+        self.front = Screen(lines, columns)
+        self.back = Screen(lines, columns)
+        self.parser = make_parser(self.back, parser)
+        self.lock = Lock()
+        # back holds the arrays front had before the last swap
+        self.stale = False
+
+    def feed(self, text: str) -> None:
+        """
+        Parse output into back, called by the reader thread
+        """
+        with self.lock:
+            if self.stale:
+                self._sync()
+            self.parser.feed(text)
+            self.parser.update()
+
+    def _sync(self) -> None:
+        # back.generation is what front had before the swap
+        front = self.front
+        back = self.back
+        columns = front.columns
+        for y in front.rows_changed_since(back.generation):
+            start = y * columns
+            back.cells[start : start + columns] = front.cells[start : start + columns]
+            back.row_generation[y] = front.row_generation[y]
+        back.generation = front.generation
+        back.cursor = front.cursor
+        self.stale = False
+
+    def swap(self) -> bool:
+        """
+        Make the output parsed so far visible in front, called by the main
+        thread. Returns False if there is nothing new, or if the reader is
+        parsing right now; it sets the wakeup again when it is done.
+        """
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            front = self.front
+            back = self.back
+            if self.stale or (
+                back.generation == front.generation and back.cursor == front.cursor
+            ):
+                return False
+            front.cells, back.cells = back.cells, front.cells
+            front.row_generation, back.row_generation = (
+                back.row_generation,
+                front.row_generation,
+            )
+            front.generation, back.generation = back.generation, front.generation
+            front.cursor = back.cursor
+            self.stale = True
+            return True
+        finally:
+            self.lock.release()
@@ -0,0 +1,142 @@
+import codecs
+import errno
+import fcntl
+import logging
+import os
+import select
+import struct
+import subprocess
+import termios
+from typing import Optional, Dict, Iterable, List
+
+from .base import RunBase
+from .vt import make_parser
+from ..screen import Screen
+
+log = logging.getLogger(__name__)
+
+READ_SIZE = 65536
+
+
+class RunPosixPTY(RunBase):
+    """
+    Run the program on a POSIX pseudo terminal, e.g. the game under wine.
+    The master side is non-blocking and read on demand in read_screen(),
+    so there is no reader thread. AsyncRun watches fileno() instead.
+    """
+
+    def __init__(
+        self,
+        cmd: str,
+        *args: str,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        lines: int = 24,
+        columns: int = 80,
+        parser: str = "vt",
+    ) -> None:
+        master, slave = os.openpty()
+        try:
+            fcntl.ioctl(
+                slave, termios.TIOCSWINSZ, struct.pack("HHHH", lines, columns, 0, 0)
+            )
+            self.process = subprocess.Popen(
+                [cmd, *args],
+                stdin=slave,
+                stdout=slave,
+                stderr=slave,
+                cwd=cwd,
+                env=env,
+                start_new_session=True,
+            )
+        except BaseException:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        os.set_blocking(master, False)
+        self.fd = master
+        self.eof = False
+        self.closed = False
+        # reused for every read, only the decoded text is allocated
+        self.read_buffer = bytearray(READ_SIZE)
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.screen = Screen(lines, columns)
+        self.parser = make_parser(self.screen, parser)
+
+    def fileno(self) -> Optional[int]:
+        return self.fd
+
+    def deadline(self) -> Optional[float]:
+        """
+        Readiness comes from fileno(), no polling needed
+        """
+        return None
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def read(self) -> str:
+        """
+        Read all output available now without blocking
+        """
+        if self.eof:
+            return ""
+        view = memoryview(self.read_buffer)
+        output: List[str] = []
+        while True:
+            try:
+                length = os.readv(self.fd, [self.read_buffer])
+            except BlockingIOError:
+                break
+            except OSError as e:
+                # EIO: the slave side is closed, the program has exited
+                if e.errno != errno.EIO:
+                    raise
+                length = 0
+            if length == 0:
+                self.eof = True
+                output.append(self.decoder.decode(b"", final=True))
+                break
+            output.append(self.decoder.decode(view[:length]))
+            if length < READ_SIZE:
+                break
+        view.release()
+        return "".join(output)
+
+    def read_screen(self) -> None:
+        output = self.read()
+        if output != "":
+            log.debug(f"Read from program: {output!r}")
+            self.parser.feed(output)
+        self.parser.update()
+
+    def write(self, text: str) -> None:
+        data = memoryview(text.encode("utf-8"))
+        while len(data) > 0:
+            try:
+                written = os.write(self.fd, data)
+            except BlockingIOError:
+                select.select([], [self.fd], [])
+                continue
+            except OSError as e:
+                if e.errno != errno.EIO:
+                    raise
+                # program exited, drop the input like RunWinPTY does
+                return
+            data = data[written:]
+
+    def write_many(self, texts: Iterable[str]) -> None:
+        self.write("".join(texts))
+
+    def kill(self) -> None:
+        self.process.kill()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        os.close(self.fd)
@@ -0,0 +1,36 @@
+import pyte
+
+from ..screen import Screen, Cursor, pack_color16
+
+
+class PyteAdapter:
+    """
+    Feed program output to pyte and copy the dirty rows into a Screen
+    """
+
+    def __init__(self, screen: Screen) -> None:
+        self.screen = screen
+        self.pyte_screen = pyte.Screen(screen.columns, screen.lines)
+        self.pyte_stream = pyte.Stream(self.pyte_screen)
+
+    def feed(self, text: str) -> None:
+        self.pyte_stream.feed(text)
+
+    def update(self) -> None:
+        """
+        Apply the changes since the last update() to the screen
+        """
+        cells = self.screen.cells
+        columns = self.screen.columns
+        for y in self.pyte_screen.dirty:
+            line = self.pyte_screen.buffer[y]
+            for x in range(self.pyte_screen.columns):
+                char = line[x]
+                cells[y * columns + x] = pack_color16(char.data, char.fg, char.bg)
+            self.screen.mark_dirty(y)
+        self.pyte_screen.dirty.clear()
+        self.screen.cursor = Cursor(
+            self.pyte_screen.cursor.x,
+            self.pyte_screen.cursor.y,
+            0 if self.pyte_screen.cursor.hidden else 1,
+        )
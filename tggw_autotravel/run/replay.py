@@ -0,0 +1,123 @@
+import logging
+import time
+from typing import Dict, Iterable, Iterator, Optional
+
+from .base import RunBase
+from .vt import make_parser
+from ..record import Record, RecordFrame, iter_records
+from ..screen import Screen
+
+log = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+RAW_CHUNK = 4096
+
+
+class RunReplay(RunBase):
+    """
+    Replay a session instead of running a program, cmd is the file:
+    - a Recorder recording, each read_screen() applies one frame
+    - raw program output (UTF-8 text), each read_screen() feeds the next
+      RAW_CHUNK characters to the parser, see make_parser()
+    realtime=True keeps the recorded pace, otherwise frames come as fast as
+    they are read. Raw output has no timestamps, realtime=True raises
+    ValueError for it. Writes are ignored.
+    """
+
+    def __init__(
+        self,
+        cmd: str,
+        *args: str,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        lines: int = 24,
+        columns: int = 80,
+        realtime: bool = False,
+        parser: str = "vt",
+    ) -> None:
+        self.screen = Screen(lines, columns)
+        self.realtime = realtime
+        self.start_time = time.monotonic()
+        self.finished = False
+        self.writes = 0
+        with open(cmd, "rb") as file:
+            is_recording = file.read(2) == GZIP_MAGIC
+        self.records: Optional[Iterator[Record]] = None
+        self.next_frame: Optional[RecordFrame] = None
+        self.raw: Optional[Iterator[str]] = None
+        if is_recording:
+            self.records = iter_records(cmd)
+            self._next_frame()
+        else:
+            if realtime:
+                raise ValueError(f"Raw output has no timestamps to replay: {cmd}")
+            self.parser = make_parser(self.screen, parser)
+            self.raw = self._read_raw(cmd)
+
+    def _read_raw(self, path: str) -> Iterator[str]:
+        with open(path, "r", encoding="utf-8", errors="replace", newline="") as file:
+            while True:
+                chunk = file.read(RAW_CHUNK)
+                if chunk == "":
+                    return
+                yield chunk
+
+    def _next_frame(self) -> None:
+        assert self.records is not None
+        self.next_frame = None
+        for record in self.records:
+            if isinstance(record, RecordFrame):
+                self.next_frame = record
+                return
+        self.finished = True
+
+    def _apply_frame(self, frame: RecordFrame) -> None:
+        source = frame.screen
+        self.screen.resize(source.lines, source.columns)
+        self.screen.set_cells(0, source.cells)
+        self.screen.cursor = source.cursor
+
+    def alive(self) -> bool:
+        return not self.finished
+
+    def deadline(self) -> Optional[float]:
+        """
+        The recorded time of the next frame, or now when not realtime
+        """
+        if self.finished or not self.realtime or self.next_frame is None:
+            return time.monotonic()
+        return self.start_time + self.next_frame.seconds
+
+    def read_screen(self) -> None:
+        if self.finished:
+            return
+        if self.raw is not None:
+            chunk = next(self.raw, None)
+            if chunk is None:
+                self.finished = True
+            else:
+                self.parser.feed(chunk)
+            self.parser.update()
+            return
+        now = time.monotonic()
+        while self.next_frame is not None:
+            if self.realtime and self.start_time + self.next_frame.seconds > now:
+                break
+            self._apply_frame(self.next_frame)
+            self._next_frame()
+            if not self.realtime:
+                break
+
+    def write(self, text: str) -> None:
+        self.writes += 1
+
+    def write_many(self, texts: Iterable[str]) -> None:
+        self.writes += 1
+
+    def kill(self) -> None:
+        self.finished = True
+
+    def close(self) -> None:
+        self.finished = True
+        self.records = None
+        self.raw = None
@@ -0,0 +1,307 @@
+"""
+Run a backend in a child process, so parsing the program output does not
+compete with the main process for the GIL. The child publishes frames into
+shared memory and the main process uses them as its screen without copying.
+
+Shared memory layout, all integers native:
+- control: published frame number (uint64, written by the child last),
+  acknowledged frame number (uint64, written by the main process), alive flag
+  (written by the child with each frame, it belongs to the last published one)
+- two slots, frame n is written to slot n % 2: Screen.pack_into() (padded to
+  8 bytes) followed by the row generations as uint64
+The child writes frame n + 1 only after the main process acknowledged frame
+n, that is after it stopped reading the other slot. Until then the child
+keeps reading the program, so everything in between ends up in one frame.
+"""
+
+from array import array
+from multiprocessing import get_context
+from multiprocessing.connection import Connection, wait
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import struct
+import sys
+import time
+
+from .base import RunBase, POLL_INTERVAL
+from ..screen import SCREEN_HEADER, Cursor, Screen
+
+log = logging.getLogger(__name__)
+
+CONTROL = struct.Struct("QQB7x")
+PUBLISHED_OFFSET = 0
+ACKED_OFFSET = 8
+ALIVE_OFFSET = 16
+FRAME_NUMBER = struct.Struct("Q")
+
+DEFAULT_BACKEND = "RunWinPTY" if sys.platform == "win32" else "RunPosixPTY"
+
+# child -> main: a frame was published, or the program exited
+NOTIFY = b"f"
+
+
+def slot_layout(lines: int, columns: int) -> Tuple[int, int]:
+    """
+    Return the size of a slot and the offset of the row generations in it
+    """
+    screen_size = SCREEN_HEADER.size + lines * columns * 4
+    rows_offset = (screen_size + 7) // 8 * 8
+    return rows_offset + lines * 8, rows_offset
+
+
+def _child_main(
+    backend: str,
+    cmd: str,
+    args: Tuple[str, ...],
+    options: Dict[str, object],
+    name: str,
+    conn: Connection,
+) -> None:
+    """
+    Child process entry: run the backend and publish its frames
+    """
+    from .. import run
+
+    shm = SharedMemory(name=name)
+    try:
+        try:
+            game: RunBase = getattr(run, backend)(cmd, *args, **options)
+        except BaseException as e:
+            conn.send(e)
+            return
+        conn.send(None)
+        try:
+            _child_loop(game, shm, conn)
+        finally:
+            game.close()
+    finally:
+        conn.close()
+        shm.close()
+
+
+def _child_loop(game: RunBase, shm: SharedMemory, conn: Connection) -> None:
+    buf = shm.buf
+    lines = game.screen.lines
+    columns = game.screen.columns
+    slot_size, rows_offset = slot_layout(lines, columns)
+    published = 0
+    pending = False
+    alive = True
+    last_generation = -1
+    last_cursor: Optional[Cursor] = None
+    while True:
+        while conn.poll():
+            kind, *payload = conn.recv()
+            if kind == "write":
+                game.write(payload[0])
+            elif kind == "write_many":
+                game.write_many(payload[0])
+            elif kind == "kill":
+                game.kill()
+            elif kind == "close":
+                return
+        if alive:
+            alive = game.read_frame()
+            screen = game.screen
+            if screen.generation != last_generation or screen.cursor != last_cursor:
+                last_generation = screen.generation
+                last_cursor = screen.cursor
+                pending = True
+            if not alive:
+                pending = True  # publish the exit even without a new screen
+        (acked,) = FRAME_NUMBER.unpack_from(buf, ACKED_OFFSET)
+        if pending and acked == published:
+            screen = game.screen
+            if screen.lines != lines or screen.columns != columns:
+                log.warning(f"Screen resized to {screen.lines}x{screen.columns}")
+            else:
+                offset = CONTROL.size + (published + 1) % 2 * slot_size
+                # the main process is reading the other slot
+                screen.pack_into(buf, offset)
+                start = offset + rows_offset
+                buf[start : start + lines * 8] = memoryview(
+                    screen.row_generation
+                ).cast("B")
+            published += 1
+            buf[ALIVE_OFFSET] = alive
+            FRAME_NUMBER.pack_into(buf, PUBLISHED_OFFSET, published)
+            pending = False
+            conn.send_bytes(NOTIFY)
+            if not alive:
+                # the pipe reaches EOF, like a pty when the program exits
+                return
+        # wait for input from the main process or output from the program
+        timeout: Optional[float] = None
+        deadline = game.deadline()
+        if deadline is not None:
+            timeout = max(0.0, deadline - time.monotonic())
+        elif game.fileno() is None:
+            # the backend only sets its wakeup event, poll it
+            timeout = POLL_INTERVAL
+        if pending:
+            # waiting for the acknowledgement
+            timeout = POLL_INTERVAL if timeout is None else min(timeout, POLL_INTERVAL)
+        objects: List[object] = [conn]
+        fd = game.fileno()
+        if fd is not None:
+            objects.append(fd)
+        wait(objects, timeout)
+
+
+class RunSharedMemory(RunBase):
+    """
+    Run another backend (RunPosixPTY or RunWinPTY by default) in a child
+    process. screen.cells and screen.row_generation are views of the shared
+    memory that change when the child writes to the slot again, two frames
+    later. Copy the screen to keep it. close() leaves a copy in screen.
+    """
+
+    def __init__(
+        self,
+        cmd: str,
+        *args: str,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        lines: int = 24,
+        columns: int = 80,
+        backend: str = DEFAULT_BACKEND,
+        **options: object,
+    ) -> None:
+        self.slot_size, self.rows_offset = slot_layout(lines, columns)
+        self.shm = SharedMemory(create=True, size=CONTROL.size + 2 * self.slot_size)
+        CONTROL.pack_into(self.shm.buf, 0, 0, 0, True)
+        self.screen = Screen(lines, columns)
+        self.frame = 0
+        self.child_alive = True
+        # alive flag of the last frame read, alive() does not look ahead
+        self.last_alive = True
+        self.closed = False
+        # memoryviews of the shared memory, released in close()
+        self.views: List[memoryview] = []
+        self.slots = [self._slot_views(0), self._slot_views(1)]
+        context = get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        options = dict(options, cwd=cwd, env=env, lines=lines, columns=columns)
+        self.process = context.Process(
+            target=_child_main,
+            args=(backend, cmd, args, options, self.shm.name, child_conn),
+            daemon=True,
+        )
+        try:
+            self.process.start()
+            child_conn.close()
+            error = self.conn.recv()
+        except BaseException:
+            self._release()
+            raise
+        if error is not None:
+            self.process.join()
+            self._release()
+            raise error
+
+    def fileno(self) -> Optional[int]:
+        if sys.platform == "win32":
+            # pipe handles cannot be selected, use deadline() polling
+            return None
+        return self.conn.fileno()
+
+    def deadline(self) -> Optional[float]:
+        if sys.platform == "win32":
+            return super().deadline()
+        return None
+
+    def alive(self) -> bool:
+        """
+        False only once read_screen() has read the exit frame, or the child
+        is gone, so the last screen is never skipped
+        """
+        return self.last_alive
+
+    def _slot_views(self, slot: int) -> Tuple["array[int]", "array[int]"]:
+        offset = CONTROL.size + slot * self.slot_size
+        start = offset + SCREEN_HEADER.size
+        cells_end = start + self.screen.lines * self.screen.columns * 4
+        rows_start = offset + self.rows_offset
+        rows_end = rows_start + self.screen.lines * 8
+        rows = self.shm.buf[rows_start:rows_end]
+        row_generation = rows.cast("Q")
+        self.views += [row_generation, rows]
+        view = self.shm.buf[start:cells_end]
+        cells = view.cast("I")
+        self.views += [cells, view]
+        return cells, row_generation  # type: ignore[return-value]
+
+    def read_screen(self) -> None:
+        try:
+            while self.conn.poll():
+                self.conn.recv_bytes()
+        except (EOFError, OSError):
+            self.child_alive = False
+        buf = self.shm.buf
+        (published,) = FRAME_NUMBER.unpack_from(buf, PUBLISHED_OFFSET)
+        if published == self.frame:
+            if not self.child_alive:
+                # gone without publishing an exit frame
+                self.last_alive = False
+            return
+        slot = published % 2
+        offset = CONTROL.size + slot * self.slot_size
+        _, _, _, _, x, y, visibility, generation = SCREEN_HEADER.unpack_from(
+            buf, offset
+        )
+        cells, row_generation = self.slots[slot]
+        if sys.byteorder == "big":
+            # pack_into() writes little-endian cells
+            cells = array("I", cells)
+            cells.byteswap()
+        self.screen.cells = cells
+        self.screen.row_generation = row_generation
+        self.screen.cursor = Cursor(x, y, visibility)
+        self.screen.generation = generation
+        self.frame = published
+        # the child sets the flag before publishing and cannot publish again
+        # before the acknowledgement, so it belongs to this frame
+        self.last_alive = bool(buf[ALIVE_OFFSET])
+        FRAME_NUMBER.pack_into(buf, ACKED_OFFSET, published)
+
+    def _send(self, message: Tuple[object, ...]) -> None:
+        try:
+            self.conn.send(message)
+        except (BrokenPipeError, EOFError, OSError):
+            # the child has exited, drop the input like the other backends
+            self.child_alive = False
+
+    def write(self, text: str) -> None:
+        self._send(("write", text))
+
+    def write_many(self, texts: Iterable[str]) -> None:
+        self._send(("write_many", list(texts)))
+
+    def kill(self) -> None:
+        self._send(("kill",))
+
+    def _release(self) -> None:
+        # keep the last frame readable after the views are gone
+        self.screen.cells = array("I", self.screen.cells)
+        self.screen.row_generation = array("Q", self.screen.row_generation)
+        self.slots = []
+        for view in self.views:
+            view.release()
+        self.views = []
+        self.conn.close()
+        self.shm.close()
+        self.shm.unlink()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.child_alive = False
+        self.last_alive = False
+        self._send(("close",))
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self._release()
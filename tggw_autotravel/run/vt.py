@@ -0,0 +1,627 @@
+"""
+A small VT parser that writes program output straight into a Screen.
+It covers what the game prints: text, cursor movement, erase, scrolling,
+16-color SGR and cursor visibility. The behaviour follows pyte so the two
+are interchangeable, see make_parser().
+"""
+
+from array import array
+from typing import Dict, List, Optional, Protocol, Set, Tuple
+import logging
+import re
+import sys
+import unicodedata
+
+from ..screen import BLANK_CELL, CHAR_MASK, FG_SHIFT, BG_SHIFT, Color, Cursor, Screen
+from ..screen import CACHE_LIMIT, color16
+
+log = logging.getLogger(__name__)
+
+# text runs, CSI, OSC, other ESC sequences, C0 controls, a lone ESC
+TOKEN = re.compile(
+    r"([^\x00-\x1f\x7f]+)"
+    r"|\x1b\[([\x30-\x3f]*)[\x20-\x2f]*([\x40-\x7e])"
+    r"|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)"
+    r"|\x1b([\x20-\x2f]*)([\x30-\x5a\x5c\x5e-\x7e])"
+    r"|([\x00-\x1a\x1c-\x1f\x7f])"
+    r"|\x1b"
+)
+# what is left of a sequence cut at the end of a feed() chunk
+INCOMPLETE = re.compile(
+    r"\x1b(?:\[[\x30-\x3f]*[\x20-\x2f]*|\][^\x07\x1b]*\x1b?|[\x20-\x2f]*)\Z"
+)
+
+# SGR color number - 30 in ANSI order -> Color
+ANSI_COLORS = [
+    Color.BLACK,
+    Color.RED,
+    Color.GREEN,
+    Color.YELLOW,
+    Color.BLUE,
+    Color.MAGENTA,
+    Color.CYAN,
+    Color.WHITE,
+]
+
+
+def xterm_palette() -> List[str]:
+    """
+    The xterm 256 color palette as pyte names it: 16 basic colors, the
+    6x6x6 cube and 24 grays
+    """
+    palette = [
+        "000000", "cd0000", "00cd00", "cdcd00", "0000ee", "cd00cd", "00cdcd",
+        "e5e5e5", "7f7f7f", "ff0000", "00ff00", "ffff00", "5c5cff", "ff00ff",
+        "00ffff", "ffffff",
+    ]  # fmt: skip
+    levels = [0x00, 0x5F, 0x87, 0xAF, 0xD7, 0xFF]
+    for n in range(216):
+        red, green, blue = levels[n // 36], levels[n // 6 % 6], levels[n % 6]
+        palette.append(f"{red:02x}{green:02x}{blue:02x}")
+    for n in range(24):
+        gray = 8 + n * 10
+        palette.append(f"{gray:02x}{gray:02x}{gray:02x}")
+    return palette
+
+
+PALETTE_256 = xterm_palette()
+
+DEFAULT_ATTR = Color.WHITE << FG_SHIFT | Color.BLACK << BG_SHIFT
+FG_MASK = 0xF << FG_SHIFT
+BG_MASK = 0xF << BG_SHIFT
+# index of the code point byte of a cell in memory
+CODE_BYTE = 0 if sys.byteorder == "little" else 3
+# runs up to this length are cached
+RUN_CACHE_LENGTH = 16
+
+
+def char_width(char: str) -> int:
+    if unicodedata.combining(char):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in "WF" else 1
+
+
+class VTParser:
+    """
+    Parse program output into a Screen, a drop-in for PyteAdapter.
+    feed() writes the cells, update() marks the changed rows dirty and sets
+    the cursor. Unknown sequences are logged and ignored.
+    """
+
+    def __init__(self, screen: Screen) -> None:
+        self.screen = screen
+        self.dirty: Set[int] = set()
+        # incomplete escape sequence from the previous feed()
+        self.pending = ""
+        # rows of cells with the same attributes, for drawing ASCII runs
+        self.templates: Dict[int, "array[int]"] = {}
+        # the game repeats the same short runs and SGR sequences, cache them:
+        # (attributes, text) -> cells, (attributes, SGR parameters) -> attributes
+        self.run_cache: Dict[Tuple[int, str], "array[int]"] = {}
+        self.sgr_cache: Dict[Tuple[int, str], int] = {}
+        # ESC 7 stack: x, y, attributes, hidden, origin mode, autowrap
+        self.savepoints: List[Tuple[int, int, int, bool, bool, bool]] = []
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Full reset (ESC c): clear the screen, home the cursor, default modes
+        """
+        screen = self.screen
+        self.x = 0
+        self.y = 0
+        self.attr = DEFAULT_ATTR
+        self.hidden = False
+        self.autowrap = True
+        self.origin = False
+        self.margins: Optional[Tuple[int, int]] = None
+        self.tabstops = set(range(8, screen.columns, 8))
+        screen.cells[:] = array("I", [BLANK_CELL]) * len(screen.cells)
+        self.dirty.update(range(screen.lines))
+
+    def feed(self, text: str) -> None:
+        if self.pending:
+            text = self.pending + text
+            self.pending = ""
+        pos = 0
+        end = len(text)
+        match = TOKEN.match
+        while pos < end:
+            m = match(text, pos)
+            assert m is not None
+            run, params, final, esc_inter, esc_final, control = m.groups()
+            if run is not None:
+                self.draw(run)
+            elif final == "m":
+                key = (self.attr, params)
+                attr = self.sgr_cache.get(key)
+                if attr is None:
+                    if len(self.sgr_cache) >= CACHE_LIMIT:
+                        self.sgr_cache.clear()
+                    self.csi(params, final)
+                    self.sgr_cache[key] = self.attr
+                else:
+                    self.attr = attr
+            elif final is not None:
+                self.csi(params, final)
+            elif control is not None:
+                self.control(control)
+            elif esc_final is not None:
+                self.escape(esc_inter, esc_final)
+            elif m.end() - pos == 1:
+                # lone ESC: the rest of the chunk may be a cut sequence
+                if INCOMPLETE.match(text, pos):
+                    self.pending = text[pos:]
+                    return
+                log.debug(f"Invalid escape sequence: {text[pos:pos + 8]!r}")
+            pos = m.end()
+
+    def update(self) -> None:
+        """
+        Mark the rows changed since the last update() dirty and set the cursor
+        """
+        for y in sorted(self.dirty):
+            self.screen.mark_dirty(y)
+        self.dirty.clear()
+        self.screen.cursor = Cursor(self.x, self.y, 0 if self.hidden else 1)
+
+    # text
+
+    def draw(self, text: str) -> None:
+        columns = self.screen.columns
+        if not text.isascii():
+            self.draw_wide(text)
+            return
+        if self.x + len(text) <= columns:
+            self.put_ascii(text)
+            self.dirty.add(self.y)
+            return
+        pos = 0
+        length = len(text)
+        while pos < length:
+            if self.x == columns:
+                if self.autowrap:
+                    self.dirty.add(self.y)
+                    self.x = 0
+                    self.index()
+                else:
+                    # overwrite the last column, as pyte does
+                    pos = length - 1
+                    self.x -= 1
+            count = min(length - pos, columns - self.x)
+            self.put_ascii(text[pos : pos + count])
+            pos += count
+        self.dirty.add(self.y)
+
+    def put_ascii(self, text: str) -> None:
+        """
+        Write ASCII text at the cursor, it must fit in the line
+        """
+        count = len(text)
+        start = self.y * self.screen.columns + self.x
+        key = (self.attr, text)
+        packed = self.run_cache.get(key)
+        if packed is None:
+            template = self.templates.get(self.attr)
+            if template is None:
+                template = array("I", [self.attr]) * self.screen.columns
+                self.templates[self.attr] = template
+            packed = template[:count]
+            # only the code point byte differs from the template
+            with memoryview(packed) as view, view.cast("B") as raw:
+                raw[CODE_BYTE::4] = text.encode("ascii")
+            if count <= RUN_CACHE_LENGTH:
+                if len(self.run_cache) >= CACHE_LIMIT:
+                    self.run_cache.clear()
+                self.run_cache[key] = packed
+        self.screen.cells[start : start + count] = packed
+        self.x += count
+
+    def draw_wide(self, text: str) -> None:
+        columns = self.screen.columns
+        cells = self.screen.cells
+        for char in text:
+            width = char_width(char)
+            if self.x == columns:
+                if self.autowrap:
+                    self.dirty.add(self.y)
+                    self.x = 0
+                    self.index()
+                elif width > 0:
+                    self.x -= width
+            start = self.y * columns + self.x
+            if width == 0:
+                self.combine(char)
+                continue
+            cells[start] = ord(char) | self.attr
+            if width == 2 and self.x + 1 < columns:
+                cells[start + 1] = self.attr
+            self.x = min(self.x + width, columns)
+        self.dirty.add(self.y)
+
+    def combine(self, char: str) -> None:
+        """
+        Combine a zero-width character with the one before the cursor
+        """
+        columns = self.screen.columns
+        if self.x > 0:
+            index = self.y * columns + self.x - 1
+            y = self.y
+        elif self.y > 0:
+            index = self.y * columns - 1
+            y = self.y - 1
+        else:
+            return
+        cell = self.screen.cells[index]
+        code = cell & CHAR_MASK
+        base = chr(code) if code != 0 else ""
+        combined = unicodedata.normalize("NFC", base + char)
+        self.screen.cells[index] = cell & ~CHAR_MASK | ord(combined[0])
+        self.dirty.add(y)
+
+    # controls
+
+    def control(self, char: str) -> None:
+        if char == "\r":
+            self.x = 0
+        elif char in "\n\x0b\x0c":
+            self.index()
+        elif char == "\x08":
+            self.cursor_back(1)
+        elif char == "\t":
+            self.tab()
+        # BEL, NUL, DEL and the others are ignored
+
+    def tab(self) -> None:
+        for stop in sorted(self.tabstops):
+            if self.x < stop:
+                self.x = stop
+                return
+        self.x = self.screen.columns - 1
+
+    def escape(self, intermediate: str, final: str) -> None:
+        if intermediate != "":
+            # charset selection and the like, nothing to do with UTF-8
+            return
+        if final == "7":
+            self.save_cursor()
+        elif final == "8":
+            self.restore_cursor()
+        elif final in "DE":
+            self.index()
+        elif final == "M":
+            self.reverse_index()
+        elif final == "H":
+            self.tabstops.add(self.x)
+        elif final == "c":
+            self.reset()
+        else:
+            log.debug(f"Unknown escape sequence: ESC {final}")
+
+    # CSI
+
+    def csi(self, params: str, final: str) -> None:
+        private = "?" in params
+        args = [
+            min(int(arg), 9999) if arg.isdigit() else 0
+            for arg in params.replace("?", "").split(";")
+        ]
+        arg = args[0] or 1
+        if final == "m":
+            if not private:
+                self.sgr(args)
+        elif final in "Hf":
+            self.cursor_position(args[0], args[1] if len(args) > 1 else 0)
+        elif final == "J":
+            self.erase_in_display(args[0])
+        elif final == "K":
+            self.erase_in_line(args[0])
+        elif final == "A":
+            self.cursor_up(arg)
+        elif final in "Be":
+            self.cursor_down(arg)
+        elif final in "Ca":
+            self.x = min(self.x + arg, self.screen.columns - 1)
+        elif final == "D":
+            self.cursor_back(arg)
+        elif final == "E":
+            self.cursor_down(arg)
+            self.x = 0
+        elif final == "F":
+            self.cursor_up(arg)
+            self.x = 0
+        elif final in "G`":
+            self.x = min(arg - 1, self.screen.columns - 1)
+        elif final == "d":
+            self.y = arg - 1
+            if self.origin and self.margins is not None:
+                self.y += self.margins[0]
+            self.clamp_y()
+        elif final == "X":
+            start = self.y * self.screen.columns
+            stop = start + min(self.x + arg, self.screen.columns)
+            self.fill(start + self.x, stop, self.attr | ord(" "))
+            self.dirty.add(self.y)
+        elif final == "h" or final == "l":
+            self.set_modes(args, private, final == "h")
+        elif final == "r":
+            self.set_margins(args)
+        elif final == "L":
+            self.insert_lines(arg)
+        elif final == "M":
+            self.delete_lines(arg)
+        elif final == "@":
+            self.insert_characters(arg)
+        elif final == "P":
+            self.delete_characters(arg)
+        elif final == "g":
+            if args[0] == 0:
+                self.tabstops.discard(self.x)
+            elif args[0] == 3:
+                self.tabstops.clear()
+        elif final not in "cn":
+            # device reports are ignored, like pyte does without a listener
+            log.debug(f"Unknown CSI sequence: {params!r} {final!r}")
+
+    def sgr(self, args: List[int]) -> None:
+        attr = self.attr
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            i += 1
+            if arg == 0:
+                attr = DEFAULT_ATTR
+            elif 30 <= arg <= 37:
+                attr = attr & ~FG_MASK | ANSI_COLORS[arg - 30] << FG_SHIFT
+            elif arg == 39:
+                attr = attr & ~FG_MASK | Color.WHITE << FG_SHIFT
+            elif 40 <= arg <= 47:
+                attr = attr & ~BG_MASK | ANSI_COLORS[arg - 40] << BG_SHIFT
+            elif arg == 49:
+                attr = attr & ~BG_MASK | Color.BLACK << BG_SHIFT
+            elif 90 <= arg <= 97:
+                attr = attr & ~FG_MASK | (ANSI_COLORS[arg - 90] | 8) << FG_SHIFT
+            elif 100 <= arg <= 107:
+                attr = attr & ~BG_MASK | (ANSI_COLORS[arg - 100] | 8) << BG_SHIFT
+            elif arg == 38 or arg == 48:
+                color, i = self.extended_color(args, i, arg == 38)
+                if color is None:
+                    pass
+                elif arg == 38:
+                    attr = attr & ~FG_MASK | color << FG_SHIFT
+                else:
+                    attr = attr & ~BG_MASK | color << BG_SHIFT
+            # bold, reverse and so on are not kept in the Screen
+        self.attr = attr
+
+    def extended_color(
+        self, args: List[int], i: int, foreground: bool
+    ) -> Tuple[Optional[Color], int]:
+        """
+        Parse 5;n or 2;r;g;b after SGR 38/48 at args[i], colors outside the
+        16 basic ones become the default color like in PyteAdapter.
+        Returns the color (None if malformed) and the index after it.
+        """
+        default = Color.WHITE if foreground else Color.BLACK
+        if i >= len(args):
+            return None, i
+        kind = args[i]
+        i += 1
+        if kind == 5:
+            if i >= len(args):
+                return None, i
+            n = args[i]
+            if n >= len(PALETTE_256):
+                return None, i + 1
+            return color16(PALETTE_256[n], default=default), i + 1
+        if kind == 2:
+            if i + 3 > len(args):
+                return None, len(args)
+            red, green, blue = args[i : i + 3]
+            return color16(f"{red:02x}{green:02x}{blue:02x}", default=default), i + 3
+        return None, i
+
+    def set_modes(self, modes: List[int], private: bool, value: bool) -> None:
+        for mode in modes:
+            if not private:
+                log.debug(f"Unknown mode: {mode}")
+            elif mode == 25:
+                self.hidden = not value
+            elif mode == 7:
+                self.autowrap = value
+            elif mode == 6:
+                self.origin = value
+                self.cursor_position(0, 0)
+            else:
+                log.debug(f"Unknown private mode: {mode}")
+
+    # cursor
+
+    def clamp_y(self, use_margins: bool = False) -> None:
+        if (use_margins or self.origin) and self.margins is not None:
+            top, bottom = self.margins
+        else:
+            top, bottom = 0, self.screen.lines - 1
+        self.y = min(max(top, self.y), bottom)
+
+    def cursor_position(self, line: int, column: int) -> None:
+        y = (line or 1) - 1
+        if self.origin and self.margins is not None:
+            top, bottom = self.margins
+            y += top
+            if not top <= y <= bottom:
+                return
+        self.x = min(max(0, (column or 1) - 1), self.screen.columns - 1)
+        self.y = y
+        self.clamp_y()
+
+    def cursor_up(self, count: int) -> None:
+        top = self.margins[0] if self.margins is not None else 0
+        self.y = max(self.y - count, top)
+
+    def cursor_down(self, count: int) -> None:
+        bottom = self.margins[1] if self.margins is not None else self.screen.lines - 1
+        self.y = min(self.y + count, bottom)
+
+    def cursor_back(self, count: int) -> None:
+        columns = self.screen.columns
+        if self.x == columns:
+            self.x -= 1
+        self.x = min(max(0, self.x - count), columns - 1)
+
+    def save_cursor(self) -> None:
+        self.savepoints.append(
+            (self.x, self.y, self.attr, self.hidden, self.origin, self.autowrap)
+        )
+
+    def restore_cursor(self) -> None:
+        if not self.savepoints:
+            self.origin = False
+            self.cursor_position(0, 0)
+            return
+        self.x, self.y, self.attr, self.hidden, origin, autowrap = (
+            self.savepoints.pop()
+        )
+        # like pyte, restoring only turns the modes on
+        self.origin = self.origin or origin
+        self.autowrap = self.autowrap or autowrap
+        self.x = min(max(0, self.x), self.screen.columns - 1)
+        self.clamp_y(use_margins=True)
+
+    def set_margins(self, args: List[int]) -> None:
+        lines = self.screen.lines
+        if args[0] == 0 and len(args) == 1:
+            self.margins = None
+            return
+        top, bottom = self.margins or (0, lines - 1)
+        top = max(0, min(args[0] - 1, lines - 1))
+        if len(args) > 1:
+            bottom = max(0, min(args[1] - 1, lines - 1))
+        if bottom - top >= 1:
+            self.margins = (top, bottom)
+            self.cursor_position(0, 0)
+
+    # scrolling and editing
+
+    def fill(self, start: int, stop: int, cell: int) -> None:
+        if stop > start:
+            self.screen.cells[start:stop] = array("I", [cell]) * (stop - start)
+
+    def scroll(self, top: int, bottom: int, count: int) -> None:
+        """
+        Move rows top..bottom up by count (down when negative), the rows
+        uncovered are blank
+        """
+        columns = self.screen.columns
+        cells = self.screen.cells
+        count = max(-(bottom - top + 1), min(count, bottom - top + 1))
+        start = top * columns
+        stop = (bottom + 1) * columns
+        shift = abs(count) * columns
+        if count > 0:
+            cells[start : stop - shift] = cells[start + shift : stop]
+            self.fill(stop - shift, stop, BLANK_CELL)
+        else:
+            cells[start + shift : stop] = cells[start : stop - shift]
+            self.fill(start, start + shift, BLANK_CELL)
+        self.dirty.update(range(top, bottom + 1))
+
+    def index(self) -> None:
+        top, bottom = self.margins or (0, self.screen.lines - 1)
+        if self.y == bottom:
+            self.scroll(top, bottom, 1)
+        else:
+            self.cursor_down(1)
+
+    def reverse_index(self) -> None:
+        top, bottom = self.margins or (0, self.screen.lines - 1)
+        if self.y == top:
+            self.scroll(top, bottom, -1)
+        else:
+            self.cursor_up(1)
+
+    def insert_lines(self, count: int) -> None:
+        top, bottom = self.margins or (0, self.screen.lines - 1)
+        if top <= self.y <= bottom:
+            self.scroll(self.y, bottom, -count)
+            self.x = 0
+
+    def delete_lines(self, count: int) -> None:
+        top, bottom = self.margins or (0, self.screen.lines - 1)
+        if top <= self.y <= bottom:
+            self.scroll(self.y, bottom, count)
+            self.x = 0
+
+    def insert_characters(self, count: int) -> None:
+        columns = self.screen.columns
+        cells = self.screen.cells
+        x = min(self.x, columns)
+        count = min(count, columns - x)
+        row = self.y * columns
+        cells[row + x + count : row + columns] = cells[row + x : row + columns - count]
+        self.fill(row + x, row + x + count, BLANK_CELL)
+        self.dirty.add(self.y)
+
+    def delete_characters(self, count: int) -> None:
+        columns = self.screen.columns
+        cells = self.screen.cells
+        x = min(self.x, columns)
+        count = min(count, columns - x)
+        row = self.y * columns
+        cells[row + x : row + columns - count] = cells[row + x + count : row + columns]
+        self.fill(row + columns - count, row + columns, BLANK_CELL)
+        self.dirty.add(self.y)
+
+    def erase_in_line(self, how: int) -> None:
+        columns = self.screen.columns
+        row = self.y * columns
+        if how == 0:
+            start, stop = self.x, columns
+        elif how == 1:
+            start, stop = 0, min(self.x + 1, columns)
+        elif how == 2:
+            start, stop = 0, columns
+        else:
+            return
+        self.fill(row + start, row + stop, self.attr | ord(" "))
+        self.dirty.add(self.y)
+
+    def erase_in_display(self, how: int) -> None:
+        columns = self.screen.columns
+        if how == 0:
+            start, stop = self.y + 1, self.screen.lines
+        elif how == 1:
+            start, stop = 0, self.y
+        elif how == 2 or how == 3:
+            start, stop = 0, self.screen.lines
+        else:
+            return
+        self.fill(start * columns, stop * columns, self.attr | ord(" "))
+        self.dirty.update(range(start, stop))
+        if how == 0 or how == 1:
+            self.erase_in_line(how)
+
+
+class OutputParser(Protocol):
+    """
+    What the backends need from a parser: feed() program output, then
+    update() to bring the screen up to date
+    """
+
+    def feed(self, text: str) -> None: ...
+
+    def update(self) -> None: ...
+
+
+def make_parser(screen: Screen, name: str = "vt") -> OutputParser:
+    """
+    The output parser for a pty backend: "vt" for VTParser, "pyte" for
+    PyteAdapter (needs pyte)
+    """
+    if name == "vt":
+        return VTParser(screen)
+    if name == "pyte":
+        from .pyteadapter import PyteAdapter
+
+        return PyteAdapter(screen)
+    raise ValueError(f"Unknown parser: {name}")
@@ -1,12 +1,15 @@
-from typing import Optional, Dict, List
+from typing import Optional, Dict, Iterable, List, Sequence, Tuple
 from dataclasses import dataclass
 from abc import abstractmethod
+from array import array
+import locale
 import struct
 import logging
 import subprocess
+import sys
 
 from .base import RunBase
-from ..screen import Screen, Char, Cursor, Color, color16
+from ..screen import Screen, Cursor, FG_SHIFT
 
 log = logging.getLogger(__name__)
 
@@ -42,16 +45,177 @@ def paramvine(cmd: str, *args: str) -> str:
     return cmd_str + "".join(" " + x for x in arg_strs)
 
 
+# The color byte of ReplyScreenChar lands in bits FG_SHIFT.. of a packed cell,
+# which straddles bytes 2 and 3 of the little-endian uint32.
+COLOR_BYTE2 = bytes((color << (FG_SHIFT - 16)) & 0xFF for color in range(256))
+COLOR_BYTE3 = bytes(color >> (24 - FG_SHIFT) for color in range(256))
+
+
+def decode_cells(data: bytes) -> "array[int]":
+    """
+    Decode ReplyScreenChar[] (<HB per cell) into packed Screen cells.
+    Works on whole byte planes, so there is no per-cell Python code.
+    """
+    count = len(data) // 3
+    packed = bytearray(count * 4)
+    packed[0::4] = data[0 : count * 3 : 3]
+    packed[1::4] = data[1 : count * 3 : 3]
+    colors = bytes(data[2 : count * 3 : 3])
+    packed[2::4] = colors.translate(COLOR_BYTE2)
+    packed[3::4] = colors.translate(COLOR_BYTE3)
+    cells = array("I")
+    cells.frombytes(packed)
+    if sys.byteorder == "big":
+        cells.byteswap()
+    return cells
+
+
 QUERY_SCREEN = 1
 QUERY_WRITE = 2
 QUERY_ALIVE = 3
 QUERY_KILL = 4
+QUERY_SCREEN_DIFF = 5
+QUERY_WRITE_KEYS = 6
+QUERY_FRAME = 7
 QUERY_QUIT = 0
 REPLY_NONE = 0
 REPLY_LOG = 1
 REPLY_ERROR = 2
 REPLY_SCREEN = 3
 REPLY_ALIVE = 4
+REPLY_SCREEN_DIFF = 5
+REPLY_FRAME = 6
+
+# struct ReplyFrame, preceded by the mode byte
+FRAME_HEADER = struct.Struct("<BBI")
+# struct ReplyScreenDiff
+SCREEN_DIFF_HEADER = struct.Struct("<HHHHBIII")
+# struct ReplyScreenRun
+SCREEN_RUN = struct.Struct("<II")
+
+# struct QueryKey
+QUERY_KEY = struct.Struct("<HHB")
+# keys per QUERY_WRITE_KEYS, keeps a hex query line below the 32767 chars
+# winconsole reads at once
+KEYS_PER_QUERY = 2048
+M_CTRL = 0x01
+M_SHIFT = 0x02
+M_ALT = 0x04
+
+# (charCode, keyCode, modifiers) of struct QueryKey
+Key = Tuple[int, int, int]
+
+VK_ESCAPE = 0x1B
+# escape sequence final / msvcrt extended code -> virtual-key code
+CSI_KEYS = {
+    "A": 0x26,  # VK_UP
+    "B": 0x28,  # VK_DOWN
+    "C": 0x27,  # VK_RIGHT
+    "D": 0x25,  # VK_LEFT
+    "H": 0x24,  # VK_HOME
+    "F": 0x23,  # VK_END
+    "P": 0x70,  # VK_F1
+    "Q": 0x71,
+    "R": 0x72,
+    "S": 0x73,
+}
+CSI_TILDE_KEYS = {
+    1: 0x24,  # VK_HOME
+    2: 0x2D,  # VK_INSERT
+    3: 0x2E,  # VK_DELETE
+    4: 0x23,  # VK_END
+    5: 0x21,  # VK_PRIOR
+    6: 0x22,  # VK_NEXT
+    7: 0x24,
+    8: 0x23,
+    15: 0x74,  # VK_F5
+    17: 0x75,
+    18: 0x76,
+    19: 0x77,
+    20: 0x78,
+    21: 0x79,
+    23: 0x7A,
+    24: 0x7B,  # VK_F12
+}
+MSVCRT_KEYS = {
+    "H": 0x26,
+    "P": 0x28,
+    "M": 0x27,
+    "K": 0x25,
+    "G": 0x24,
+    "O": 0x23,
+    "I": 0x21,
+    "Q": 0x22,
+    "R": 0x2D,
+    "S": 0x2E,
+    **{chr(0x3B + i): 0x70 + i for i in range(10)},  # F1 - F10
+    "\x85": 0x7A,
+    "\x86": 0x7B,
+}
+
+
+def xterm_modifiers(param: str) -> int:
+    """
+    Modifier parameter of xterm keys (1 + shift/alt/ctrl bits) to M_* flags
+    """
+    try:
+        bits = int(param) - 1
+    except ValueError:
+        return 0
+    return (
+        (M_SHIFT if bits & 1 else 0)
+        | (M_ALT if bits & 2 else 0)
+        | (M_CTRL if bits & 4 else 0)
+    )
+
+
+def encode_keys(text: str) -> List[Key]:
+    """
+    Translate one getch token (a character or an escape sequence) into keys
+    """
+    if text == "":
+        return []
+    if text == "\x08":
+        return [(0x7F, 0, 0)]
+    if text == "\x1b":
+        return [(0x1B, VK_ESCAPE, 0)]
+    if len(text) == 2 and text[0] in "\x00\xe0" and text[1] in MSVCRT_KEYS:
+        return [(0, MSVCRT_KEYS[text[1]], 0)]
+    if text[0] != "\x1b":
+        keys = []
+        for ch in text:
+            code = ord(ch)
+            if code > 0xFFFF:
+                # UTF-16 surrogate pair
+                code -= 0x10000
+                keys.append((0xD800 + (code >> 10), 0, 0))
+                keys.append((0xDC00 + (code & 0x3FF), 0, 0))
+            else:
+                keys.append((code, 0, 0))
+        return keys
+    if len(text) == 2:
+        # alt + character
+        return [(ord(text[1]), 0, M_ALT)]
+    if text[1] in "[O":
+        params = text[2:-1].split(";")
+        final = text[-1]
+        modifiers = xterm_modifiers(params[1]) if len(params) > 1 else 0
+        if final in CSI_KEYS:
+            return [(0, CSI_KEYS[final], modifiers)]
+        if final == "~" and params[0].isdigit() and int(params[0]) in CSI_TILDE_KEYS:
+            return [(0, CSI_TILDE_KEYS[int(params[0])], modifiers)]
+    log.debug(f"Unknown key sequence: {text!r}")
+    return []
+
+
+WINCONSOLE = "winconsole\\winconsole.exe"
+
+# binary mode (-B) framing, see struct OutputFrame
+QUERY_LENGTH = struct.Struct("<I")
+OUTPUT_FRAME = struct.Struct("<cI")
+FRAME_DATA = b"D"
+FRAME_LOG = b"L"
+FRAME_ERROR = b"X"
 
 
 class RunWinConsole(RunBase):
@@ -63,10 +227,20 @@ class RunWinConsole(RunBase):
         env: Optional[Dict[str, str]] = None,
         lines: int = 24,
         columns: int = 80,
+        binary: bool = False,
+        screen_diff: bool = True,
+        server: Sequence[str] = (WINCONSOLE,),
     ) -> None:
+        """
+        binary: talk to winconsole with length-prefixed binary frames (-B)
+        instead of hex text lines
+        screen_diff: read the screen with QUERY_SCREEN_DIFF, which only sends
+        the cells changed since the last frame
+        server: command line of winconsole itself
+        """
         cmdline = paramvine(cmd, *args)
         cmdargs = [
-            "winconsole\\winconsole.exe",
+            *server,
             "-L",
             str(lines),
             "-C",
@@ -74,27 +248,47 @@ class RunWinConsole(RunBase):
             "-c",
             cmdline,
         ]
+        if binary:
+            cmdargs.append("-B")
         log.debug(f"cmdargs: {cmdargs!r}")
+        self.binary = binary
+        self.screen_diff = screen_diff
+        self.screen_seq = 0  # seq of the last QUERY_SCREEN_DIFF frame, 0 = none
+        self.exit_code: Optional[int] = None  # set once read_frame sees the exit
         self.process = subprocess.Popen(
             cmdargs,
             cwd=cwd,
             env=env,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
-            text=True,
+            text=not binary,
         )
+        self.reply_buffer = bytearray(4096)
         self.screen = Screen(lines, columns)
         self.read_reply()
 
-    def query(self, querybuf: bytes) -> bytes:
+    def query(self, querybuf: bytes) -> memoryview:
+        self.send_query(querybuf)
+        return self.read_reply()
+
+    def send_query(self, querybuf: bytes, flush: bool = True) -> None:
         assert self.process.stdin is not None
-        assert self.process.stdout is not None
         log.debug(f"query: {querybuf.hex()}")
-        self.process.stdin.write(querybuf.hex() + "\n")
-        self.process.stdin.flush()
-        return self.read_reply()
+        if self.binary:
+            self.process.stdin.write(QUERY_LENGTH.pack(len(querybuf)) + querybuf)
+        else:
+            self.process.stdin.write(querybuf.hex() + "\n")
+        if flush:
+            self.process.stdin.flush()
 
-    def read_reply(self) -> bytes:
+    def read_reply(self) -> memoryview:
+        """
+        Read the next data reply, handling logs and errors on the way.
+        In binary mode the reply is a view of a reused buffer,
+        only valid until the next query.
+        """
+        if self.binary:
+            return self.read_reply_binary()
         assert self.process.stdin is not None
         assert self.process.stdout is not None
         while True:
@@ -108,14 +302,62 @@ class RunWinConsole(RunBase):
             elif reply.startswith("X "):
                 raise RuntimeError(reply[2:])
             else:
-                return bytes.fromhex(reply)
+                return memoryview(bytes.fromhex(reply))
+
+    def read_reply_binary(self) -> memoryview:
+        while True:
+            kind, length = OUTPUT_FRAME.unpack(self.read_exact(OUTPUT_FRAME.size))
+            payload = self.read_exact(length)
+            log.debug(f"reply: {kind!r} {length} bytes")
+            if kind == FRAME_DATA:
+                return payload
+            text = bytes(payload).decode(
+                locale.getpreferredencoding(False), errors="replace"
+            )
+            if kind == FRAME_LOG:
+                log.info(text)
+            elif kind == FRAME_ERROR:
+                raise RuntimeError(text)
+            else:
+                raise RuntimeError(f"Unknown frame {kind!r}")
+
+    def read_exact(self, size: int) -> memoryview:
+        assert self.process.stdout is not None
+        if len(self.reply_buffer) < size:
+            self.reply_buffer = bytearray(max(size, len(self.reply_buffer) * 2))
+        view = memoryview(self.reply_buffer)[:size]
+        received = 0
+        while received < size:
+            count = self.process.stdout.readinto(view[received:])
+            if not count:
+                raise EOFError("winconsole closed")
+            received += count
+        return view
 
     def alive(self) -> bool:
         reply = self.query(bytes((QUERY_ALIVE,)))
         assert len(reply) == 2 and reply[0] == REPLY_ALIVE
         return reply[1] != 0
 
+    def read_frame(self) -> bool:
+        """
+        Screen and liveness in one QUERY_FRAME round trip
+        """
+        base_seq = self.screen_seq if self.screen_diff else 0
+        reply = self.query(struct.pack("<BI", QUERY_FRAME, base_seq))
+        mode, alive, exit_code = FRAME_HEADER.unpack_from(reply)
+        assert mode == REPLY_FRAME
+        self.apply_screen_diff(reply, FRAME_HEADER.size)
+        if not alive:
+            self.exit_code = exit_code
+        return alive != 0
+
     def read_screen(self) -> None:
+        if self.screen_diff:
+            reply = self.query(struct.pack("<BI", QUERY_SCREEN_DIFF, self.screen_seq))
+            assert reply[0] == REPLY_SCREEN_DIFF
+            self.apply_screen_diff(reply, 1)
+            return
         reply = self.query(bytes((QUERY_SCREEN,)))
         # struct ReplyScreen
         # {
@@ -138,36 +380,78 @@ class RunWinConsole(RunBase):
         _, lines, columns, x, y, visibility = struct.unpack(
             format_str, reply[:header_length]
         )
-        self.screen.lines = lines
-        self.screen.columns = columns
+        self.screen.resize(lines, columns)
         self.screen.cursor = Cursor(x, y, visibility)
         log.debug(f"size: {lines}x{columns}")
-        char_format_str = "<HB"
-        char_length = struct.calcsize(char_format_str)
-        char_offset = header_length
-        buffer: List[List[Char]] = []
-        for y in range(lines):
-            bufferline: List[Char] = []
-            for x in range(columns):
-                charbytes = reply[char_offset : char_offset + char_length]
-                charcode, color = struct.unpack(char_format_str, charbytes)
-                ch = chr(charcode) if charcode != 0 else ""
-                fg = Color(color % 16)
-                bg = Color(color // 16)
-                char = Char(ch, fg, bg)
-                bufferline.append(char)
-                char_offset += char_length
-            buffer.append(bufferline)
-        self.screen.buffer = buffer
+        self.screen.set_cells(0, decode_cells(reply[header_length:]))
+
+    def apply_screen_diff(self, reply: memoryview, offset: int) -> None:
+        """
+        Patch self.screen in place with the struct ReplyScreenDiff at offset
+        """
+        # struct ReplyScreenDiff
+        # {
+        #     uint16_t lines;
+        #     uint16_t columns;
+        #     struct ReplyScreenCursor cursor;
+        #     uint32_t seq;
+        #     uint32_t baseSeq; // 0 = full frame
+        #     uint32_t runs;
+        #     // runs * {struct ReplyScreenRun; struct ReplyScreenChar chars[length];}
+        # };
+        lines, columns, x, y, visibility, seq, base_seq, runs = (
+            SCREEN_DIFF_HEADER.unpack_from(reply, offset)
+        )
+        if base_seq == 0:
+            self.screen.resize(lines, columns)
+        elif base_seq != self.screen_seq:
+            raise RuntimeError(
+                f"Screen diff of frame {base_seq}, have {self.screen_seq}"
+            )
+        self.screen.cursor = Cursor(x, y, visibility)
+        size = len(self.screen.cells)
+        pos = offset + SCREEN_DIFF_HEADER.size
+        for _ in range(runs):
+            start, length = SCREEN_RUN.unpack_from(reply, pos)
+            pos += SCREEN_RUN.size
+            if start + length > size:
+                raise RuntimeError(f"Screen diff run out of range: {start}+{length}")
+            chars_length = length * 3
+            self.screen.set_cells(start, decode_cells(reply[pos : pos + chars_length]))
+            pos += chars_length
+        self.screen_seq = seq
 
     def write(self, text: str) -> None:
-        if text[0] == "\x1b" and len(text) > 1:
+        self.write_many((text,))
+
+    def write_many(self, texts: Iterable[str]) -> None:
+        """
+        Inject all keys with QUERY_WRITE_KEYS, sending every query before
+        reading the replies. Every reply is read even if one is an error,
+        so the protocol stays in sync, then the first error is raised.
+        """
+        keys = [key for text in texts for key in encode_keys(text)]
+        queries = 0
+        for start in range(0, len(keys), KEYS_PER_QUERY):
+            chunk = keys[start : start + KEYS_PER_QUERY]
+            querybuf = struct.pack("<BH", QUERY_WRITE_KEYS, len(chunk)) + b"".join(
+                QUERY_KEY.pack(*key) for key in chunk
+            )
+            self.send_query(querybuf, flush=False)
+            queries += 1
+        if queries == 0:
             return
-        if text == "\x08":
-            keycode = 0x7F
-        else:
-            keycode = ord(text[0])
-        self.query(struct.pack("<BHB", QUERY_WRITE, keycode, 0))
+        assert self.process.stdin is not None
+        self.process.stdin.flush()
+        error: Optional[RuntimeError] = None
+        for _ in range(queries):
+            try:
+                self.read_reply()
+            except RuntimeError as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
 
     def kill(self) -> None:
         self.query(bytes((QUERY_KILL,)))
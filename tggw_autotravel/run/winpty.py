@@ -1,20 +1,20 @@
 import winpty
-import pyte
 from threading import Thread
-from queue import Queue, Empty
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable
 import logging
-import time
 
 from .base import RunBase
-from ..screen import Screen, Char, Cursor, Color, color16
+from .doublebuffer import DoubleBuffer
 
 log = logging.getLogger(__name__)
 
-CYCLE_TIME = 0.01
-
 
 class RunWinPTY(RunBase):
+    """
+    Run the program on winpty. The reader thread parses the output into a
+    DoubleBuffer as it arrives, read_screen() only swaps in the result.
+    """
+
     def __init__(
         self,
         cmd: str,
@@ -23,61 +23,49 @@ class RunWinPTY(RunBase):
         env: Optional[Dict[str, str]] = None,
         lines: int = 24,
         columns: int = 80,
+        parser: str = "vt",
     ) -> None:
         self.program = winpty.PtyProcess.spawn(
             [cmd, *args], cwd=cwd, env=env, dimensions=(lines, columns)
         )
-        self.screen = Screen(lines, columns)
-        self.pyte_screen = pyte.Screen(columns, lines)
-        self.pyte_stream = pyte.Stream(self.pyte_screen)
-        self.program_output_queue: Queue[str] = Queue()
+        self.buffers = DoubleBuffer(lines, columns, parser)
+        self.screen = self.buffers.front
         self.stopped = False
         self.program_read_thread = Thread(target=self._read_program_output, daemon=True)
         self.program_read_thread.start()
 
     def _read_program_output(self) -> None:
-        while not self.stopped:
-            try:
-                output = self.program.read()
+        # PtyProcess.read() blocks until there is output, "" only means a
+        # partial UTF-8 sequence or an ignored marker, so no sleep is needed.
+        # Everything read while the main thread is busy ends up in one frame.
+        try:
+            while not self.stopped:
+                try:
+                    output = self.program.read()
+                except (EOFError, ConnectionAbortedError) as e:
+                    log.debug(f"Error: {e!r}")
+                    break
                 if output != "":
                     log.debug(f"Read from program: {output!r}")
-                    self.program_output_queue.put(output)
-                else:
-                    time.sleep(CYCLE_TIME)
-            except (EOFError, ConnectionAbortedError) as e:
-                log.debug(f"Error: {e!r}")
-                break
+                    self.buffers.feed(output)
+                    if self.wakeup is not None:
+                        self.wakeup.set()
+        finally:
+            # wake the main loop so it notices the exit
+            if self.wakeup is not None:
+                self.wakeup.set()
+
+    def deadline(self) -> Optional[float]:
+        """
+        The reader thread sets the wakeup, no polling needed
+        """
+        return None
 
     def alive(self) -> bool:
         return not self.stopped and self.program.isalive()
 
-    def read(self) -> str:
-        try:
-            return self.program_output_queue.get_nowait()
-        except Empty:
-            return ""
-
     def read_screen(self) -> None:
-        while True:
-            output = self.read()
-            if output == "":
-                break
-            self.pyte_stream.feed(output)
-        # apply changes to self.screen
-        for y in self.pyte_screen.dirty:
-            for x in range(self.pyte_screen.columns):
-                char = self.pyte_screen.buffer[y][x]
-                self.screen.buffer[y][x] = Char(
-                    char.data,
-                    color16(char.fg, default=Color.WHITE),
-                    color16(char.bg, default=Color.BLACK),
-                )
-        self.pyte_screen.dirty.clear()
-        self.screen.cursor = Cursor(
-            self.pyte_screen.cursor.x,
-            self.pyte_screen.cursor.y,
-            0 if self.pyte_screen.cursor.hidden else 1,
-        )
+        self.buffers.swap()
 
     def write(self, data: str) -> None:
         try:
@@ -85,6 +73,9 @@ class RunWinPTY(RunBase):
         except EOFError:
             pass
 
+    def write_many(self, texts: Iterable[str]) -> None:
+        self.write("".join(texts))
+
     def close(self) -> None:
         self.program.close(force=True)
         self.stopped = True
@@ -1,7 +1,11 @@
+from array import array
 from enum import IntEnum
 from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple, Union
 import json
 import logging
+import struct
+import sys
 
 log = logging.getLogger(__name__)
 
@@ -62,13 +66,22 @@ color_table = {
 }
 
 
+# color_table 加上 "default"，每种默认色一张，color16 只需查一次表
+color_tables: Dict[Color, Dict[str, Color]] = {
+    default: {**color_table, "default": default} for default in Color
+}
+
+
 def color16(color: str, *, default: Color = Color.WHITE) -> Color:
-    if color == "default":
-        return default
-    if color not in color_table:
+    table = color_tables[default]
+    result = table.get(color)
+    if result is None:
         log.warning(f"Unknown color: {color}")
         color_table[color] = default
-    return color_table[color]
+        for other in color_tables.values():
+            other.setdefault(color, default)
+        result = default
+    return result
 
 
 @dataclass(slots=True, frozen=True)
@@ -78,15 +91,191 @@ class Char:
     bg: Color
 
 
+# 每个格子打包成一个 uint32：
+# bit 0-20 码位（0 表示空字符），bit 21-24 前景色，bit 25-28 背景色。
+# 颜色部分与 Windows 控制台的属性字节相同（低 4 位前景，高 4 位背景），
+# 所以 winconsole 的 color 字节左移 CHAR_BITS 即可得到对应的位。
+CHAR_BITS = 21
+CHAR_MASK = (1 << CHAR_BITS) - 1
+FG_SHIFT = CHAR_BITS
+BG_SHIFT = CHAR_BITS + 4
+
+
+def pack_char(char: str, fg: Color, bg: Color) -> int:
+    """
+    把一个格子打包成 uint32。多码位的字符只保留第一个码位。
+    """
+    code = ord(char[0]) if char != "" else 0
+    return code | fg << FG_SHIFT | bg << BG_SHIFT
+
+
+# 游戏用到的字符与颜色组合很少，相同的格子共用同一个 Char / uint32。
+# 缓存满了就清空，防止被乱码撑大。
+CACHE_LIMIT = 65536
+char_cache: Dict[int, Char] = {}
+cell_cache: Dict[Tuple[str, str, str], int] = {}
+
+
+def unpack_char(cell: int) -> Char:
+    """
+    把 uint32 格子还原成 Char。相同的格子返回同一个对象。
+    """
+    char = char_cache.get(cell)
+    if char is None:
+        if len(char_cache) >= CACHE_LIMIT:
+            char_cache.clear()
+        code = cell & CHAR_MASK
+        char = Char(
+            chr(code) if code != 0 else "",
+            Color(cell >> FG_SHIFT & 0xF),
+            Color(cell >> BG_SHIFT & 0xF),
+        )
+        char_cache[cell] = char
+    return char
+
+
+def pack_color16(char: str, fg: str, bg: str) -> int:
+    """
+    把 pyte 的字符和颜色名打包成 uint32，默认前景白色、背景黑色。
+    """
+    key = (char, fg, bg)
+    cell = cell_cache.get(key)
+    if cell is None:
+        if len(cell_cache) >= CACHE_LIMIT:
+            cell_cache.clear()
+        cell = pack_char(
+            char,
+            color16(fg, default=Color.WHITE),
+            color16(bg, default=Color.BLACK),
+        )
+        cell_cache[key] = cell
+    return cell
+
+
+BLANK_CELL = pack_char(" ", Color.WHITE, Color.BLACK)
+
+# to_bytes 的格式：头部之后是 lines * columns 个小端 uint32 格子
+# magic, version, lines, columns, cursor x, cursor y, cursor visibility, generation
+SCREEN_HEADER = struct.Struct("<4sHHHHHBxQ")
+SCREEN_MAGIC = b"TGSC"
+SCREEN_VERSION = 1
+
+
+class ScreenLine:
+    """
+    Screen 中一行的视图，读写 buffer[y][x] 时直接访问打包的数组。
+    """
+
+    __slots__ = ("screen", "y")
+
+    def __init__(self, screen: "Screen", y: int) -> None:
+        self.screen = screen
+        self.y = y
+
+    def __len__(self) -> int:
+        return self.screen.columns
+
+    def __getitem__(self, x: int) -> Char:
+        if not 0 <= x < self.screen.columns:
+            raise IndexError("column index out of range")
+        return unpack_char(self.screen.cells[self.y * self.screen.columns + x])
+
+    def __setitem__(self, x: int, char: Char) -> None:
+        if not 0 <= x < self.screen.columns:
+            raise IndexError("column index out of range")
+        self.screen.cells[self.y * self.screen.columns + x] = pack_char(
+            char.char, char.fg, char.bg
+        )
+        self.screen.mark_dirty(self.y)
+
+    def __iter__(self) -> Iterator[Char]:
+        start = self.y * self.screen.columns
+        for cell in self.screen.cells[start : start + self.screen.columns]:
+            yield unpack_char(cell)
+
+
 class Screen:
     def __init__(self, lines: int, columns: int) -> None:
         self.lines = lines
         self.columns = columns
-        self.buffer = [
-            [Char(" ", Color.WHITE, Color.BLACK) for _ in range(columns)]
-            for _ in range(lines)
-        ]
+        self.cells = array("I", [BLANK_CELL]) * (lines * columns)
+        self.buffer: List[ScreenLine] = [ScreenLine(self, y) for y in range(lines)]
         self.cursor = Cursor(0, 0, 0)
+        # 每次修改时 generation 加一，row_generation[y] 记录第 y 行最后一次修改
+        self.generation = 0
+        self.row_generation = array("Q", [0]) * lines
+
+    def mark_dirty(self, y: int) -> None:
+        """
+        标记第 y 行已修改。直接写 cells 的代码需要调用它。
+        """
+        self.generation += 1
+        self.row_generation[y] = self.generation
+
+    def mark_all_dirty(self) -> None:
+        self.generation += 1
+        self.row_generation = array("Q", [self.generation]) * self.lines
+
+    def rows_changed_since(self, generation: int) -> List[int]:
+        """
+        返回 generation 之后修改过的行。
+        """
+        return [y for y, gen in enumerate(self.row_generation) if gen > generation]
+
+    def set_cells(self, offset: int, cells: "array[int]") -> None:
+        """
+        从 offset 开始写入一段格子，只把内容有变化的行标记为已修改。
+        """
+        if not cells:
+            return
+        if not isinstance(cells, array):
+            # e.g. a memoryview of shared memory
+            cells = array("I", cells)
+        end = offset + len(cells)
+        columns = self.columns
+        for y in range(offset // columns, (end - 1) // columns + 1):
+            start = max(offset, y * columns)
+            stop = min(end, (y + 1) * columns)
+            row = cells[start - offset : stop - offset]
+            if self.cells[start:stop] != row:
+                self.cells[start:stop] = row
+                self.mark_dirty(y)
+
+    def resize(self, lines: int, columns: int) -> None:
+        """
+        改变屏幕大小，内容清空。大小不变时什么都不做。
+        """
+        if lines == self.lines and columns == self.columns:
+            return
+        self.lines = lines
+        self.columns = columns
+        self.cells = array("I", [BLANK_CELL]) * (lines * columns)
+        self.buffer = [ScreenLine(self, y) for y in range(lines)]
+        self.mark_all_dirty()
+
+    def copy(self) -> "Screen":
+        """
+        复制整个屏幕（一次数组复制）。
+        """
+        screen = Screen.__new__(Screen)
+        screen.lines = self.lines
+        screen.columns = self.columns
+        screen.cells = array("I", self.cells)
+        screen.buffer = [ScreenLine(screen, y) for y in range(self.lines)]
+        screen.cursor = self.cursor
+        screen.generation = self.generation
+        screen.row_generation = array("Q", self.row_generation)
+        return screen
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Screen):
+            return NotImplemented
+        return (
+            self.lines == other.lines
+            and self.columns == other.columns
+            and self.cursor == other.cursor
+            and self.cells == other.cells
+        )
 
     def to_json(self) -> str:
         """
@@ -112,6 +301,83 @@ class Screen:
         }
         return json.dumps(screen_dict, ensure_ascii=False, separators=(",", ":"))
 
+    def nbytes(self) -> int:
+        """
+        to_bytes() 的长度。
+        """
+        return SCREEN_HEADER.size + len(self.cells) * 4
+
+    def pack_into(self, buffer: Union[bytearray, memoryview], offset: int = 0) -> int:
+        """
+        把 to_bytes() 的内容直接写入可写缓冲区（如 mmap、共享内存），
+        返回写入结束的位置。
+        """
+        SCREEN_HEADER.pack_into(
+            buffer,
+            offset,
+            SCREEN_MAGIC,
+            SCREEN_VERSION,
+            self.lines,
+            self.columns,
+            self.cursor.x,
+            self.cursor.y,
+            self.cursor.visibility,
+            self.generation,
+        )
+        start = offset + SCREEN_HEADER.size
+        end = start + len(self.cells) * 4
+        cells = self.cells
+        if sys.byteorder == "big":
+            cells = array("I", cells)
+            cells.byteswap()
+        with memoryview(buffer) as view:
+            view[start:end] = memoryview(cells).cast("B")
+        return end
+
+    def to_bytes(self) -> bytes:
+        """
+        将 Screen 转换为紧凑的二进制格式：固定头部加格子数组。
+        """
+        buffer = bytearray(self.nbytes())
+        self.pack_into(buffer)
+        return bytes(buffer)
+
+    @classmethod
+    def from_bytes(
+        cls, data: Union[bytes, bytearray, memoryview], copy: bool = True
+    ) -> "Screen":
+        """
+        从 to_bytes() 的结果恢复 Screen。
+        copy=False 时 cells 是指向 data 的 memoryview（零复制），
+        data 可写时修改屏幕会直接修改 data。
+        """
+        magic, version, lines, columns, x, y, visibility, generation = (
+            SCREEN_HEADER.unpack_from(data)
+        )
+        if magic != SCREEN_MAGIC or version != SCREEN_VERSION:
+            raise ValueError(f"Not a screen: {magic!r} version {version}")
+        start = SCREEN_HEADER.size
+        end = start + lines * columns * 4
+        view = memoryview(data)[start:end]
+        if len(view) != end - start:
+            raise ValueError(f"Screen data truncated: {len(view)} < {end - start}")
+        screen = cls.__new__(cls)
+        screen.lines = lines
+        screen.columns = columns
+        if copy or sys.byteorder == "big":
+            cells = array("I")
+            cells.frombytes(view)
+            if sys.byteorder == "big":
+                cells.byteswap()
+            screen.cells = cells
+        else:
+            screen.cells = view.cast("I")  # type: ignore[assignment]
+        screen.buffer = [ScreenLine(screen, y) for y in range(lines)]
+        screen.cursor = Cursor(x, y, visibility)
+        screen.generation = generation
+        screen.row_generation = array("Q", [generation]) * lines
+        return screen
+
     @classmethod
     def from_json(cls, json_str: str) -> "Screen":
         """
@@ -125,12 +391,10 @@ class Screen:
         for y in range(lines):
             for x in range(columns):
                 char_data = buffer_data[y][x]
-                char = Char(
-                    char=char_data["char"],
-                    fg=Color(char_data["fg"]),
-                    bg=Color(char_data["bg"]),
+                screen.cells[y * columns + x] = pack_char(
+                    char_data["char"], Color(char_data["fg"]), Color(char_data["bg"])
                 )
-                screen.buffer[y][x] = char
+        screen.mark_all_dirty()
         cursor_data = screen_dict["cursor"]
         screen.cursor = Cursor(
             x=cursor_data["x"], y=cursor_data["y"], visibility=cursor_data["visibility"]
@@ -1,8 +1,21 @@
-from .base import TUIBase, tui_context
-from .colorama import TUIColorama
+from typing import Any
+
+from .base import TUIBase, RenderStats, tui_context
+from .null import TUINull
 
 __all__ = [
     "TUIBase",
+    "RenderStats",
     "tui_context",
+    "TUINull",
     "TUIColorama",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # colorama and pytermgui are only needed for the console TUI
+    if name == "TUIColorama":
+        from .colorama import TUIColorama
+
+        return TUIColorama
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
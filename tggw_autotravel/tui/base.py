@@ -1,12 +1,25 @@
 from abc import abstractmethod
 from contextlib import contextmanager
+from dataclasses import dataclass
 from typing import Generator
 
 from ..screen import Screen
 
 
+@dataclass(slots=True, frozen=True)
+class RenderStats:
+    """
+    What the last refresh() did
+    """
+
+    cells: int = 0  # cells redrawn
+    output_bytes: int = 0  # bytes written to the terminal
+    seconds: float = 0.0  # time spent in refresh()
+
+
 class TUIBase:
     screen: Screen
+    stats: RenderStats
 
     @abstractmethod
     def __init__(self) -> None: ...
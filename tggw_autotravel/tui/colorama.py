@@ -1,10 +1,13 @@
-from typing import Optional
+from typing import List, Optional
 import colorama
 import pytermgui
 import os
+import sys
+import time
+import unicodedata
 
-from .base import TUIBase
-from ..screen import Screen, Color
+from .base import TUIBase, RenderStats
+from ..screen import Screen, Color, unpack_char
 
 colorfg = {
     Color.BLACK: colorama.Fore.BLACK,
@@ -50,16 +53,26 @@ class TUIColorama(TUIBase):
         self.columns = columns
         self.screen = Screen(lines, columns)
         self.drawn_screen: Optional[Screen] = None
-        self.scr_size = os.get_terminal_size()
+        # screen and screen.generation at the last refresh, rows not changed
+        # since then are skipped
+        self.drawn_source: Optional[Screen] = None
+        self.drawn_generation = 0
+        self.stats = RenderStats()
+        self.scr_size = self.terminal_size()
         self.alt_buffer_context = pytermgui.context_managers.alt_buffer()
         colorama.init()
         self.alt_buffer_context.__enter__()
 
+    def terminal_size(self) -> os.terminal_size:
+        return os.get_terminal_size()
+
     def refresh(self) -> None:
         """
         refresh screen -> drawn_screen and output with colorama
+        The whole frame is built in one string and written at once.
         """
-        new_size = os.get_terminal_size()
+        start_time = time.perf_counter()
+        new_size = self.terminal_size()
         if new_size != self.scr_size:
             # reset drawnscreen
             self.drawn_screen = None
@@ -68,23 +81,73 @@ class TUIColorama(TUIBase):
         if self.drawn_screen is None:
             force_draw = True
             self.drawn_screen = Screen(self.lines, self.columns)
-        for y in range(min(self.screen.lines, self.drawn_screen.lines)):
-            for x in range(min(self.screen.columns, self.drawn_screen.columns)):
-                char = self.screen.buffer[y][x]
-                if force_draw or self.drawn_screen.buffer[y][x] != char:
-                    self.drawn_screen.buffer[y][x] = char
-                    print(colorama.Cursor.POS(x + 1, y + 1), end="")
-                    print(colorfg[char.fg] + colorbg[char.bg] + char.char, end="")
-        print(colorama.Fore.RESET + colorama.Back.RESET, end="")
-        print(
-            colorama.Cursor.POS(
-                self.drawn_screen.cursor.x + 1, self.drawn_screen.cursor.y + 1
-            ),
-            end="",
-            flush=True,
-        )
+        screen = self.screen
+        drawn_screen = self.drawn_screen
+        if force_draw or screen is not self.drawn_source:
+            rows = range(screen.lines)
+            self.drawn_source = screen
+        else:
+            rows = screen.rows_changed_since(self.drawn_generation)
+        columns = min(screen.columns, drawn_screen.columns)
+        output: List[str] = []
+        cells = 0
+        # where the terminal cursor and colors are after the last output
+        cursor_x = cursor_y = -1
+        fg: Optional[Color] = None
+        bg: Optional[Color] = None
+        for y in rows:
+            if y >= drawn_screen.lines:
+                break
+            row_start = y * screen.columns
+            drawn_start = y * drawn_screen.columns
+            if (
+                not force_draw
+                and screen.cells[row_start : row_start + columns]
+                == drawn_screen.cells[drawn_start : drawn_start + columns]
+            ):
+                continue
+            for x in range(columns):
+                cell = screen.cells[row_start + x]
+                drawn_index = drawn_start + x
+                if not force_draw and drawn_screen.cells[drawn_index] == cell:
+                    continue
+                drawn_screen.cells[drawn_index] = cell
+                cells += 1
+                char = unpack_char(cell)
+                if char.char == "":
+                    # covered by the wide character before it
+                    continue
+                if x != cursor_x or y != cursor_y:
+                    output.append(colorama.Cursor.POS(x + 1, y + 1))
+                if char.fg != fg:
+                    fg = char.fg
+                    output.append(colorfg[fg])
+                if char.bg != bg:
+                    bg = char.bg
+                    output.append(colorbg[bg])
+                output.append(char.char)
+                cursor_y = y
+                if char.char < "\x80" or unicodedata.east_asian_width(
+                    char.char
+                ) not in ("W", "F"):
+                    cursor_x = x + 1
+                else:
+                    cursor_x = -1
+        self.drawn_generation = screen.generation
+        if cells == 0 and drawn_screen.cursor == screen.cursor:
+            self.stats = RenderStats(0, 0, time.perf_counter() - start_time)
+            return
+        if fg is not None:
+            output.append(colorama.Fore.RESET + colorama.Back.RESET)
+        output.append(colorama.Cursor.POS(screen.cursor.x + 1, screen.cursor.y + 1))
         # Cursor visibility not available in colorama
-        self.drawn_screen.cursor = self.screen.cursor
+        drawn_screen.cursor = screen.cursor
+        text = "".join(output)
+        sys.stdout.write(text)
+        sys.stdout.flush()
+        self.stats = RenderStats(
+            cells, len(text.encode("utf-8")), time.perf_counter() - start_time
+        )
 
     def close(self) -> None:
         self.alt_buffer_context.__exit__(None, None, None)
@@ -0,0 +1,18 @@
+from .base import TUIBase, RenderStats
+from ..screen import Screen
+
+
+class TUINull(TUIBase):
+    """
+    Draw nothing, for headless runs
+    """
+
+    def __init__(self, lines: int = 24, columns: int = 80) -> None:
+        self.screen = Screen(lines, columns)
+        self.stats = RenderStats()
+
+    def refresh(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
@@ -1,4 +1,7 @@
+#include <fcntl.h>
+#include <io.h>
 #include <stdalign.h>
+#include <stdarg.h>
 #include <stdint.h>
 #include <stdio.h>
 #include <stdlib.h>
@@ -8,6 +11,7 @@
 
 #define MSG_SIZE (128 * 1024)
 char *default_cmdline = "cmd.exe";
+int binary_mode = 0;
 
 char *make_pipe_name()
 {
@@ -36,6 +40,9 @@ void free_pipe_name(char *pipe_name)
 #define QUERY_WRITE 2
 #define QUERY_ALIVE 3
 #define QUERY_KILL 4
+#define QUERY_SCREEN_DIFF 5
+#define QUERY_WRITE_KEYS 6
+#define QUERY_FRAME 7 // struct QueryScreenDiff
 #define QUERY_QUIT 0
 // uint8_t mode;
 
@@ -48,11 +55,31 @@ struct QueryWrite
     uint8_t modifiers; // ctrl shift alt
 };
 
+struct QueryKey
+{
+    uint16_t charCode;
+    uint16_t keyCode; // virtual-key code, 0 for plain characters
+    uint8_t modifiers;
+};
+
+struct QueryWriteKeys
+{
+    uint16_t count;
+    struct QueryKey keys[1]; // count
+};
+
+struct QueryScreenDiff
+{
+    uint32_t baseSeq; // seq of the last frame the client has, 0 = none
+};
+
 #define REPLY_NONE 0
 #define REPLY_LOG 1
 #define REPLY_ERROR 2
 #define REPLY_SCREEN 3
 #define REPLY_ALIVE 4
+#define REPLY_SCREEN_DIFF 5
+#define REPLY_FRAME 6
 
 struct ReplyScreen
 {
@@ -71,12 +98,49 @@ struct ReplyScreen
     } buffer[1]; // lines * columns
 };
 
+struct ReplyScreenDiff
+{
+    uint16_t lines;
+    uint16_t columns;
+    struct ReplyScreenCursor cursor;
+    uint32_t seq;     // sequence number of this frame
+    uint32_t baseSeq; // frame the runs apply to, 0 = full frame
+    uint32_t runs;
+    // runs * {struct ReplyScreenRun; struct ReplyScreenChar chars[length];}
+};
+
+struct ReplyScreenRun
+{
+    uint32_t offset; // y * columns + x
+    uint32_t length;
+};
+
+struct ReplyFrame
+{
+    uint8_t alive;
+    uint32_t exitCode; // valid when alive == 0
+    // struct ReplyScreenDiff
+};
+
 struct ReplyText // Log/Error
 {
     uint16_t length;
     char error[1];
 };
 
+// Binary mode (-B) framing on stdin/stdout
+// stdin:  uint32_t length; char query[length];
+// stdout: struct OutputFrame; char payload[length];
+#define FRAME_DATA 'D'
+#define FRAME_LOG 'L'
+#define FRAME_ERROR 'X'
+
+struct OutputFrame
+{
+    char kind; // FRAME_DATA, FRAME_LOG, FRAME_ERROR
+    uint32_t length;
+};
+
 #pragma pack(pop)
 
 void printHex(const char *buf, size_t size)
@@ -95,6 +159,124 @@ void printHex(const char *buf, size_t size)
     free(chdata);
 }
 
+void writeFrame(char kind, const char *buf, size_t size)
+{
+    struct OutputFrame frame = {kind, size};
+    fwrite(&frame, sizeof(frame), 1, stdout);
+    fwrite(buf, 1, size, stdout);
+}
+
+void outputText(char kind, const char *format, va_list args)
+{
+    char *text = (char *)malloc(MSG_SIZE);
+    int textlen = vsnprintf(text, MSG_SIZE, format, args);
+    if (textlen < 0)
+    {
+        textlen = 0;
+    }
+    else if (textlen >= MSG_SIZE)
+    {
+        textlen = MSG_SIZE - 1;
+    }
+    if (binary_mode)
+    {
+        writeFrame(kind, text, textlen);
+    }
+    else
+    {
+        printf("%c %.*s\n", kind, textlen, text);
+    }
+    fflush(stdout);
+    free(text);
+}
+
+void outputLog(const char *format, ...)
+{
+    va_list args;
+    va_start(args, format);
+    outputText(FRAME_LOG, format, args);
+    va_end(args);
+}
+
+void outputError(const char *format, ...)
+{
+    va_list args;
+    va_start(args, format);
+    outputText(FRAME_ERROR, format, args);
+    va_end(args);
+}
+
+void outputData(const char *buf, size_t size)
+{
+    if (binary_mode)
+    {
+        writeFrame(FRAME_DATA, buf, size);
+    }
+    else
+    {
+        printHex(buf, size);
+    }
+    fflush(stdout);
+}
+
+// Read one query from stdin, return the size or -1 at end of input
+int readQuery(char *inputbuf, char *querybuf)
+{
+    if (binary_mode)
+    {
+        uint32_t length;
+        if (fread(&length, sizeof(length), 1, stdin) != 1 || length > MSG_SIZE)
+        {
+            return -1;
+        }
+        if (fread(querybuf, 1, length, stdin) != length)
+        {
+            return -1;
+        }
+        return length;
+    }
+    if (scanf(" %32767[^\r\n]", inputbuf) != 1)
+    {
+        return -1;
+    }
+    int inputlen = strlen(inputbuf);
+    int querysize = 0;
+    int firstdight = -1;
+    for (int i = 0; i < inputlen; i++)
+    {
+        char ch = inputbuf[i];
+        int v = -1;
+        if (ch >= '0' && ch <= '9')
+        {
+            v = ch - '0';
+        }
+        else if (ch >= 'a' && ch <= 'f')
+        {
+            v = ch - 'a' + 10;
+        }
+        else if (ch >= 'A' && ch <= 'F')
+        {
+            v = ch - 'A' + 10;
+        }
+        else
+        {
+            continue;
+        }
+        if (firstdight == -1)
+        {
+            firstdight = v;
+        }
+        else
+        {
+            firstdight = firstdight * 16 + v;
+            querybuf[querysize] = firstdight;
+            querysize++;
+            firstdight = -1;
+        }
+    }
+    return querysize;
+}
+
 #define R_SUCCESS 0
 #define R_ERROR 1
 #define R_STOP 2
@@ -125,19 +307,19 @@ int readPipe(HANDLE hPipe, char *replybuf, size_t *replysize)
             DWORD lasterror = GetLastError();
             if (lasterror == ERROR_NO_DATA)
             {
-                printf("L ReadFile No data.\n");
+                outputLog("ReadFile No data.");
             }
             else if (lasterror == ERROR_BAD_PIPE)
             {
-                printf("X ReadFile Bad pipe.\n");
+                outputError("ReadFile Bad pipe.");
             }
             else if (lasterror == ERROR_BROKEN_PIPE)
             {
-                printf("X ReadFile Broken pipe.\n");
+                outputError("ReadFile Broken pipe.");
             }
             else
             {
-                printf("X ReadFile failed (%lu).\n", lasterror);
+                outputError("ReadFile failed (%lu).", lasterror);
             }
             ret = R_STOP;
             break;
@@ -150,22 +332,19 @@ int readPipe(HANDLE hPipe, char *replybuf, size_t *replysize)
             if (mode == REPLY_ERROR)
             {
                 const struct ReplyText *replytext = (struct ReplyText *)&replybuf[1];
-                printf("X %.*s\n", replytext->length, replytext->error);
-                fflush(stdout);
+                outputError("%.*s", replytext->length, replytext->error);
                 ret = R_ERROR;
                 break;
             }
             else if (mode == REPLY_LOG)
             {
                 const struct ReplyText *replytext = (struct ReplyText *)&replybuf[1];
-                printf("L %.*s\n", replytext->length, replytext->error);
-                fflush(stdout);
+                outputLog("%.*s", replytext->length, replytext->error);
                 // continue the loop to read real result
             }
             else
             {
-                printHex(replybuf, *replysize);
-                fflush(stdout);
+                outputData(replybuf, *replysize);
                 break;
             }
         }
@@ -193,7 +372,7 @@ int server(int arg_nostart, int arg_newconsole)
     HANDLE hPipe = CreateNamedPipeA(pipename, openmode, pipemode, 1, 65536, 65536, 0, NULL);
     if (hPipe == INVALID_HANDLE_VALUE)
     {
-        printf("X CreateNamedPipe failed (%lu).\n", GetLastError());
+        outputError("CreateNamedPipe failed (%lu).", GetLastError());
         free_pipe_name(pipename);
         return 1;
     }
@@ -201,7 +380,7 @@ int server(int arg_nostart, int arg_newconsole)
 
     if (arg_nostart == 1)
     {
-        printf("L %s\n", pipename);
+        outputLog("%s", pipename);
         hProcessWait = CreateEventA(NULL, TRUE, FALSE, NULL); // Dummy event
     }
     else
@@ -220,7 +399,7 @@ int server(int arg_nostart, int arg_newconsole)
         DWORD dwFlags = arg_newconsole == 1 ? CREATE_NEW_CONSOLE : CREATE_NO_WINDOW;
         if (!CreateProcessA(progname, cmdline, NULL, NULL, FALSE, dwFlags, NULL, NULL, &si, &pi))
         {
-            printf("X CreateProcess failed (%lu).\n", GetLastError());
+            outputError("CreateProcess failed (%lu).", GetLastError());
             free(cmdline);
             return 1;
         }
@@ -249,7 +428,7 @@ int server(int arg_nostart, int arg_newconsole)
             DWORD result2 = WaitForMultipleObjects(2, hWaits, FALSE, INFINITE);
             if (result2 == WAIT_OBJECT_0)
             {
-                printf("L Process terminated.\n");
+                outputLog("Process terminated.");
                 CancelIo(hPipe);
                 SetEvent(hPipeEvent);
                 goto end;
@@ -260,7 +439,7 @@ int server(int arg_nostart, int arg_newconsole)
             }
             else
             {
-                printf("X Internal Error.\n");
+                outputError("Internal Error.");
                 goto end;
             }
         }
@@ -271,23 +450,24 @@ int server(int arg_nostart, int arg_newconsole)
         DWORD lasterror = GetLastError();
         if (lasterror == ERROR_PIPE_CONNECTED)
         {
-            printf("L Pipe has been connected.\n");
+            outputLog("Pipe has been connected.");
             // no error
         }
         else
         {
-            printf("X ConnectNamedPipe failed (%lu).\n", lasterror);
+            outputError("ConnectNamedPipe failed (%lu).", lasterror);
             goto end;
         }
     }
     else
     {
-        printf("L Pipe has been connected.\n");
+        outputLog("Pipe has been connected.");
     }
 
     char *replybuf = (char *)malloc(MSG_SIZE);
     size_t replysize;
     char *inputbuf = (char *)malloc(MSG_SIZE);
+    char *querybuf = (char *)malloc(MSG_SIZE);
     int stopped = 0;
 
     // Read Run Reply
@@ -298,46 +478,11 @@ int server(int arg_nostart, int arg_newconsole)
     }
     while (stopped == 0)
     {
-        char *querybuf = NULL;
-        size_t querysize = 0;
-        DWORD inputlen = 0;
-        scanf(" %32767[^\r\n]", inputbuf);
-        inputlen = strlen(inputbuf);
-        querybuf = malloc(inputlen / 2);
-        querysize = 0;
-
-        int firstdight = -1;
-        for (int i = 0; i < inputlen; i++)
+        int querysize = readQuery(inputbuf, querybuf);
+        if (querysize < 0)
         {
-            char ch = inputbuf[i];
-            int v = -1;
-            if (ch >= '0' && ch <= '9')
-            {
-                v = ch - '0';
-            }
-            else if (ch >= 'a' && ch <= 'f')
-            {
-                v = ch - 'a' + 10;
-            }
-            else if (ch >= 'A' && ch <= 'F')
-            {
-                v = ch - 'A' + 10;
-            }
-            else
-            {
-                continue;
-            }
-            if (firstdight == -1)
-            {
-                firstdight = v;
-            }
-            else
-            {
-                firstdight = firstdight * 16 + v;
-                querybuf[querysize] = firstdight;
-                querysize++;
-                firstdight = -1;
-            }
+            outputLog("End of input.");
+            break;
         }
 
         // Special treat exit
@@ -361,23 +506,21 @@ int server(int arg_nostart, int arg_newconsole)
                 result = GetOverlappedResult(hPipe, &ol, &dwBytesTransferred, TRUE);
             }
         }
-        free(querybuf);
-        querybuf = NULL;
 
         if (!result)
         {
             DWORD lasterror = GetLastError();
             if (lasterror == ERROR_BAD_PIPE)
             {
-                printf("X WriteFile Bad pipe.\n");
+                outputError("WriteFile Bad pipe.");
                 break;
             }
             else if (lasterror == ERROR_BROKEN_PIPE)
             {
-                printf("X WriteFile Broken pipe.\n");
+                outputError("WriteFile Broken pipe.");
                 break;
             }
-            printf("X WriteFile failed (%lu).\n", lasterror);
+            outputError("WriteFile failed (%lu).", lasterror);
             break;
         }
 
@@ -389,6 +532,7 @@ int server(int arg_nostart, int arg_newconsole)
     }
 
     free(inputbuf);
+    free(querybuf);
     free(replybuf);
 end:
     CloseHandle(hPipeEvent);
@@ -400,7 +544,7 @@ end:
     {
         WaitForSingleObject(hProcessWait, INFINITE);
         GetExitCodeProcess(hProcessWait, &exitcode);
-        printf("L Client exitcode: %lu\n", exitcode);
+        outputLog("Client exitcode: %lu", exitcode);
     }
     CloseHandle(hProcessWait);
     return exitcode;
@@ -472,6 +616,208 @@ BOOL conResize(HANDLE hStdout, int arg_columns, int arg_lines, HANDLE hPipe)
     return TRUE;
 }
 
+// Read the visible console window, *cells is malloc'ed (columns * lines)
+BOOL readScreen(HANDLE hStdout, HANDLE hPipe, COORD *scr_size, struct ReplyScreenCursor *cursor,
+                struct ReplyScreenChar **cells)
+{
+    CONSOLE_SCREEN_BUFFER_INFO csbi;
+    if (!GetConsoleScreenBufferInfo(hStdout, &csbi))
+    {
+        replyLog(hPipe, "GetConsoleScreenBufferInfo failed (%lu).", GetLastError());
+        ZeroMemory(&csbi, sizeof(csbi));
+    }
+    COORD scr_begin = {0, 0};
+    CONSOLE_CURSOR_INFO cci;
+    if (!GetConsoleCursorInfo(hStdout, &cci))
+    {
+        replyLog(hPipe, "GetConsoleCursorInfo failed (%lu).", GetLastError());
+        ZeroMemory(&cci, sizeof(cci));
+    }
+    scr_size->X = csbi.srWindow.Right - csbi.srWindow.Left + 1;
+    scr_size->Y = csbi.srWindow.Bottom - csbi.srWindow.Top + 1;
+    cursor->x = csbi.dwCursorPosition.X - csbi.srWindow.Left;
+    cursor->y = csbi.dwCursorPosition.Y - csbi.srWindow.Top;
+    cursor->visibility = cci.bVisible ? 1 : 0;
+    CHAR_INFO *charinfo = (CHAR_INFO *)malloc(sizeof(CHAR_INFO) * scr_size->X * scr_size->Y);
+    if (!ReadConsoleOutputW(hStdout, charinfo, *scr_size, scr_begin, &csbi.srWindow))
+    {
+        replyError(hPipe, "ReadConsoleOutputW failed (%lu).", GetLastError());
+        free(charinfo);
+        return FALSE;
+    }
+    *cells = (struct ReplyScreenChar *)malloc(sizeof(struct ReplyScreenChar) * scr_size->X * scr_size->Y);
+    for (int y = 0; y < scr_size->Y; y++)
+    {
+        for (int x = 0; x < scr_size->X; x++)
+        {
+            CHAR_INFO *ci = &charinfo[y * scr_size->X + x];
+            struct ReplyScreenChar *rc = &(*cells)[y * scr_size->X + x];
+#ifndef COMMON_LVB_TRAILING_BYTE
+#define COMMON_LVB_TRAILING_BYTE 0x0200
+#endif
+            BOOL has_char = ((ci->Attributes & COMMON_LVB_TRAILING_BYTE) == 0);
+            rc->charCode = has_char ? ci->Char.UnicodeChar : 0;
+            rc->color = ci->Attributes & 0xff;
+        }
+    }
+    free(charinfo);
+    return TRUE;
+}
+
+// The last frame sent by QUERY_SCREEN_DIFF
+struct ScreenHistory
+{
+    uint32_t seq;
+    COORD size;
+    struct ReplyScreenChar *cells;
+};
+
+// Runs separated by up to RUN_MERGE_GAP unchanged cells are sent as one run,
+// as a run header costs more than a few cells
+#define RUN_MERGE_GAP 2
+
+// Find the next run of changed cells from *pos, return FALSE if there is none
+BOOL nextRun(const struct ReplyScreenChar *old, const struct ReplyScreenChar *new, int count, int *pos,
+             struct ReplyScreenRun *run)
+{
+    int i = *pos;
+    while (i < count && memcmp(&old[i], &new[i], sizeof(struct ReplyScreenChar)) == 0)
+    {
+        i++;
+    }
+    if (i >= count)
+    {
+        *pos = count;
+        return FALSE;
+    }
+    int start = i;
+    int end = i + 1;
+    for (i = end; i < count && i - end <= RUN_MERGE_GAP; i++)
+    {
+        if (memcmp(&old[i], &new[i], sizeof(struct ReplyScreenChar)) != 0)
+        {
+            end = i + 1;
+        }
+    }
+    run->offset = start;
+    run->length = end - start;
+    *pos = end;
+    return TRUE;
+}
+
+// Build a reply with headroom bytes before struct ReplyScreenDiff
+// Takes ownership of cells, which becomes the new history
+char *makeScreenDiff(struct ScreenHistory *history, uint32_t baseSeq, COORD scr_size, struct ReplyScreenCursor cursor,
+                     struct ReplyScreenChar *cells, size_t headroom, size_t *replysize)
+{
+    int count = scr_size.X * scr_size.Y;
+    size_t fullsize = sizeof(struct ReplyScreenRun) + sizeof(struct ReplyScreenChar) * count;
+    BOOL full = baseSeq == 0 || baseSeq != history->seq || history->cells == NULL || history->size.X != scr_size.X ||
+                history->size.Y != scr_size.Y;
+    uint32_t runs = 0;
+    size_t bodysize = 0;
+    struct ReplyScreenRun run;
+    int pos = 0;
+    if (!full)
+    {
+        while (nextRun(history->cells, cells, count, &pos, &run))
+        {
+            runs++;
+            bodysize += sizeof(struct ReplyScreenRun) + sizeof(struct ReplyScreenChar) * run.length;
+        }
+        if (bodysize >= fullsize)
+        {
+            full = TRUE;
+        }
+    }
+    if (full)
+    {
+        runs = 1;
+        bodysize = fullsize;
+    }
+    *replysize = headroom + sizeof(struct ReplyScreenDiff) + bodysize;
+    char *replybuf = (char *)malloc(*replysize);
+    history->seq++;
+    if (history->seq == 0)
+    {
+        history->seq = 1; // 0 means no frame
+    }
+    struct ReplyScreenDiff *diff = (struct ReplyScreenDiff *)&replybuf[headroom];
+    diff->lines = scr_size.Y;
+    diff->columns = scr_size.X;
+    diff->cursor = cursor;
+    diff->seq = history->seq;
+    diff->baseSeq = full ? 0 : baseSeq;
+    diff->runs = runs;
+    char *body = &replybuf[headroom + sizeof(struct ReplyScreenDiff)];
+    if (full)
+    {
+        run.offset = 0;
+        run.length = count;
+        memcpy(body, &run, sizeof(run));
+        memcpy(body + sizeof(run), cells, sizeof(struct ReplyScreenChar) * count);
+    }
+    else
+    {
+        pos = 0;
+        while (nextRun(history->cells, cells, count, &pos, &run))
+        {
+            memcpy(body, &run, sizeof(run));
+            body += sizeof(run);
+            memcpy(body, &cells[run.offset], sizeof(struct ReplyScreenChar) * run.length);
+            body += sizeof(struct ReplyScreenChar) * run.length;
+        }
+    }
+    free(history->cells);
+    history->cells = cells;
+    history->size = scr_size;
+    return replybuf;
+}
+
+// Fill inputs[0] and inputs[1] with the key down and key up events of a key
+void fillKeyEvents(INPUT_RECORD *inputs, uint16_t charCode, uint16_t keyCode, uint8_t modifiers)
+{
+    // RIGHT_ALT_PRESSED 0x0001	按下右 ALT 键。
+    // LEFT_ALT_PRESSED 0x0002	按下左 ALT 键。
+    // RIGHT_CTRL_PRESSED 0x0004	按下右 CTRL 键。
+    // LEFT_CTRL_PRESSED 0x0008	按下左 CTRL 键。
+    // SHIFT_PRESSED 0x0010 按下 SHIFT 键。
+    // NUMLOCK_ON 0x0020	NUM LOCK 指示灯亮起。
+    // SCROLLLOCK_ON 0x0040	SCROLL LOCK 指示灯亮起。
+    // CAPSLOCK_ON 0x0080	CAPS LOCK 指示灯亮起。
+    // ENHANCED_KEY 0x0100	按键已增强。 请参阅注解。
+    DWORD dwControlKeyState = 0;
+    if (modifiers & M_CTRL)
+    {
+        dwControlKeyState |= LEFT_CTRL_PRESSED;
+    }
+    if (modifiers & M_SHIFT)
+    {
+        dwControlKeyState |= SHIFT_PRESSED;
+    }
+    if (modifiers & M_ALT)
+    {
+        dwControlKeyState |= LEFT_ALT_PRESSED;
+    }
+    // PageUp ... Down arrow, Insert, Delete
+    if ((keyCode >= 0x21 && keyCode <= 0x28) || keyCode == 0x2D || keyCode == 0x2E)
+    {
+        dwControlKeyState |= ENHANCED_KEY;
+    }
+    WORD scanCode = keyCode != 0 ? MapVirtualKeyW(keyCode, MAPVK_VK_TO_VSC) : 0;
+
+    ZeroMemory(inputs, sizeof(INPUT_RECORD) * 2);
+    inputs[0].EventType = KEY_EVENT;
+    inputs[0].Event.KeyEvent.bKeyDown = TRUE;
+    inputs[0].Event.KeyEvent.wRepeatCount = 1;
+    inputs[0].Event.KeyEvent.uChar.UnicodeChar = charCode;
+    inputs[0].Event.KeyEvent.wVirtualKeyCode = keyCode;
+    inputs[0].Event.KeyEvent.wVirtualScanCode = scanCode;
+    inputs[0].Event.KeyEvent.dwControlKeyState = dwControlKeyState;
+    inputs[1] = inputs[0];
+    inputs[1].Event.KeyEvent.bKeyDown = FALSE;
+}
+
 BOOL WINAPI nobreak(DWORD dwCtrlType)
 {
     switch (dwCtrlType)
@@ -507,6 +853,7 @@ int client(const char *arg_pipename, const char *arg_cmdline, int arg_columns, i
     size_t replysize = 0;
     int stopsign = 0;
     DWORD dwBytesTransferred;
+    struct ScreenHistory history = {0, {0, 0}, NULL};
 
     char *cmdline = (char *)malloc(strlen(arg_cmdline) + 1);
     STARTUPINFO si;
@@ -561,99 +908,86 @@ int client(const char *arg_pipename, const char *arg_cmdline, int arg_columns, i
                 replyError(hPipe, "Incorrect query size");
                 goto next;
             }
-            CONSOLE_SCREEN_BUFFER_INFO csbi;
-            if (!GetConsoleScreenBufferInfo(hStdout, &csbi))
-            {
-                replyLog(hPipe, "GetConsoleScreenBufferInfo failed (%lu).", GetLastError());
-                ZeroMemory(&csbi, sizeof(csbi));
-            }
-            COORD scr_begin = {0, 0};
-            CONSOLE_CURSOR_INFO cci;
-            if (!GetConsoleCursorInfo(hStdout, &cci))
+            COORD scr_size;
+            struct ReplyScreenCursor cursor;
+            struct ReplyScreenChar *cells;
+            if (!readScreen(hStdout, hPipe, &scr_size, &cursor, &cells))
             {
-                replyLog(hPipe, "GetConsoleCursorInfo failed (%lu).", GetLastError());
-                ZeroMemory(&cci, sizeof(cci));
+                goto next;
             }
-            COORD scr_size = {csbi.srWindow.Right - csbi.srWindow.Left + 1,
-                              csbi.srWindow.Bottom - csbi.srWindow.Top + 1};
             replysize = 1 + sizeof(struct ReplyScreen) + sizeof(struct ReplyScreenChar) * (scr_size.X * scr_size.Y - 1);
             replybuf = malloc(replysize);
             replybuf[0] = REPLY_SCREEN;
             struct ReplyScreen *state = (struct ReplyScreen *)&replybuf[1];
             state->lines = scr_size.Y;
             state->columns = scr_size.X;
-            state->cursor.x = csbi.dwCursorPosition.X - csbi.srWindow.Left;
-            state->cursor.y = csbi.dwCursorPosition.Y - csbi.srWindow.Top;
-            state->cursor.visibility = cci.bVisible ? 1 : 0;
-            CHAR_INFO *charinfo = (CHAR_INFO *)malloc(sizeof(CHAR_INFO) * scr_size.X * scr_size.Y);
-            if (!ReadConsoleOutputW(hStdout, charinfo, scr_size, scr_begin, &csbi.srWindow))
+            state->cursor = cursor;
+            memcpy(state->buffer, cells, sizeof(struct ReplyScreenChar) * scr_size.X * scr_size.Y);
+            free(cells);
+        }
+        break;
+        case QUERY_SCREEN_DIFF: {
+            if (querysize != 1 + sizeof(struct QueryScreenDiff))
             {
-                replyError(hPipe, "ReadConsoleOutputW failed (%lu).", GetLastError());
+                replyError(hPipe, "Incorrect query size");
                 goto next;
             }
-            for (int y = 0; y < scr_size.Y; y++)
+            const struct QueryScreenDiff *qsd = (struct QueryScreenDiff *)&querybuf[1];
+            COORD scr_size;
+            struct ReplyScreenCursor cursor;
+            struct ReplyScreenChar *cells;
+            if (!readScreen(hStdout, hPipe, &scr_size, &cursor, &cells))
             {
-                for (int x = 0; x < scr_size.X; x++)
-                {
-                    CHAR_INFO *ci = &charinfo[y * scr_size.X + x];
-                    struct ReplyScreenChar *rc = &state->buffer[y * scr_size.X + x];
-#ifndef COMMON_LVB_TRAILING_BYTE
-#define COMMON_LVB_TRAILING_BYTE 0x0200
-#endif
-                    BOOL has_char = ((ci->Attributes & COMMON_LVB_TRAILING_BYTE) == 0);
-                    rc->charCode = has_char ? ci->Char.UnicodeChar : 0;
-                    rc->color = ci->Attributes & 0xff;
-                }
+                goto next;
             }
+            replybuf = makeScreenDiff(&history, qsd->baseSeq, scr_size, cursor, cells, 1, &replysize);
+            replybuf[0] = REPLY_SCREEN_DIFF;
         }
         break;
-        case QUERY_WRITE: {
-            if (querysize != 1 + sizeof(struct QueryWrite))
+        case QUERY_FRAME: {
+            if (querysize != 1 + sizeof(struct QueryScreenDiff))
             {
                 replyError(hPipe, "Incorrect query size");
                 goto next;
             }
-            const struct QueryWrite *qw = (struct QueryWrite *)&querybuf[1];
-            // RIGHT_ALT_PRESSED 0x0001	按下右 ALT 键。
-            // LEFT_ALT_PRESSED 0x0002	按下左 ALT 键。
-            // RIGHT_CTRL_PRESSED 0x0004	按下右 CTRL 键。
-            // LEFT_CTRL_PRESSED 0x0008	按下左 CTRL 键。
-            // SHIFT_PRESSED 0x0010 按下 SHIFT 键。
-            // NUMLOCK_ON 0x0020	NUM LOCK 指示灯亮起。
-            // SCROLLLOCK_ON 0x0040	SCROLL LOCK 指示灯亮起。
-            // CAPSLOCK_ON 0x0080	CAPS LOCK 指示灯亮起。
-            // ENHANCED_KEY 0x0100	按键已增强。 请参阅注解。
-            DWORD dwControlKeyState = 0;
-            if (qw->modifiers & M_CTRL)
+            const struct QueryScreenDiff *qsd = (struct QueryScreenDiff *)&querybuf[1];
+            struct ReplyFrame frame = {1, 0};
+            result = WaitForSingleObject(pi.hProcess, 0);
+            if (result == WAIT_OBJECT_0)
             {
-                dwControlKeyState |= LEFT_CTRL_PRESSED;
+                DWORD exitcode = 0;
+                GetExitCodeProcess(pi.hProcess, &exitcode);
+                frame.alive = 0;
+                frame.exitCode = exitcode;
             }
-            if (qw->modifiers & M_SHIFT)
+            else if (result != WAIT_TIMEOUT)
             {
-                dwControlKeyState |= SHIFT_PRESSED;
+                replyError(hPipe, "WaitForSingleObject failed (%lu).", GetLastError());
+                goto next;
             }
-            if (qw->modifiers & M_ALT)
+            COORD scr_size;
+            struct ReplyScreenCursor cursor;
+            struct ReplyScreenChar *cells;
+            if (!readScreen(hStdout, hPipe, &scr_size, &cursor, &cells))
             {
-                dwControlKeyState |= LEFT_ALT_PRESSED;
+                goto next;
             }
-
+            replybuf = makeScreenDiff(&history, qsd->baseSeq, scr_size, cursor, cells, 1 + sizeof(struct ReplyFrame),
+                                      &replysize);
+            replybuf[0] = REPLY_FRAME;
+            memcpy(&replybuf[1], &frame, sizeof(frame));
+        }
+        break;
+        case QUERY_WRITE: {
+            if (querysize != 1 + sizeof(struct QueryWrite))
+            {
+                replyError(hPipe, "Incorrect query size");
+                goto next;
+            }
+            const struct QueryWrite *qw = (struct QueryWrite *)&querybuf[1];
             INPUT_RECORD inputs[2];
             DWORD eventWritten;
-            ZeroMemory(inputs, sizeof(inputs) * 2);
-            inputs[0].EventType = KEY_EVENT;
-            inputs[0].Event.KeyEvent.bKeyDown = TRUE;
-            inputs[0].Event.KeyEvent.wRepeatCount = 1;
-            inputs[0].Event.KeyEvent.uChar.UnicodeChar = qw->charCode;
-            inputs[0].Event.KeyEvent.wVirtualKeyCode = 0;
-            inputs[0].Event.KeyEvent.wVirtualScanCode = 0;
-            inputs[0].Event.KeyEvent.dwControlKeyState = dwControlKeyState;
-            inputs[1].EventType = KEY_EVENT;
-            inputs[1].Event.KeyEvent.bKeyDown = FALSE;
-            inputs[1].Event.KeyEvent.wRepeatCount = 1;
-            inputs[1].Event.KeyEvent.uChar.UnicodeChar = qw->charCode;
-            inputs[1].Event.KeyEvent.wVirtualKeyCode = 0;
-            inputs[1].Event.KeyEvent.wVirtualScanCode = 0;
-            inputs[1].Event.KeyEvent.dwControlKeyState = dwControlKeyState;
+            fillKeyEvents(inputs, qw->charCode, 0, qw->modifiers);
             result = WriteConsoleInputW(hStdin, inputs, 2, &eventWritten);
             if (!result)
             {
@@ -665,6 +999,33 @@ int client(const char *arg_pipename, const char *arg_cmdline, int arg_columns, i
             replybuf[0] = REPLY_NONE;
         }
         break;
+        case QUERY_WRITE_KEYS: {
+            const struct QueryWriteKeys *qwk = (struct QueryWriteKeys *)&querybuf[1];
+            if (querysize < 1 + sizeof(uint16_t) ||
+                querysize != 1 + sizeof(uint16_t) + sizeof(struct QueryKey) * qwk->count)
+            {
+                replyError(hPipe, "Incorrect query size");
+                goto next;
+            }
+            INPUT_RECORD *inputs = (INPUT_RECORD *)malloc(sizeof(INPUT_RECORD) * 2 * (qwk->count + 1));
+            DWORD eventWritten;
+            for (int i = 0; i < qwk->count; i++)
+            {
+                const struct QueryKey *key = &qwk->keys[i];
+                fillKeyEvents(&inputs[i * 2], key->charCode, key->keyCode, key->modifiers);
+            }
+            result = WriteConsoleInputW(hStdin, inputs, qwk->count * 2, &eventWritten);
+            free(inputs);
+            if (!result)
+            {
+                replyError(hPipe, "WriteConsoleInputW failed (%lu).", GetLastError());
+                goto next;
+            }
+            replysize = sizeof(uint8_t);
+            replybuf = (char *)malloc(replysize);
+            replybuf[0] = REPLY_NONE;
+        }
+        break;
         case QUERY_ALIVE: {
             if (querysize != 1)
             {
@@ -742,6 +1103,7 @@ int client(const char *arg_pipename, const char *arg_cmdline, int arg_columns, i
     CloseHandle(pi.hThread);
     SetConsoleCtrlHandler(nobreak, FALSE);
     free(querybuf);
+    free(history.cells);
 end:
     FlushFileBuffers(hPipe);
     CloseHandle(hPipe);
@@ -757,7 +1119,8 @@ Options:\n\
   -L <lines>  Console lines (default: 24)\n\
   -C <cols>   Console columns (default: 80)\n\
   -n          Show new console for subprocess\n\
-  -P          Print pipe name and wait (no auto-start)\
+  -P          Print pipe name and wait (no auto-start)\n\
+  -B          Binary framing on stdin/stdout instead of hex lines\
 ";
 
 int main(int argc, char *argv[])
@@ -831,6 +1194,10 @@ int main(int argc, char *argv[])
         {
             arg_nostart = 1;
         }
+        else if (strcmp(argv[i], "-B") == 0)
+        {
+            binary_mode = 1;
+        }
         else
         {
             printf("Unknown option: %s\n", argv[i]);
@@ -841,6 +1208,11 @@ int main(int argc, char *argv[])
     const char *pipename = arg_pipename;
     if (pipename == NULL)
     {
+        if (binary_mode)
+        {
+            _setmode(_fileno(stdin), _O_BINARY);
+            _setmode(_fileno(stdout), _O_BINARY);
+        }
         return server(arg_nostart, arg_newconsole);
     }
 